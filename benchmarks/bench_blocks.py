@@ -0,0 +1,92 @@
+"""Compares the block classifier with the previous regex-per-call version.
+
+Usage: python benchmarks/bench_blocks.py [pages] [blocks]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from blocks import (  # noqa: E402
+    BlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+)
+from corpus import generate_corpus  # noqa: E402
+
+EDGE_CASES = [
+    "#",
+    "# ",
+    "####### too deep",
+    "#no space",
+    "```",
+    "``````",
+    "```x```",
+    "```\ncode\n```\n",
+    "> quote\n>\n> more",
+    "> quote\nnot quote",
+    "- item\n-",
+    "- item\n- ",
+    "-item",
+    "1. one\n2. two\n4. four",
+    "1. one\n\n2. two",
+    "1. one\n\t\n2. two",
+    "- item\n   \n- item",
+    "1.one",
+    "10. ten",
+]
+
+
+def legacy_block_to_block_type(block):
+    if re.search(r"^(#{1,6} ).+", block):
+        return BlockType.HEADING
+    if re.search(r"^```[\s\S]+```$", block):
+        return BlockType.CODE
+    if block[0] == ">":
+        if legacy_is_prefixed(block, lambda i: ">"):
+            return BlockType.QUOTE
+    if block[0:2] == "- ":
+        if legacy_is_prefixed(block, lambda i: "- "):
+            return BlockType.UNORDERED_LIST
+    if block[0:3] == "1. ":
+        if legacy_is_prefixed(block, lambda i: f"{i + 1}. "):
+            return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def legacy_is_prefixed(block, prefix):
+    lines = [x.strip() for x in block.split("\n") if x]
+    for i, line in enumerate(lines):
+        expected = prefix(i)
+        if line[0 : len(expected)] != expected:
+            return False
+    return True
+
+
+def bench(func, blocks, repeat=5):
+    timer = timeit.Timer(lambda: [func(block) for block in blocks])
+    return min(timer.repeat(repeat=repeat, number=1))
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    blocks_per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    corpus = generate_corpus(pages, blocks_per_page)
+    blocks = [b for md in corpus.values() for b in markdown_to_blocks(md)]
+    for block in blocks + EDGE_CASES:
+        assert block_to_block_type(block) == legacy_block_to_block_type(
+            block
+        ), block
+    legacy = bench(legacy_block_to_block_type, blocks)
+    current = bench(block_to_block_type, blocks)
+    print(f"blocks:      {len(blocks)}")
+    print(f"legacy:      {legacy * 1000:8.2f} ms")
+    print(f"single scan: {current * 1000:8.2f} ms")
+    print(f"speedup:     {legacy / current:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
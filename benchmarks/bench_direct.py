@@ -0,0 +1,74 @@
+"""Compares rendering blocks straight to HTML with going through nodes.
+
+Time is the best of five runs over every block. Memory is the working
+memory of rendering one block: the peak traced by tracemalloc while it is
+rendered, less what was allocated before, with the output dropped before
+the next block. It counts the nodes, token lists and strings made along
+the way, not the HTML kept by the caller.
+
+Usage: python benchmarks/bench_direct.py [pages] [blocks]
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from blocks import markdown_to_blocks  # noqa: E402
+from corpus import generate_corpus, pathological_corpus  # noqa: E402
+from markdown_to_html_node import block_to_html, block_to_node  # noqa: E402
+
+
+def tree_html(block):
+    return block_to_node(block).to_html()
+
+
+def direct_html(block):
+    return block_to_html(block)
+
+
+def measure(render, blocks):
+    # Return the best time to render every block, and the mean and largest
+    # working memory of rendering one
+    timer = timeit.Timer(lambda: [render(block) for block in blocks])
+    seconds = min(timer.repeat(repeat=5, number=1))
+    peaks = []
+    tracemalloc.start()
+    for block in blocks:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        render(block)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return seconds, sum(peaks) / len(peaks), max(peaks)
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    blocks_per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    documents = list(generate_corpus(pages, blocks_per_page).values())
+    documents.extend(pathological_corpus().values())
+    blocks = [b for md in documents for b in markdown_to_blocks(md)]
+    for block in blocks:
+        assert tree_html(block) == direct_html(block), block
+
+    results = {
+        "tree": measure(tree_html, blocks),
+        "direct": measure(direct_html, blocks),
+    }
+    print(f"blocks:   {len(blocks)}")
+    print(f"{'path':<8}{'ms':>10}{'mean B/block':>14}{'max KiB/block':>15}")
+    for name, (seconds, mean, largest) in results.items():
+        print(
+            f"{name:<8}{seconds * 1000:>10.2f}{mean:>14.0f}"
+            f"{largest / 1024:>15.1f}"
+        )
+    tree, direct = results["tree"], results["direct"]
+    print(f"speedup:  {tree[0] / direct[0]:.2f}x")
+    print(f"memory:   {direct[1] / tree[1]:.0%} of the tree path's per block")
+
+
+if __name__ == "__main__":
+    main()
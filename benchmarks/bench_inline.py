@@ -0,0 +1,90 @@
+"""Compares the single-pass inline tokenizer with the chained split passes.
+
+The two are timed in alternating rounds, so that drift in machine load
+affects both alike, and the median of the rounds is reported.
+
+Usage: python benchmarks/bench_inline.py [paragraphs]
+"""
+
+import os
+import random
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from textnode import (  # noqa: E402
+    TextNode,
+    TextType,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "elit", "sed", "magna"]
+SPANS = [
+    "**bold words**",
+    "_italic words_",
+    "`inline code`",
+    "[a link](https://example.com/page)",
+    "![an image](/images/picture.png)",
+]
+
+
+def chained_text_to_textnodes(text):
+    node = TextNode(text.replace("\n", " "), TextType.TEXT)
+    nodes_list = split_nodes_delimiter([node], "**", TextType.BOLD)
+    nodes_list = split_nodes_delimiter(nodes_list, "_", TextType.ITALIC)
+    nodes_list = split_nodes_delimiter(nodes_list, "`", TextType.CODE)
+    nodes_list = split_nodes_link(nodes_list)
+    nodes_list = split_nodes_image(nodes_list)
+    return nodes_list
+
+
+def make_paragraphs(count, seed=0):
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(count):
+        pieces = []
+        for _ in range(rng.randint(40, 120)):
+            if rng.random() < 0.1:
+                pieces.append(rng.choice(SPANS))
+            else:
+                pieces.append(rng.choice(WORDS))
+        paragraphs.append(" ".join(pieces))
+    return paragraphs
+
+
+def bench(funcs, paragraphs, rounds=15):
+    # Time each function once per round, in turn, and return the median
+    # time of each
+    timers = [
+        timeit.Timer(lambda f=f: [f(p) for p in paragraphs]) for f in funcs
+    ]
+    times = [[] for _ in funcs]
+    for _ in range(rounds):
+        for timer, taken in zip(timers, times):
+            taken.append(timer.timeit(number=1))
+    return [statistics.median(taken) for taken in times]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    paragraphs = make_paragraphs(count)
+    for paragraph in paragraphs:
+        assert text_to_textnodes(paragraph) == chained_text_to_textnodes(
+            paragraph
+        )
+    chained, single = bench(
+        [chained_text_to_textnodes, text_to_textnodes], paragraphs
+    )
+    print(f"paragraphs:  {count}")
+    print(f"chained:     {chained * 1000:8.2f} ms")
+    print(f"single pass: {single * 1000:8.2f} ms")
+    print(f"speedup:     {chained / single:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Compares reading, hashing and copying large files with and without mapping.
+
+The "read" path is the one used before: sources are read whole into bytes,
+hashed and decoded, and static files are copied with shutil.copy2. The
+"mapped" path memory-maps large sources with fileio.read_file, hashes and
+decodes the mapped buffers, and copies static files with fileio.copy_file.
+Like generate_pages, both keep up to QUEUE_DEPTH sources read ahead.
+
+Each path runs in its own process so that its peak RSS can be measured,
+from /proc where available. Three stages are timed: hashing unchanged
+sources, hashing and decoding changed ones, and copying static files.
+
+Usage: python benchmarks/bench_io.py [sources] [source MiB] [assets]
+       [asset MiB]
+"""
+
+import collections
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fileio import copy_file, decode_file, read_file, release_file  # noqa: E402
+from generate_site import QUEUE_DEPTH  # noqa: E402
+from manifest import hash_bytes  # noqa: E402
+
+
+def read_whole(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+PATHS = {
+    "read": (read_whole, lambda contents: None, bytes.decode, shutil.copy2),
+    "mapped": (read_file, release_file, decode_file, copy_file),
+}
+
+
+def make_tree(root, sources, source_mib, assets, asset_mib):
+    # Write markdown sources and binary static files of the given sizes
+    paragraph = "Some **bold** text and a [link](/page.html) here.\n\n"
+    text = paragraph * (source_mib * (1 << 20) // len(paragraph))
+    os.makedirs(os.path.join(root, "content"))
+    os.makedirs(os.path.join(root, "static"))
+    for i in range(sources):
+        with open(os.path.join(root, "content", f"page{i}.md"), "w") as f:
+            f.write(f"# Page {i}\n\n{text}")
+    block = os.urandom(1 << 20)
+    for i in range(assets):
+        with open(os.path.join(root, "static", f"image{i}.png"), "wb") as f:
+            for _ in range(asset_mib):
+                f.write(block)
+
+
+def reset_peak_rss():
+    # Reset the peak RSS of this process, which on Linux is otherwise
+    # inherited from the parent across exec, and return the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    return peak_rss_kib()
+
+
+def peak_rss_kib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def read_ahead(read, paths):
+    # Yield the contents of each path while up to QUEUE_DEPTH are held
+    pending = collections.deque()
+    for path in paths:
+        pending.append(read(path))
+        if len(pending) == QUEUE_DEPTH:
+            yield pending.popleft()
+    yield from pending
+
+
+def run_path(name, root):
+    # Time each stage of one path and report its peak RSS growth as JSON
+    read, release, decode, copy = PATHS[name]
+    content = os.path.join(root, "content")
+    static = os.path.join(root, "static")
+    sources = [os.path.join(content, n) for n in sorted(os.listdir(content))]
+    assets = [os.path.join(static, n) for n in sorted(os.listdir(static))]
+    dest = os.path.join(root, f"docs-{name}")
+    os.makedirs(dest)
+    start_rss = reset_peak_rss()
+    results = {}
+
+    start = time.perf_counter()
+    for contents in read_ahead(read, sources):
+        hash_bytes(contents)
+        release(contents)
+    results["hash"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for contents in read_ahead(read, sources):
+        hash_bytes(contents)
+        decode(contents)
+        release(contents)
+    results["hash_decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for asset in assets:
+        copy(asset, os.path.join(dest, os.path.basename(asset)))
+    results["copy"] = time.perf_counter() - start
+
+    results["peak_rss_kib"] = peak_rss_kib() - start_rss
+    print(json.dumps(results))
+
+
+def main():
+    if sys.argv[1:2] == ["--run"]:
+        run_path(sys.argv[2], sys.argv[3])
+        return
+    args = [int(arg) for arg in sys.argv[1:]]
+    sources, source_mib, assets, asset_mib = args + [64, 4, 16, 32][len(args) :]
+    source_bytes = sources * source_mib
+    asset_bytes = assets * asset_mib
+
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, sources, source_mib, assets, asset_mib)
+        print(
+            f"sources: {sources} x {source_mib} MiB, "
+            f"static files: {assets} x {asset_mib} MiB"
+        )
+        print(
+            f"{'path':<8}{'hash MiB/s':>12}{'decode MiB/s':>14}"
+            f"{'copy MiB/s':>12}{'peak RSS MiB':>14}"
+        )
+        for name in PATHS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", name, root],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results = json.loads(output)
+            print(
+                f"{name:<8}{source_bytes / results['hash']:>12.0f}"
+                f"{source_bytes / results['hash_decode']:>14.0f}"
+                f"{asset_bytes / results['copy']:>12.0f}"
+                f"{results['peak_rss_kib'] / 1024:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measures memory and allocation time of the node classes.
+
+The current slotted classes are compared with replicas of the previous
+layout, plain classes with a per-instance __dict__.
+
+Usage: python benchmarks/bench_memory.py [nodes]
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from htmlnode import LeafNode, ParentNode  # noqa: E402
+from textnode import TextNode, TextType  # noqa: E402
+
+
+class DictLeafNode:
+    def __init__(self, tag, value, props={}, children=[]):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictParentNode:
+    def __init__(self, tag, children, props={}):
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def build_page(count, leaf, parent, text):
+    # A page of paragraphs, each holding a few text, bold and link runs
+    paragraphs = []
+    for i in range(count // 8):
+        runs = [
+            text("plain text run", TextType.TEXT),
+            text("bold", TextType.BOLD),
+            text("link", TextType.LINK, "https://example.com"),
+        ]
+        children = [
+            leaf(None, "plain text run"),
+            leaf("b", "bold"),
+            leaf(None, " and "),
+            leaf("a", "link", {"href": "https://example.com"}),
+        ]
+        paragraphs.append((runs, parent("p", children)))
+    return paragraphs
+
+
+def measure(count, leaf, parent, text):
+    tracemalloc.start()
+    page = build_page(count, leaf, parent, text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del page
+    timer = timeit.Timer(lambda: build_page(count, leaf, parent, text))
+    seconds = min(timer.repeat(repeat=5, number=1))
+    return peak, seconds
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 80000
+    rows = [
+        ("dict", measure(count, DictLeafNode, DictParentNode, DictTextNode)),
+        ("slots", measure(count, LeafNode, ParentNode, TextNode)),
+    ]
+    print(f"{'layout':<8}{'peak KiB':>12}{'build ms':>12}")
+    for name, (peak, seconds) in rows:
+        print(f"{name:<8}{peak / 1024:>12.0f}{seconds * 1000:>12.2f}")
+    (dict_peak, dict_time), (slot_peak, slot_time) = (r[1] for r in rows)
+    print(f"memory saved: {1 - slot_peak / dict_peak:.0%}")
+    print(f"time saved:   {1 - slot_time / dict_time:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Compares batch rendering with a Renderer against one tree per document.
+
+Usage: python benchmarks/bench_renderer.py [pages] [blocks]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import generate_corpus  # noqa: E402
+from markdown_to_html_node import markdown_to_html_node  # noqa: E402
+from renderer import Renderer  # noqa: E402
+
+
+def bench(func, repeat=5):
+    return min(timeit.Timer(func).repeat(repeat=repeat, number=1))
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    blocks = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    documents = list(generate_corpus(pages, blocks).values())
+    expected = [markdown_to_html_node(md).to_html() for md in documents]
+    assert Renderer().render_many(documents) == expected
+
+    tree = bench(
+        lambda: [markdown_to_html_node(md).to_html() for md in documents]
+    )
+    cold = bench(lambda: Renderer().render_many(documents))
+    renderer = Renderer()
+    renderer.render_many(documents)
+    warm = bench(lambda: renderer.render_many(documents))
+    print(f"documents:       {len(documents)}")
+    print(f"node tree:       {tree * 1000:8.2f} ms")
+    print(f"renderer, cold:  {cold * 1000:8.2f} ms ({tree / cold:.2f}x)")
+    print(f"renderer, warm:  {warm * 1000:8.2f} ms ({tree / warm:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
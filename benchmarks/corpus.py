@@ -0,0 +1,158 @@
+"""Generates synthetic markdown corpora for benchmarking.
+
+Usage: python benchmarks/corpus.py DIRECTORY [--pages N] [--blocks N]
+       [--mix kind=weight,...] [--seed N]
+"""
+
+import argparse
+import os
+import random
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam"
+).split()
+
+# Relative weights of each block kind in a generated document
+DEFAULT_MIX = {
+    "paragraph": 40,
+    "heading": 10,
+    "code": 8,
+    "quote": 8,
+    "unordered_list": 12,
+    "ordered_list": 12,
+    "links": 6,
+    "images": 4,
+}
+
+
+def parse_mix(text):
+    """Parses a block mix such as "paragraph=3,code=1" into weights"""
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"unknown block kind {kind!r}")
+        mix[kind] = int(weight)
+    return mix
+
+
+def sentence(rng, spans=True, length=(6, 18)):
+    words = []
+    for _ in range(rng.randint(*length)):
+        roll = rng.random() if spans else 1.0
+        word = rng.choice(WORDS)
+        if roll < 0.04:
+            word = f"**{word} {rng.choice(WORDS)}**"
+        elif roll < 0.08:
+            word = f"_{word}_"
+        elif roll < 0.11:
+            word = f"`{word}()`"
+        words.append(word)
+    return " ".join(words)
+
+
+def link(rng):
+    return f"[{rng.choice(WORDS)}](https://example.com/{rng.choice(WORDS)})"
+
+
+def image(rng):
+    return f"![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)"
+
+
+def block(rng, kind):
+    if kind == "paragraph":
+        lines = [sentence(rng) for _ in range(rng.randint(1, 5))]
+        return "\n".join(lines)
+    if kind == "heading":
+        return f"{'#' * rng.randint(2, 6)} {sentence(rng, length=(2, 6))}"
+    if kind == "code":
+        lines = [sentence(rng, spans=False) for _ in range(rng.randint(2, 12))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if kind == "quote":
+        lines = [f"> {sentence(rng)}" for _ in range(rng.randint(1, 6))]
+        return "\n".join(lines)
+    if kind == "unordered_list":
+        items = [f"- {sentence(rng)}" for _ in range(rng.randint(2, 10))]
+        return "\n".join(items)
+    if kind == "ordered_list":
+        count = rng.randint(2, 10)
+        return "\n".join(f"{i}. {sentence(rng)}" for i in range(1, count + 1))
+    if kind == "links":
+        count = rng.randint(1, 6)
+        return " ".join(f"{sentence(rng)} {link(rng)}" for _ in range(count))
+    if kind == "images":
+        return f"{sentence(rng)} {image(rng)} {sentence(rng)}"
+    raise ValueError(f"unknown block kind {kind!r}")
+
+
+def generate_document(rng, blocks, mix=None):
+    """Returns a markdown document with a title and the given block count"""
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    chosen = rng.choices(kinds, weights=weights, k=blocks)
+    body = [block(rng, kind) for kind in chosen]
+    title = sentence(rng, spans=False, length=(2, 6))
+    return f"# {title}\n\n" + "\n\n".join(body)
+
+
+def generate_corpus(pages, blocks, mix=None, seed=0):
+    """Returns a dictionary of relative page paths to markdown documents"""
+    rng = random.Random(seed)
+    corpus = {}
+    for i in range(pages):
+        path = os.path.join(f"section{i % 10}", f"page{i}", "index.md")
+        corpus[path] = generate_document(rng, blocks, mix)
+    return corpus
+
+
+def pathological_corpus(scale=1):
+    """Returns a dictionary of named documents that stress a single code path
+
+    Each document is valid markdown, sized by scale, built to expose
+    parsing that grows faster than linearly with its input.
+    """
+    count = 2000 * scale
+    links = " ".join(
+        f"see [link {i}](https://example.com/{i}) and" for i in range(count)
+    )
+    images = " ".join(f"![image {i}](/images/{i}.png)" for i in range(count))
+    unordered = "\n".join(f"- item {i} with _some_ text" for i in range(count))
+    ordered = "\n".join(f"{i}. item {i}" for i in range(1, count + 1))
+    fence = "\n".join(f"line {i} = [x](y) **z**" for i in range(count * 10))
+    brackets = "[a](b " * count
+    return {
+        "many_links": f"# Links\n\n{links}",
+        "many_images": f"# Images\n\n{images}",
+        "long_unordered_list": f"# List\n\n{unordered}",
+        "long_ordered_list": f"# List\n\n{ordered}",
+        "huge_code_fence": f"# Code\n\n```\n{fence}\n```",
+        "unclosed_brackets": f"# Brackets\n\n{brackets}",
+    }
+
+
+def write_corpus(directory, corpus):
+    """Writes a corpus to disk below the given directory"""
+    for path, markdown in corpus.items():
+        destination = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, "w") as f:
+            f.write(markdown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--blocks", type=int, default=50)
+    parser.add_argument("--mix", type=parse_mix, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    corpus = generate_corpus(args.pages, args.blocks, args.mix, args.seed)
+    write_corpus(args.directory, corpus)
+    print(f"Wrote {len(corpus)} pages to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
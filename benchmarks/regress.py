@@ -0,0 +1,313 @@
+"""Checks build stages for time and memory regressions against a baseline.
+
+Every stage runs on a mixed corpus and on pathological documents: many
+links or images in one paragraph, thousands of list items, a huge code
+fence and unclosed brackets. --save stores the timings and peak memory as
+the baseline. Later runs are compared against it, and the script exits
+with status 1 if a stage got slower or used more memory than the
+thresholds allow. A stage only counts as slower if its median time grew
+past the threshold and a Mann-Whitney U test finds the slowdown unlikely
+to be noise.
+
+Baselines depend on the machine, so keep one per machine and save it again
+after upgrading Python. Stages missing from a baseline are reported as new;
+--save with --only adds them to it without replacing the others.
+
+Usage: python benchmarks/regress.py [--save] [--baseline PATH]
+       [--threshold PCT] [--memory-threshold PCT] [--repeat N]
+       [--scale N] [--only GLOB ...]
+"""
+
+import argparse
+import fnmatch
+import gc
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from blocks import block_to_block_type, markdown_to_blocks  # noqa: E402
+from corpus import generate_corpus, pathological_corpus  # noqa: E402
+from markdown_to_html_node import (  # noqa: E402
+    block_to_html,
+    markdown_to_html_node,
+    parse_markdown,
+)
+from run import git_revision, inline_texts, time_stage  # noqa: E402
+from textnode import (  # noqa: E402
+    TextNode,
+    TextType,
+    inline_tokens,
+    split_nodes_link,
+    text_to_textnodes,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+BASELINE_VERSION = 1
+# Largest allowed growth of a stage's median time and peak memory
+DEFAULT_THRESHOLD = 15
+DEFAULT_MEMORY_THRESHOLD = 10
+# Largest chance of a slowdown being noise that still counts as a regression
+SIGNIFICANCE = 0.01
+# Slowdowns smaller than this many seconds are below timer noise
+MIN_DELTA = 0.0005
+
+
+def reference_corpora(scale):
+    # Return the corpora every stage runs on, as lists of documents
+    corpora = {"mixed": list(generate_corpus(40 * scale, 60).values())}
+    for name, markdown in pathological_corpus(scale).items():
+        corpora[name] = [markdown]
+    return corpora
+
+
+def corpus_stages(documents):
+    # Return the stages to time on a corpus, as callables
+    # Pages are built through parse_markdown, which renders blocks straight
+    # to HTML; markdown_to_html_node and to_html time the node tree path
+    blocks = [b for md in documents for b in markdown_to_blocks(md)]
+    texts = inline_texts(blocks)
+    trees = [markdown_to_html_node(md) for md in documents]
+    return {
+        "markdown_to_blocks": lambda: list(map(markdown_to_blocks, documents)),
+        "block_to_block_type": lambda: list(map(block_to_block_type, blocks)),
+        "split_nodes_link": lambda: [
+            split_nodes_link([TextNode(text, TextType.TEXT)]) for text in texts
+        ],
+        "text_to_textnodes": lambda: list(map(text_to_textnodes, texts)),
+        "inline_tokens": lambda: list(map(inline_tokens, texts)),
+        "block_to_html": lambda: list(map(block_to_html, blocks)),
+        "parse_markdown": lambda: list(map(parse_markdown, documents)),
+        "markdown_to_html_node": lambda: list(
+            map(markdown_to_html_node, documents)
+        ),
+        "to_html": lambda: [tree.to_html() for tree in trees],
+    }
+
+
+def peak_memory(func):
+    # Return the most memory a call held at once, in bytes
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(scale, repeat, only=None):
+    # Time and measure every stage on every corpus
+    # Stages are timed in rounds, each running every stage once in a
+    # shuffled order, so that a burst of load on the machine slows one
+    # sample of many stages rather than every sample of one stage
+    stages = {}
+    for corpus_name, documents in reference_corpora(scale).items():
+        for stage, func in corpus_stages(documents).items():
+            name = f"{corpus_name}/{stage}"
+            if not only or any(fnmatch.fnmatch(name, p) for p in only):
+                stages[name] = func
+    samples = {name: [] for name in stages}
+    for func in stages.values():
+        func()
+    rng = random.Random(0)
+    for round_number in range(repeat):
+        print(f"  round {round_number + 1} of {repeat}")
+        names = list(stages)
+        rng.shuffle(names)
+        for name in names:
+            samples[name].extend(time_stage(stages[name], 1)["samples"])
+    return {
+        name: {
+            "median": statistics.median(samples[name]),
+            "samples": samples[name],
+            "peak_bytes": peak_memory(func),
+        }
+        for name, func in stages.items()
+    }
+
+
+def mann_whitney_p(baseline, current):
+    """Returns the chance that current samples are no larger than baseline ones
+
+    This is the one-sided p-value of the Mann-Whitney U test, from its
+    normal approximation with corrections for ties and continuity. It
+    makes no assumption about how timings are distributed.
+    """
+    pooled = sorted(
+        [(value, False) for value in baseline]
+        + [(value, True) for value in current]
+    )
+    n = len(pooled)
+    rank_sum = 0.0
+    ties = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j < n and pooled[j][0] == pooled[i][0]:
+            j += 1
+        rank = (i + j + 1) / 2
+        rank_sum += rank * sum(1 for k in range(i, j) if pooled[k][1])
+        ties += (j - i) ** 3 - (j - i)
+        i = j
+    n1, n2 = len(current), len(baseline)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline, current, threshold, memory_threshold):
+    # Return a (name, baseline, current, time change, p-value, memory
+    # change, status) row per stage, and the names of regressed stages
+    rows = []
+    regressed = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, None, result, None, None, None, "new"))
+            continue
+        change = result["median"] / base["median"] - 1
+        p = mann_whitney_p(base["samples"], result["samples"])
+        memory = result["peak_bytes"] / max(base["peak_bytes"], 1) - 1
+        status = "ok"
+        if (
+            change * 100 > threshold
+            and p < SIGNIFICANCE
+            and result["median"] - base["median"] > MIN_DELTA
+        ):
+            status = "SLOWER"
+        elif memory * 100 > memory_threshold:
+            status = "MORE MEMORY"
+        elif change * 100 < -threshold and p > 1 - SIGNIFICANCE:
+            status = "faster"
+        if status in ("SLOWER", "MORE MEMORY"):
+            regressed.append(name)
+        rows.append((name, base, result, change, p, memory, status))
+    return rows, regressed
+
+
+def print_report(rows):
+    print(
+        f"{'stage':<44}{'base ms':>10}{'now ms':>10}{'time':>9}"
+        f"{'p':>8}{'memory':>9}  status"
+    )
+    for name, base, result, change, p, memory, status in rows:
+        now = f"{result['median'] * 1000:>10.2f}"
+        if base is None:
+            print(f"{name:<44}{'-':>10}{now}{'':>26}  {status}")
+            continue
+        print(
+            f"{name:<44}{base['median'] * 1000:>10.2f}{now}{change:>+9.1%}"
+            f"{p:>8.3f}{memory:>+9.1%}  {status}"
+        )
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != BASELINE_VERSION:
+        return None
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--save", action="store_true", help="store this run as the baseline"
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="percent of median time growth allowed "
+        f"(default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=DEFAULT_MEMORY_THRESHOLD,
+        help="percent of peak memory growth allowed "
+        f"(default: {DEFAULT_MEMORY_THRESHOLD})",
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument(
+        "--only",
+        action="append",
+        metavar="GLOB",
+        help="only run stages whose corpus/stage name matches GLOB",
+    )
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    if baseline is not None and baseline["scale"] != args.scale:
+        sys.exit(
+            f"Baseline was run with --scale {baseline['scale']}, "
+            f"not {args.scale}"
+        )
+    print("Running stages...")
+    results = run_suite(args.scale, args.repeat, args.only)
+    print()
+
+    if args.save:
+        stages = baseline["stages"] if baseline is not None else {}
+        stages.update(results)
+        data = {
+            "version": BASELINE_VERSION,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "stages": stages,
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        print(f"Baseline of {len(results)} stage(s) saved to {args.baseline}")
+        return
+    if baseline is None:
+        sys.exit(f"No baseline at {args.baseline}; run with --save first")
+    if baseline["python"] != platform.python_version():
+        print(
+            f"Warning: baseline was run on Python {baseline['python']}, "
+            f"this run on {platform.python_version()}"
+        )
+
+    rows, regressed = compare(
+        baseline["stages"], results, args.threshold, args.memory_threshold
+    )
+    print_report(rows)
+    print()
+    if regressed:
+        print(f"{len(regressed)} stage(s) regressed since {baseline['revision']}:")
+        for name, base, result, change, p, memory, status in rows:
+            if name in regressed:
+                print(
+                    f"  {name}: {status.lower()}, median "
+                    f"{base['median'] * 1000:.2f} -> "
+                    f"{result['median'] * 1000:.2f} ms ({change:+.1%}, "
+                    f"p={p:.4f}), peak memory "
+                    f"{base['peak_bytes'] / 1024:.0f} -> "
+                    f"{result['peak_bytes'] / 1024:.0f} KiB ({memory:+.1%})"
+                )
+        sys.exit(1)
+    print(f"No regressions in {len(rows)} stage(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Times each stage of the site build on a synthetic corpus.
+
+Usage: python benchmarks/run.py [--pages N] [--blocks N] [--mix ...]
+       [--repeat N] [--output results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from blocks import (  # noqa: E402
+    BlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+)
+from corpus import (  # noqa: E402
+    DEFAULT_MIX,
+    generate_corpus,
+    parse_mix,
+    write_corpus,
+)
+from generate_site import generate_pages  # noqa: E402
+from htmlnode import HTMLBuffer, LeafNode  # noqa: E402
+from markdown_to_html_node import (  # noqa: E402
+    extract_heading,
+    markdown_to_html_node,
+    strip_heading,
+    strip_quotes,
+)
+from template import Template  # noqa: E402
+from textnode import text_to_textnodes  # noqa: E402
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "template.html")
+BASEPATH = "/static-site-generator/"
+
+
+def time_stage(func, repeat):
+    # Run a stage several times and summarize its wall time in seconds
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "samples": samples,
+    }
+
+
+def inline_texts(blocks):
+    # Collect the inline text that blocks_to_nodes hands to text_to_textnodes
+    texts = []
+    for block in blocks:
+        block_type = block_to_block_type(block)
+        if block_type == BlockType.PARAGRAPH:
+            texts.append(block)
+        elif block_type == BlockType.HEADING:
+            texts.append(strip_heading(block)[0])
+        elif block_type == BlockType.QUOTE:
+            texts.append(strip_quotes(block))
+        elif block_type == BlockType.UNORDERED_LIST:
+            texts.extend(line[2:] for line in block.split("\n"))
+        elif block_type == BlockType.ORDERED_LIST:
+            texts.extend(line[3:] for line in block.split("\n"))
+    return texts
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(corpus, repeat):
+    documents = list(corpus.values())
+    blocks = [b for md in documents for b in markdown_to_blocks(md)]
+    texts = inline_texts(blocks)
+    trees = [markdown_to_html_node(md) for md in documents]
+    contents = [LeafNode(None, tree.to_html()) for tree in trees]
+    headings = [extract_heading(md) for md in documents]
+    with open(TEMPLATE_PATH) as f:
+        template = Template(f.read(), BASEPATH)
+
+    def fill_templates():
+        for heading, content in zip(headings, contents):
+            values = {"Title": heading, "Content": content}
+            template.write(HTMLBuffer(), values)
+
+    stages = {
+        "markdown_to_blocks": lambda: list(map(markdown_to_blocks, documents)),
+        "block_to_block_type": lambda: list(map(block_to_block_type, blocks)),
+        "text_to_textnodes": lambda: list(map(text_to_textnodes, texts)),
+        "to_html": lambda: [tree.to_html() for tree in trees],
+        "template_fill": fill_templates,
+    }
+    results = {name: time_stage(func, repeat) for name, func in stages.items()}
+
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        dest_dir = os.path.join(root, "docs")
+        write_corpus(content_dir, corpus)
+        sources = [os.path.join(content_dir, path) for path in corpus]
+        outputs = [html.value for html in contents]
+
+        def read_sources():
+            for path in sources:
+                with open(path) as f:
+                    f.read()
+
+        def write_outputs():
+            os.makedirs(dest_dir, exist_ok=True)
+            for i, html in enumerate(outputs):
+                with open(os.path.join(dest_dir, f"{i}.html"), "w") as f:
+                    f.write(html)
+
+        def build():
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages(BASEPATH, content_dir, dest_dir, TEMPLATE_PATH)
+
+        results["io_read"] = time_stage(read_sources, repeat)
+        results["io_write"] = time_stage(write_outputs, repeat)
+        results["generate_pages"] = time_stage(build, repeat)
+
+    return results, {
+        "pages": len(documents),
+        "blocks": len(blocks),
+        "inline_texts": len(texts),
+        "bytes": sum(len(md.encode()) for md in documents),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=60)
+    parser.add_argument("--mix", type=parse_mix, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.pages, args.blocks, args.mix, args.seed)
+    stages, sizes = run_benchmarks(corpus, args.repeat)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "corpus": {
+            "seed": args.seed,
+            "mix": args.mix or DEFAULT_MIX,
+            "repeat": args.repeat,
+            **sizes,
+        },
+        "stages": stages,
+    }
+
+    print(f"{'stage':<22}{'min ms':>10}{'median ms':>12}")
+    for name, result in stages.items():
+        print(
+            f"{name:<22}{result['min'] * 1000:>10.2f}"
+            f"{result['median'] * 1000:>12.2f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
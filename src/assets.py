@@ -0,0 +1,240 @@
+import functools
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from fileio import copy_file
+from generate_site import create_directory, remove_output, traverse_directory
+from manifest import hash_file
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl request cloning one file's extents into another, from <linux/fs.h>
+FICLONE = 0x40049409
+# Hex digits of a static file's hash kept in its fingerprinted name
+FINGERPRINT_LENGTH = 12
+
+
+def is_unchanged(source, dest, checksum=False):
+    """Checks whether a copied static file is still up to date
+
+    Copies keep the modification time of their source, so by default files
+    of equal size and modification time are taken to be equal.
+
+    Args:
+        source (string, required): Path of the static file
+        dest (string, required): Path of its copy
+        checksum (bool, optional): Compare contents instead of modification
+            times. Defaults to False.
+
+    Returns:
+        bool: True if dest does not need to be copied again
+    """
+    try:
+        dest_stat = os.stat(dest)
+    except OSError:
+        return False
+    source_stat = os.stat(source)
+    if os.path.samestat(source_stat, dest_stat):
+        return True
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(source) == hash_file(dest)
+    return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def clone_file(source, dest):
+    """Copies a file by sharing its data on copy-on-write filesystems
+
+    Raises:
+        OSError: The filesystem cannot clone files
+    """
+    if fcntl is None:
+        raise OSError("file cloning is not supported")
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def copy_asset(source, dest, link=False):
+    """Copies a static file, replacing its old copy only once complete
+
+    The copy is a hardlink if link is set, otherwise a reflink where the
+    filesystem supports one and a copy made by the kernel where it does
+    not. Either way it keeps the source's modification time.
+
+    Args:
+        source (string, required): Path of the static file
+        dest (string, required): Path of its copy
+        link (bool, optional): Hardlink the copy to the source. Defaults to False.
+    """
+    create_directory(dest)
+    temp_path = f"{dest}.tmp"
+    try:
+        if link:
+            try:
+                os.link(source, temp_path)
+                os.replace(temp_path, dest)
+                return
+            except OSError:
+                pass
+        try:
+            clone_file(source, temp_path)
+        except OSError:
+            copy_file(source, temp_path)
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, dest)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def sync_file(source, dest, checksum=False, link=False, compressor=None):
+    # Copy a static file if its copy is missing or outdated, and bring its
+    # precompressed siblings up to date if a compressor is given
+    # Returns whether it was copied
+    if is_unchanged(source, dest, checksum):
+        if compressor is not None:
+            compressor.compress(dest, changed=False)
+        return False
+    copy_asset(source, dest, link)
+    if compressor is not None:
+        compressor.compress(dest)
+    return True
+
+
+def fingerprint_name(path, digest):
+    """Returns a file name with a content hash before its extension
+
+    Args:
+        path (string, required): The file name or path, e.g. "images/a.png"
+        digest (string, required): Hex digest of the file's contents
+
+    Returns:
+        string: The fingerprinted name, e.g. "images/a.0123456789ab.png"
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def asset_url(source, source_path):
+    # Return the root-relative URL a static file is served at
+    relative = os.path.relpath(source, source_path)
+    return "/" + relative.replace(os.sep, "/")
+
+
+def fingerprint_static(source_path, manifest=None, workers=None):
+    """Hashes every static file and returns its fingerprinted URL
+
+    Files are hashed by a pool of threads. With a manifest, the hashes of
+    files whose size and modification time are unchanged since they were
+    last hashed are reused.
+
+    Args:
+        source_path (string, required): The static directory
+        manifest (BuildManifest, optional): Record of previous hashes.
+            Defaults to None.
+        workers (int, optional): Number of hashing threads. Defaults to the
+            ThreadPoolExecutor default.
+
+    Returns:
+        dict: The root-relative URL of each static file mapped to the URL
+            of its fingerprinted copy
+    """
+    contents_list = []
+    traverse_directory(source_path, contents_list)
+    digest = manifest.asset_digest if manifest is not None else hash_file
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = list(executor.map(digest, contents_list))
+    urls = {}
+    for item, item_digest in zip(contents_list, digests):
+        url = asset_url(item, source_path)
+        urls[url] = fingerprint_name(url, item_digest)
+    return urls
+
+
+def copy_static(
+    source_path,
+    dest_path,
+    clean=True,
+    manifest=None,
+    checksum=False,
+    link=False,
+    workers=None,
+    compressor=None,
+    urls=None,
+):
+    """Brings the copies of all static files up to date
+
+    Only new and changed files are copied, by a pool of threads. Copies of
+    deleted files, and copies that were made under another name, are
+    removed when the manifest recorded them.
+
+    Args:
+        source_path (string, required): The static directory
+        dest_path (string, required): The output directory
+        clean (bool, optional): Delete the output directory first. Defaults to True.
+        manifest (BuildManifest, optional): Record of previous copies. Defaults to None.
+        checksum (bool, optional): Compare contents instead of modification
+            times. Defaults to False.
+        link (bool, optional): Hardlink copies to their sources. Defaults to False.
+        workers (int, optional): Number of copying threads. Defaults to the
+            ThreadPoolExecutor default.
+        compressor (Compressor, optional): Writes precompressed siblings of
+            the copies, on the copying threads. Defaults to None.
+        urls (dict, optional): Fingerprinted URLs, as returned by
+            fingerprint_static, to copy files to instead of their own
+            names. Defaults to None.
+
+    Returns:
+        tuple: The number of files copied and removed
+    """
+    # Get contents of source directory
+    contents_list = []
+    traverse_directory(source_path, contents_list)
+
+    # Clear destination directory
+    if clean:
+        print("Deleting docs directory...")
+        if os.path.exists(dest_path):
+            shutil.rmtree(dest_path)
+    if not os.path.exists(dest_path):
+        os.mkdir(dest_path)
+
+    # Copy new and changed files into destination, creating directories
+    # up front so that threads do not race to create them
+    print("Syncing static files to docs directory...")
+    if urls is None:
+        dests = [
+            item.replace(source_path, dest_path, 1) for item in contents_list
+        ]
+    else:
+        dests = []
+        for item in contents_list:
+            url = urls[asset_url(item, source_path)]
+            dests.append(os.path.join(dest_path, *url[1:].split("/")))
+    for dest in dests:
+        create_directory(dest)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sync = functools.partial(
+            sync_file, checksum=checksum, link=link, compressor=compressor
+        )
+        results = executor.map(sync, contents_list, dests)
+        copied = sum(results)
+
+    # Remove copies of deleted files
+    removed = 0
+    if manifest is not None:
+        for output in manifest.remove_stale_assets(contents_list):
+            remove_output(output, dest_path, "static file")
+            removed += 1
+        for item, dest in zip(contents_list, dests):
+            previous = manifest.record_asset(item, dest)
+            if previous is not None:
+                remove_output(previous, dest_path, "static file")
+                removed += 1
+    print(f"Copied {copied} and removed {removed} static file(s)")
+    return copied, removed
@@ -0,0 +1,174 @@
+import json
+import os
+from collections import OrderedDict
+
+from blocks import markdown_to_blocks
+from manifest import hash_bytes
+
+# Bump whenever block rendering changes, so fragments persisted by an older
+# version are not spliced into new builds
+BLOCK_CACHE_VERSION = 3
+DEFAULT_CAPACITY = 50000
+
+
+def hash_block(block):
+    """Returns a hex digest identifying a markdown block
+
+    Args:
+        block (string, required): The stripped block text
+
+    Returns:
+        string: A SHA-256 hex digest
+    """
+    return hash_bytes(block.encode())
+
+
+class BlockCache:
+    """A least recently used cache of rendered HTML fragments per block
+
+    Fragments are keyed by the hash of the block's markdown, so a block
+    that is unchanged since it was last rendered is reused wherever it
+    appears. Each fragment is stored along with the block's statistics, so
+    that document metadata does not need the block to be parsed again.
+
+    Attributes:
+        path: Location of the cache file on disk, or None to keep it in memory
+        capacity: Maximum number of fragments kept, or None for no limit
+        entries: An OrderedDict mapping block digests to [HTML, statistics]
+            lists, oldest first
+        added: Fragments stored since the cache was created or loaded
+        hits: Number of lookups that found a fragment
+        misses: Number of lookups that did not
+    """
+
+    def __init__(self, path=None, capacity=DEFAULT_CAPACITY, entries=None):
+        """BlockCache constructor
+
+        Args:
+            path (string, optional): Location of the cache file. Defaults to None.
+            capacity (int, optional): Maximum number of fragments. Defaults to DEFAULT_CAPACITY.
+            entries (dict, optional): Stored fragments, oldest first. Defaults to none.
+        """
+        self.path = path
+        self.capacity = capacity
+        self.entries = OrderedDict(entries or ())
+        self.added = {}
+        self.hits = 0
+        self.misses = 0
+        self.evict()
+
+    @classmethod
+    def load(cls, path, capacity=DEFAULT_CAPACITY):
+        """Reads a cache from disk
+
+        A missing, unreadable or outdated cache yields an empty one.
+
+        Args:
+            path (string, required): Location of the cache file
+            capacity (int, optional): Maximum number of fragments. Defaults to DEFAULT_CAPACITY.
+
+        Returns:
+            BlockCache: The stored cache
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path, capacity)
+        if data.get("version") != BLOCK_CACHE_VERSION:
+            return cls(path, capacity)
+        return cls(path, capacity, data.get("entries", {}))
+
+    def save(self):
+        """Writes the cache to disk atomically, if it has a path"""
+        if self.path is None:
+            return
+        data = {"version": BLOCK_CACHE_VERSION, "entries": self.entries}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, digest):
+        """Returns the fragment stored for a block, counting a hit or miss
+
+        Args:
+            digest (string, required): Hash of the block
+
+        Returns:
+            list: The rendered HTML and block statistics, or None if the
+                block is not cached
+        """
+        entry = self.entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(digest)
+        return entry
+
+    def put(self, digest, entry):
+        """Stores the fragment rendered for a block
+
+        Args:
+            digest (string, required): Hash of the block
+            entry (list, required): The rendered HTML and block statistics
+        """
+        self.entries[digest] = entry
+        self.entries.move_to_end(digest)
+        self.added[digest] = entry
+        self.evict()
+
+    def evict(self):
+        # Drop the least recently used fragments beyond capacity
+        if self.capacity is None:
+            return
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def subset(self, markdown):
+        """Returns a cache holding only the fragments a document can use
+
+        This is what gets sent along with a page to a worker process, rather
+        than the whole cache.
+
+        Args:
+            markdown (string, required): The document to be rendered
+
+        Returns:
+            BlockCache: An unbounded, in-memory cache
+        """
+        entries = {}
+        for block in markdown_to_blocks(markdown):
+            digest = hash_block(block)
+            if digest in self.entries:
+                entries[digest] = self.entries[digest]
+                self.entries.move_to_end(digest)
+        return BlockCache(capacity=None, entries=entries)
+
+    def merge(self, other):
+        """Adds the fragments stored and lookups counted by another cache
+
+        Args:
+            other (BlockCache, required): A cache returned by subset, after use
+        """
+        for digest, entry in other.added.items():
+            self.put(digest, entry)
+        self.hits += other.hits
+        self.misses += other.misses
+
+    def report(self):
+        """Returns a one-line summary of the cache's hit rate
+
+        Returns:
+            string: The hit and miss counts and the number of fragments
+        """
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"Block cache: {self.hits} hit(s), {self.misses} miss(es) "
+            f"({rate:.1%} hit rate), {len(self.entries)} fragment(s) stored"
+        )
@@ -2,6 +2,13 @@ import re
 from enum import Enum
 
 
+# Characters read at a time when splitting a file into blocks
+STREAM_CHUNK_SIZE = 1 << 16
+
+HEADING_RE = re.compile(r"#{1,6} .")
+CODE_RE = re.compile(r"```[\s\S]+```$")
+
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -12,46 +19,104 @@ class BlockType(Enum):
 
 
 def markdown_to_blocks(text):
-    blocks_list = text.split("\n\n")
-    return [block.strip() for block in blocks_list if block]
+    return list(split_blocks(text.split("\n\n")))
+
+
+def iter_blocks(fp, chunk_size=STREAM_CHUNK_SIZE):
+    """Yields the blocks of a markdown file as it is read
+
+    The file is read in chunks, so only the block being split off and one
+    chunk are held in memory at a time. Yields the same blocks as
+    markdown_to_blocks would for the whole text.
+
+    Args:
+        fp (file-like, required): A text file opened with universal newlines
+        chunk_size (int, optional): Characters read at a time. Defaults to STREAM_CHUNK_SIZE.
+
+    Yields:
+        string: Stripped, non-empty blocks
+    """
+    return split_blocks(iter_pieces(fp, chunk_size))
+
+
+def iter_pieces(fp, chunk_size):
+    # Yield the pieces of a file split on blank lines, like str.split
+    tail = ""
+    # Read at least as much as is carried over, so that a single huge block
+    # is joined in a linear number of steps
+    while chunk := fp.read(max(chunk_size, len(tail))):
+        pieces = (tail + chunk).split("\n\n")
+        tail = pieces.pop()
+        yield from pieces
+    yield tail
+
+
+def split_blocks(pieces):
+    # Strip pieces into blocks, joining back the pieces of code fences that
+    # contain blank lines. An unclosed fence runs to the end of the document.
+    fence = None
+    for piece in pieces:
+        if fence is not None:
+            fence.append(piece)
+            if piece.count("```") % 2 == 1:
+                yield "\n\n".join(fence).strip()
+                fence = None
+            continue
+        block = piece.strip()
+        if not block:
+            continue
+        if block.startswith("```") and block.count("```") % 2 == 1:
+            fence = [piece]
+            continue
+        yield block
+    if fence is not None:
+        yield "\n\n".join(fence).strip()
 
 
 def block_to_block_type(block):
-    if re.search(r"^(#{1,6} ).+", block):
-        return BlockType.HEADING
-    if re.search(r"^```[\s\S]+```$", block):
-        return BlockType.CODE
-    if block[0] == ">":
+    # Every block type but paragraphs is told apart by its first character,
+    # so each block is checked against one pattern or scanned once
+    first = block[:1]
+    if first == "#":
+        if HEADING_RE.match(block):
+            return BlockType.HEADING
+    elif first == "`":
+        if CODE_RE.match(block):
+            return BlockType.CODE
+    elif first == ">":
         if is_quote(block):
             return BlockType.QUOTE
-    if block[0:2] == "- ":
-        if is_ul(block):
+    elif first == "-":
+        if block[1:2] == " " and is_ul(block):
             return BlockType.UNORDERED_LIST
-    if block[0:3] == "1. ":
-        if is_ol(block):
+    elif first == "1":
+        if block[1:3] == ". " and is_ol(block):
             return BlockType.ORDERED_LIST
     return BlockType.PARAGRAPH
 
 
 def is_quote(block):
-    lines = [x.strip() for x in block.split("\n") if x]
-    for line in lines:
-        if line[0] != ">":
+    for line in block.split("\n"):
+        line = line.strip()
+        if line and line[0] != ">":
             return False
     return True
 
 
 def is_ul(block):
-    lines = [x.strip() for x in block.split("\n") if x]
-    for line in lines:
-        if line[0:2] != "- ":
+    # Every line of a list becomes an item, so whitespace-only lines make
+    # the block a paragraph
+    for line in block.split("\n"):
+        if line and line.strip()[0:2] != "- ":
             return False
     return True
 
 
 def is_ol(block):
-    lines = [x.strip() for x in block.split("\n") if x]
-    for i, line in enumerate(lines):
-        if line[0:3] != f"{i + 1}. ":
-            return False
+    number = 0
+    for line in block.split("\n"):
+        if line:
+            number += 1
+            if not line.strip().startswith(f"{number}. "):
+                return False
     return True
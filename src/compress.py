@@ -0,0 +1,223 @@
+import gzip
+import os
+import re
+import threading
+
+from manifest import hash_bytes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# File name suffix of the sibling written for each encoding
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+# Only text formats gain from compression; images and fonts already are
+COMPRESSIBLE = (
+    ".html",
+    ".css",
+    ".js",
+    ".mjs",
+    ".json",
+    ".svg",
+    ".txt",
+    ".xml",
+    ".map",
+)
+
+PRESERVE_RE = re.compile(
+    r"<(pre|code|textarea|script|style)\b[^>]*>.*?</\1\s*>|<!--.*?-->|<[^>]*>",
+    re.DOTALL | re.IGNORECASE,
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def minify_html(html):
+    """Collapses the whitespace between and around the text of an HTML page
+
+    Each run of whitespace becomes a single newline if it contained one and
+    a single space otherwise, which browsers render the same. Tags and
+    comments, and the contents of pre, code, textarea, script and style
+    elements, are kept as they are.
+
+    Args:
+        html (string, required): The page
+
+    Returns:
+        string: The minified page
+    """
+    parts = []
+    start = 0
+    for match in PRESERVE_RE.finditer(html):
+        parts.append(WHITESPACE_RE.sub(collapse, html[start : match.start()]))
+        parts.append(match.group())
+        start = match.end()
+    parts.append(WHITESPACE_RE.sub(collapse, html[start:]))
+    return "".join(parts).strip()
+
+
+def collapse(match):
+    # Replace a run of whitespace, keeping a line break if it had one
+    return "\n" if "\n" in match.group() else " "
+
+
+def compress_bytes(data, encoding):
+    """Returns data compressed with an encoding
+
+    Gzip output carries no timestamp, so equal data compresses to equal bytes.
+
+    Args:
+        data (bytes, required): The content to compress
+        encoding (string, required): "gzip" or "br"
+
+    Returns:
+        bytes: The compressed content
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(path):
+    """Checks whether a file is of a format worth precompressing
+
+    Args:
+        path (string, required): Path of the file
+
+    Returns:
+        bool: True if its extension is one of COMPRESSIBLE
+    """
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE
+
+
+def remove_compressed(path):
+    """Deletes the precompressed siblings of a file, if there are any
+
+    Args:
+        path (string, required): Path of the file
+    """
+    for suffix in SUFFIXES.values():
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+class Compressor:
+    """Writes precompressed siblings of output files, such as index.html.gz
+
+    Files are compressed again only when their contents changed since the
+    manifest recorded them. Compressing releases the GIL, so threads can
+    call compress in parallel.
+
+    Attributes:
+        encodings: The encodings written, each to the file name plus its suffix
+        manifest: Record of the contents last compressed, or None to
+            compress every file
+        compressed: Number of files compressed
+        skipped: Number of files whose siblings were already current
+    """
+
+    def __init__(self, encodings=("gzip",), manifest=None):
+        """Compressor constructor
+
+        Args:
+            encodings (iterable, optional): "gzip" and/or "br". Defaults to gzip only.
+            manifest (BuildManifest, optional): Record of previous
+                compressions. Defaults to None.
+
+        Raises:
+            ValueError: An encoding is unknown, or is "br" and the brotli
+                module is not installed
+        """
+        self.encodings = sorted(set(encodings))
+        for encoding in self.encodings:
+            if encoding not in SUFFIXES:
+                raise ValueError(f"unknown encoding {encoding!r}")
+            if encoding == "br" and brotli is None:
+                raise ValueError("brotli compression needs the brotli module")
+        self.manifest = manifest
+        self.compressed = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def is_current(self, path, digest=None):
+        """Checks whether a file's siblings are up to date, without reading it
+
+        Args:
+            path (string, required): Path of the file
+            digest (string, optional): Hash of its contents, if known.
+                Without one, the contents are taken to be unchanged.
+
+        Returns:
+            bool: True if every sibling exists and was compressed from the
+                recorded contents with the current encodings
+        """
+        if self.manifest is None:
+            return False
+        entry = self.manifest.compressed.get(path)
+        return (
+            entry is not None
+            and entry["encodings"] == self.encodings
+            and (digest is None or entry["hash"] == digest)
+            and all(
+                os.path.exists(path + SUFFIXES[encoding])
+                for encoding in self.encodings
+            )
+        )
+
+    def compress(self, path, data=None, changed=True):
+        """Writes the siblings of a file, unless they are up to date
+
+        Files that are not of a compressible format are ignored.
+
+        Args:
+            path (string, required): Path of the file
+            data (bytes, optional): Its contents. Defaults to reading the file.
+            changed (bool, optional): Whether the contents may have changed
+                since they were last compressed. If not, the file is only
+                read when a sibling is missing. Defaults to True.
+
+        Returns:
+            bool: True if siblings were written
+        """
+        if not is_compressible(path):
+            return False
+        if not changed and self.is_current(path):
+            with self.lock:
+                self.skipped += 1
+            return False
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        digest = hash_bytes(data)
+        if self.is_current(path, digest):
+            with self.lock:
+                self.skipped += 1
+            return False
+        for encoding in self.encodings:
+            sibling = path + SUFFIXES[encoding]
+            temp_path = f"{sibling}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(compress_bytes(data, encoding))
+            os.replace(temp_path, sibling)
+        for encoding, suffix in SUFFIXES.items():
+            if encoding not in self.encodings and os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        if self.manifest is not None:
+            self.manifest.record_compressed(path, digest, self.encodings)
+        with self.lock:
+            self.compressed += 1
+        return True
+
+    def report(self):
+        """Returns a one-line summary of the files compressed
+
+        Returns:
+            string: The number of files compressed and skipped
+        """
+        encodings = ", ".join(self.encodings)
+        return (
+            f"Compressed {self.compressed} file(s) with {encodings}, "
+            f"{self.skipped} unchanged"
+        )
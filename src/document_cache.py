@@ -0,0 +1,232 @@
+import marshal
+import os
+from collections import OrderedDict
+
+from htmlnode import LeafNode, ParentNode
+from markdown_to_html_node import Document
+from search_index import PageTerms
+
+# Bump whenever parsing or the encoding below changes, so documents cached
+# by an older version are parsed again
+DOCUMENT_CACHE_VERSION = 3
+DEFAULT_MAX_BYTES = 64 << 20
+
+LEAF = 0
+PARENT = 1
+
+
+def encode_node(node):
+    """Returns an HTML node tree as nested tuples of strings
+
+    Args:
+        node (HTMLNode, required): A LeafNode or ParentNode
+
+    Returns:
+        tuple: The node kind, tag, value or encoded children, and properties
+    """
+    props = tuple(node.props.items()) if node.props else None
+    if isinstance(node, ParentNode):
+        children = tuple(encode_node(child) for child in node.children)
+        return (PARENT, node.tag, children, props)
+    return (LEAF, node.tag, node.value, props)
+
+
+def decode_node(data):
+    """Rebuilds an HTML node tree from the tuples made by encode_node
+
+    Args:
+        data (tuple, required): An encoded node
+
+    Returns:
+        HTMLNode: The node
+    """
+    kind, tag, content, props = data
+    props = dict(props) if props else None
+    if kind == PARENT:
+        return ParentNode(tag, [decode_node(child) for child in content], props)
+    return LeafNode(tag, content, props)
+
+
+def encode_document(document):
+    """Returns a parsed document as compact bytes
+
+    Args:
+        document (Document, required): The parsed document
+
+    Returns:
+        bytes: The encoded document
+    """
+    search = document.search
+    if search is not None:
+        search = (tuple(sorted(search.terms)), search.snippet)
+    return marshal.dumps(
+        (
+            document.title,
+            tuple(document.headings),
+            document.blocks,
+            document.words,
+            document.links,
+            document.images,
+            search,
+            encode_node(document.node),
+        )
+    )
+
+
+def decode_document(data):
+    """Rebuilds a parsed document from the bytes made by encode_document
+
+    Args:
+        data (bytes, required): The encoded document
+
+    Returns:
+        Document: The parsed document
+    """
+    (
+        title,
+        headings,
+        blocks,
+        words,
+        links,
+        images,
+        search,
+        node,
+    ) = marshal.loads(data)
+    if search is not None:
+        search = PageTerms(*search)
+    document = Document(decode_node(node), search)
+    document.title = title
+    document.headings = list(headings)
+    document.blocks = blocks
+    document.words = words
+    document.links = links
+    document.images = images
+    return document
+
+
+class DocumentCache:
+    """A least recently used cache of parsed documents, kept as bytes
+
+    Documents are keyed by the hash of their source, so a page whose
+    source is unchanged is not parsed again, even when the template or
+    basepath changed. Documents are only decoded when they are used.
+
+    Attributes:
+        path: Location of the cache file on disk, or None to keep it in memory
+        max_bytes: Maximum total size of the encoded documents kept
+        entries: An OrderedDict mapping source digests to encoded
+            documents, oldest first
+        size: Total size of the encoded documents
+        hits: Number of lookups that found a document
+        misses: Number of lookups that did not
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, entries=()):
+        """DocumentCache constructor
+
+        Args:
+            path (string, optional): Location of the cache file. Defaults to None.
+            max_bytes (int, optional): Maximum total size. Defaults to DEFAULT_MAX_BYTES.
+            entries (iterable, optional): (digest, bytes) pairs, oldest first. Defaults to none.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict(entries)
+        self.size = sum(len(data) for data in self.entries.values())
+        self.hits = 0
+        self.misses = 0
+        self.evict()
+
+    @classmethod
+    def load(cls, path, max_bytes=DEFAULT_MAX_BYTES):
+        """Reads a cache from disk
+
+        A missing, unreadable or outdated cache, including one written by a
+        Python version with a different marshal format, yields an empty one.
+
+        Args:
+            path (string, required): Location of the cache file
+            max_bytes (int, optional): Maximum total size. Defaults to DEFAULT_MAX_BYTES.
+
+        Returns:
+            DocumentCache: The stored cache
+        """
+        try:
+            with open(path, "rb") as f:
+                version, marshal_version, entries = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return cls(path, max_bytes)
+        if (version, marshal_version) != (
+            DOCUMENT_CACHE_VERSION,
+            marshal.version,
+        ):
+            return cls(path, max_bytes)
+        return cls(path, max_bytes, entries)
+
+    def save(self):
+        """Writes the cache to disk atomically, if it has a path"""
+        if self.path is None:
+            return
+        data = (
+            DOCUMENT_CACHE_VERSION,
+            marshal.version,
+            tuple(self.entries.items()),
+        )
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, digest):
+        """Returns the encoded document parsed from a source, counting a hit or miss
+
+        Args:
+            digest (string, required): Hash of the source contents
+
+        Returns:
+            bytes: The encoded document, or None if it is not cached
+        """
+        data = self.entries.get(digest)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(digest)
+        return data
+
+    def put(self, digest, data):
+        """Stores the encoded document parsed from a source
+
+        Args:
+            digest (string, required): Hash of the source contents
+            data (bytes, required): The encoded document
+        """
+        old = self.entries.pop(digest, None)
+        if old is not None:
+            self.size -= len(old)
+        self.entries[digest] = data
+        self.size += len(data)
+        self.evict()
+
+    def evict(self):
+        # Drop the least recently used documents beyond the size cap
+        while self.size > self.max_bytes and self.entries:
+            _, data = self.entries.popitem(last=False)
+            self.size -= len(data)
+
+    def report(self):
+        """Returns a one-line summary of the cache's hit rate
+
+        Returns:
+            string: The hit and miss counts and the size of the cache
+        """
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"Document cache: {self.hits} hit(s), {self.misses} miss(es) "
+            f"({rate:.1%} hit rate), {len(self.entries)} document(s) in "
+            f"{self.size / 1024:.0f} KiB"
+        )
@@ -0,0 +1,99 @@
+import mmap
+import os
+import shutil
+
+# Files at least this many bytes are memory-mapped instead of read
+MMAP_THRESHOLD = 1 << 20
+# Largest number of bytes the kernel is asked to copy per call
+COPY_CHUNK = 1 << 30
+
+
+def read_file(path, threshold=MMAP_THRESHOLD):
+    """Returns the contents of a file, memory-mapping large files
+
+    A mapped file is paged in by the kernel as it is used, so hashing it or
+    deciding it is unchanged does not copy it into memory first. Mapped
+    contents support the buffer protocol, so they can be hashed and decoded
+    like bytes, and should be handed to release_file once no longer needed.
+
+    Args:
+        path (string, required): Path of the file
+        threshold (int, optional): Size from which files are mapped.
+            Defaults to MMAP_THRESHOLD.
+
+    Returns:
+        bytes or mmap.mmap: The contents of the file
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or size < threshold:
+            return f.read()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def release_file(contents):
+    # Unmap contents returned by read_file, if they were mapped
+    if isinstance(contents, mmap.mmap):
+        contents.close()
+
+
+def decode_file(contents):
+    """Returns the text of file contents, decoded as UTF-8
+
+    CRLF and CR line endings become LF, as when reading in text mode.
+
+    Args:
+        contents (bytes or mmap.mmap, required): Contents from read_file
+
+    Returns:
+        string: The decoded text
+    """
+    text = str(contents, "utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def copy_file(source, dest):
+    """Copies a file's contents within the kernel where possible
+
+    copy_file_range is tried first, which also lets filesystems share or
+    offload the copied data, then sendfile. Where neither is supported the
+    contents are copied through a buffer instead.
+
+    Args:
+        source (string, required): Path of the file to copy
+        dest (string, required): Path of the copy, created or truncated
+    """
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        size = os.fstat(src.fileno()).st_size
+        for copy in (copy_file_range, sendfile):
+            try:
+                copy(src.fileno(), dst.fileno(), size)
+                return
+            except (AttributeError, OSError):
+                # Start over where the kernel could not copy at all
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+        shutil.copyfileobj(src, dst)
+
+
+def copy_file_range(src, dst, size):
+    # Copy size bytes between file descriptors with os.copy_file_range
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(src, dst, min(size - copied, COPY_CHUNK))
+        if sent == 0:
+            break
+        copied += sent
+
+
+def sendfile(src, dst, size):
+    # Copy size bytes between file descriptors with os.sendfile
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(dst, src, copied, min(size - copied, COPY_CHUNK))
+        if sent == 0:
+            break
+        copied += sent
@@ -1,82 +1,505 @@
+import collections
+import contextlib
+import fnmatch
+import functools
 import os
-import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from markdown_to_html_node import markdown_to_html_node, extract_heading
+from compress import minify_html, remove_compressed
+from document_cache import decode_document, encode_document
+from fileio import decode_file, read_file, release_file
+from htmlnode import LeafNode
+from manifest import hash_bytes, hash_file
+from markdown_to_html_node import parse_markdown, stream_markdown
+from pipeline import StageWaits, WriteQueue, prefetch
+from profiling import NullTimer, StageTimer, start_tracing
+from search_index import PageTerms, page_url
+from template import Template
 
 
-def generate_pages(basepath, from_dir, dest_dir, template_path):
-    # Read template file
+DEFAULT_INCLUDE = ("*.md",)
+# Pages handed out per worker process ahead of the page being finished
+PAGES_PER_JOB = 4
+# Sources larger than this many bytes are parsed while being written
+# instead of being read into memory first
+STREAM_THRESHOLD = 8 << 20
+# Threads reading sources and writing pages, and the number of pages each
+# of them may queue up
+DEFAULT_IO_THREADS = 4
+QUEUE_DEPTH = 16
+
+
+class BuildError(Exception):
+    """Raised when one or more pages failed to generate
+
+    Attributes:
+        failures: A list of (source path, error message) tuples
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(f"{len(failures)} page(s) failed to generate")
+
+
+def generate_pages(
+    basepath,
+    from_dir,
+    dest_dir,
+    template_path,
+    manifest=None,
+    jobs=1,
+    profile=None,
+    variables=None,
+    block_cache=None,
+    include=DEFAULT_INCLUDE,
+    exclude=(),
+    stream_threshold=STREAM_THRESHOLD,
+    document_cache=None,
+    io_threads=DEFAULT_IO_THREADS,
+    search_index=None,
+    minify=False,
+    compressor=None,
+    urls=None,
+    images=None,
+):
+    timer = profile if profile is not None else NullTimer()
+    variables = variables or {}
+
+    # Read and compile template file, pointing root-relative URLs at the
+    # basepath and at fingerprinted assets, and adding the size of images
     with open(template_path) as template_file:
-        template = template_file.read()
-
-    # Get contents of source directory
-    source_contents = []
-    traverse_directory(from_dir, source_contents)
-
-    for item in source_contents:
-        # Check if each item is a markdown file; ignores others
-        split_text = os.path.splitext(item)
-        if split_text[1] == ".md":
-            destination = split_text[0].replace(from_dir, dest_dir, 1) + ".html"
-            create_directory(destination)
-            print(
-                f"Generating page from {item} to {destination} using {template_path}"
-            )
+        template = Template(template_file.read(), basepath, urls, images)
+    if manifest is not None:
+        manifest.use_settings(
+            template.source, basepath, variables, minify, urls, images
+        )
+
+    # Sources are hashed if pages are skipped, cached or indexed by their
+    # contents
+    hash_sources = any(
+        state is not None for state in (manifest, document_cache, search_index)
+    )
+    sources = []
+    digests = {}
+    created = set()
+    entries = {}
+
+    def document_key(digest):
+        # Documents parsed for the search index hold their terms, so they
+        # are cached apart from documents parsed without
+        return digest if search_index is None else f"{digest}:search"
+
+    def is_current(item, digest, destination):
+        # Check whether a page is unchanged since last build, and indexed
+        # from its current source if the build keeps a search index
+        if search_index is not None and not search_index.is_current(
+            item, digest
+        ):
+            return False
+        if not manifest.is_current(item, digest, destination):
+            return False
+        if compressor is not None:
+            compressor.compress(destination, changed=False)
+        return True
+
+    def discover_sources():
+        # Yield sources as they are found in the source directory
+        found = discover_files(from_dir, include, exclude)
+        while True:
+            with timer.stage("discover"):
+                item = next(found, None)
+            if item is None:
+                return
+            sources.append(item)
+            yield item
 
-            # Read markdown from file
-            with open(item) as md_file:
-                md = md_file.read()
+    def read_source(item):
+        # Return the contents of a source, or None if it is too large to be
+        # read whole, the stage totals of reading it if profiling, and an
+        # error message if it could not be read
+        # Large sources are mapped rather than read, so those found to be
+        # unchanged are hashed without being copied into memory
+        # Sources may be read on I/O threads, so the totals and errors are
+        # returned for the main thread to handle, and reads there are only
+        # timed, as tracing them would disturb the stages of the main thread
+        read_timer = NullTimer()
+        if profile is not None:
+            read_timer = StageTimer(trace=io_threads == 0)
+        try:
+            if os.path.getsize(item) > stream_threshold:
+                return None, None, None
+            with read_timer.stage("read"):
+                raw = read_file(item)
+        except OSError as e:
+            return None, None, f"{type(e).__name__}: {e}"
+        return raw, read_timer.stages, None
 
-            # Fill in template with converted contents of markdown
-            heading = extract_heading(md)
-            node = markdown_to_html_node(md)
-            html_with_heading = template.replace("{{ Title }}", heading)
-            html_with_contents = html_with_heading.replace(
-                "{{ Content }}", node.to_html()
+    def prepare_pages(read_sources):
+        # Yield pages to render from sources and their contents, unmapping
+        # each source once its page is prepared
+        # Sources that cannot be read or decoded fail their page only
+        for item, (raw, stages, error) in read_sources:
+            if stages is not None:
+                profile.add_page_stages(item, stages)
+            try:
+                if error is None:
+                    yield from prepare_page(item, raw)
+            except (OSError, UnicodeDecodeError) as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                release_file(raw)
+            if error is not None:
+                print(f"Failed to generate page from {item}: {error}")
+                failures.append((item, error))
+
+    def prepare_page(item, raw):
+        # Yield the page to render from a source, unless it can be skipped
+        destination = page_destination(item, from_dir, dest_dir)
+
+        # Very large pages are streamed by the renderer instead, and do not
+        # use the block cache, whose fragments would fill memory in turn
+        if raw is None:
+            if manifest is not None or search_index is not None:
+                digest = hash_file(item)
+                if manifest is not None and is_current(
+                    item, digest, destination
+                ):
+                    return
+                digests[item] = digest
+            create_directory(destination, created)
+            yield item, destination, None, None, None
+            return
+
+        # Skip pages unchanged since last build
+        if hash_sources:
+            digest = hash_bytes(raw)
+            if manifest is not None and is_current(item, digest, destination):
+                return
+            digests[item] = digest
+        create_directory(destination, created)
+
+        # Pages parsed by an earlier build are not parsed again
+        if document_cache is not None:
+            parsed = document_cache.get(document_key(digest))
+            if parsed is not None:
+                yield item, destination, None, None, parsed
+                return
+
+        # Send each page only the cached fragments it can use
+        md = decode_file(raw)
+        fragments = None
+        if block_cache is not None:
+            fragments = block_cache.subset(md)
+        yield item, destination, md, fragments, None
+
+    def finish_page(item, destination):
+        print(
+            f"Generating page from {item} to {destination} using {template_path}"
+        )
+        if manifest is not None:
+            manifest.record(item, digests[item], destination)
+        if search_index is not None:
+            title, terms, snippet = entries.pop(item)
+            url = page_url(destination, dest_dir)
+            search_index.update(
+                item, url, title, snippet, terms, digests[item]
             )
-            html = html_with_contents.replace(
-                'href="/', f'href="{basepath}'
-            ).replace('src="/', f'src="{basepath}')
 
-            # Write new static site to destination
-            with open(destination, "w") as dest_file:
-                dest_file.write(html)
+    # Render pages while they are found, in parallel when more than one job
+    # is requested. With I/O threads, sources are read ahead and rendered
+    # pages written behind the renderer, through bounded queues.
+    render = functools.partial(
+        render_page,
+        template=template,
+        variables=variables,
+        profile=profile is not None,
+        encode=document_cache is not None,
+        buffered=io_threads > 0,
+        index=search_index is not None,
+        minify=minify,
+    )
+    failures = []
+    waits = None
+    writes = []
+    with contextlib.ExitStack() as stack:
+        if io_threads > 0:
+            waits = StageWaits()
+            executor = stack.enter_context(ThreadPoolExecutor(io_threads))
+            read_sources = prefetch(
+                read_source, discover_sources(), executor, QUEUE_DEPTH, waits
+            )
+            writer = WriteQueue(io_threads, QUEUE_DEPTH, waits)
+            stack.callback(lambda: writes.extend(writer.close()))
+        else:
+            read_sources = (
+                (item, read_source(item)) for item in discover_sources()
+            )
+        pages = prepare_pages(read_sources)
+        for page, result in map_pages(render, pages, jobs):
+            item, destination = page[:2]
+            if result.fragments is not None:
+                block_cache.merge(result.fragments)
+            if result.encoded is not None:
+                document_cache.put(document_key(digests[item]), result.encoded)
+            if result.stages is not None:
+                profile.add_page_stages(item, result.stages)
+            if result.search is not None:
+                entries[item] = result.search
+            if result.error is not None:
+                print(f"Failed to generate page from {item}: {result.error}")
+                failures.append((item, result.error))
+            elif result.html is not None:
+                job = functools.partial(
+                    write_page, destination, result.html, compressor
+                )
+                writer.put((item, destination), job)
+            elif compressor is not None and io_threads > 0:
+                job = functools.partial(compressor.compress, destination)
+                writer.put((item, destination), job)
+            else:
+                if compressor is not None:
+                    compressor.compress(destination)
+                finish_page(item, destination)
+
+    # Finish pages once they are written
+    # Writes on I/O threads overlap with other stages, whose traced peaks
+    # they would disturb, so only their time is recorded
+    for (item, destination), error, seconds in sorted(writes):
+        if profile is not None:
+            profile.add_page_stages(item, {"write": [seconds, 0]})
+        if error is not None:
+            print(f"Failed to generate page from {item}: {error}")
+            failures.append((item, error))
+            continue
+        finish_page(item, destination)
+    if waits is not None:
+        print(waits.report())
+
+    # Remove pages whose source was deleted
+    if manifest is not None:
+        with timer.stage("cleanup"):
+            for output in manifest.remove_stale(sources):
+                remove_output(output, dest_dir)
+    if search_index is not None:
+        search_index.remove_stale(sources)
+
+    if failures:
+        raise BuildError(failures)
 
 
-def copy_static(source_path, dest_path):
-    # Get contents of source directory
-    contents_list = []
-    traverse_directory(source_path, contents_list)
+RenderResult = collections.namedtuple(
+    "RenderResult",
+    ["error", "stages", "fragments", "encoded", "html", "search"],
+)
 
-    # Clear destination directory
-    print("Deleting docs directory...")
-    if os.path.exists(dest_path):
-        shutil.rmtree(dest_path)
-    os.mkdir(dest_path)
 
-    # Copy contents of source directory into destination
-    print("Copying static files to docs directory...")
-    for item in contents_list:
-        dest = item.replace(source_path, dest_path, 1)
-        create_directory(dest)
-        shutil.copy(item, dest)
+def render_page(
+    page,
+    template,
+    variables,
+    profile=False,
+    encode=False,
+    buffered=False,
+    index=False,
+    minify=False,
+):
+    # Convert a single page and write it out, or return it if buffered
+    # Returns a RenderResult with an error message on failure, the stage
+    # timings if profiling, the page's block cache, with the fragments it
+    # rendered added, the encoded document if encode is set and the page was
+    # parsed, the page if buffered, and its title, sorted search terms and
+    # snippet if index is set
+    # Search terms are only gathered while parsing if index is set
+    # Pages are minified if minify is set, except for streamed ones
+    # Pages with an encoded document are not parsed again. Pages without
+    # either are too large to hold in memory and are parsed from their
+    # source block by block while being written, even if buffered
+    item, destination, md, fragments, parsed = page
+    timer = NullTimer()
+    if profile:
+        # Worker processes start tracing with the first page they render
+        start_tracing()
+        timer = StageTimer()
+    encoded = None
+    html = None
+    search = None
+    page_terms = PageTerms() if index else None
+    try:
+        with contextlib.ExitStack() as stack:
+            streamed = md is None and parsed is None
+            if parsed is not None:
+                with timer.stage("load"):
+                    document = decode_document(parsed)
+                node = document.node
+            elif streamed:
+                md_file = stack.enter_context(
+                    open(item, encoding="utf-8", newline=None)
+                )
+                with timer.stage("parse"):
+                    node = stream_markdown(md_file, fragments, page_terms)
+                document = node.document
+            else:
+                with timer.stage("parse"):
+                    document = parse_markdown(md, fragments, page_terms)
+                node = document.node
+                if encode:
+                    encoded = encode_document(document)
+            values = {
+                **variables,
+                "Title": document.require_title(),
+                "Content": node,
+            }
+
+            # When profiling, serialize on its own first so that it can be
+            # timed separately from filling in the template
+            if profile and not streamed:
+                with timer.stage("serialize"):
+                    values["Content"] = LeafNode(None, node.to_html())
+            if (buffered or minify) and not streamed:
+                with timer.stage("template"):
+                    html = template.render(values)
+                if minify:
+                    with timer.stage("minify"):
+                        html = minify_html(html)
+                if not buffered:
+                    with timer.stage("write"):
+                        write_text(destination, html)
+                    html = None
+            else:
+                # Stream the filled-in template to destination
+                with timer.stage("write"):
+                    write_output(
+                        destination, lambda f: template.write(f, values)
+                    )
+            if index:
+                terms = tuple(sorted(document.search.terms))
+                search = (document.title, terms, document.search.snippet)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return RenderResult(error, timer.stages, fragments, encoded, None, None)
+    return RenderResult(None, timer.stages, fragments, encoded, html, search)
+
+
+def write_output(destination, write):
+    # Write a file through a temporary sibling, replacing the old file only
+    # once the new one is complete
+    temp_path = f"{destination}.tmp"
+    try:
+        with open(temp_path, "w") as dest_file:
+            write(dest_file)
+        os.replace(temp_path, destination)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def write_text(destination, text):
+    # Write a string out as a file, as write_output does
+    write_output(destination, lambda f: f.write(text))
+
+
+def write_page(destination, html, compressor=None):
+    # Write a rendered page, then its precompressed siblings if a
+    # compressor is given
+    write_text(destination, html)
+    if compressor is not None:
+        compressor.compress(destination, html.encode())
+
+
+def page_destination(item, from_dir, dest_dir):
+    # Map a markdown source to the path of its generated page
+    return os.path.splitext(item)[0].replace(from_dir, dest_dir, 1) + ".html"
+
+
+def map_pages(render, pages, jobs):
+    # Yield each page with the result of rendering it, in the order of pages
+    # Pages may be an iterator; workers start on the first pages while later
+    # ones are still being found, and only a bounded number of pages are
+    # handed out ahead of the one being yielded
+    if jobs <= 1:
+        for page in pages:
+            yield page, render(page)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from prefetch(render, pages, executor, jobs * PAGES_PER_JOB)
 
 
 def traverse_directory(current, contents_list):
-    # Recursively traverse source directory and add all file contents to the list
-    dir_contents = os.listdir(current)
-    for item in dir_contents:
-        path = os.path.join(current, item)
-        if os.path.isfile(path):
-            contents_list.append(path)
-        else:
-            traverse_directory(path, contents_list)
+    # Add the paths of all files below a directory to the list, in sorted order
+    contents_list.extend(discover_files(current))
+
+
+def discover_files(root, include=(), exclude=()):
+    """Yields the paths of all files below a directory, in sorted order
+
+    Directories are walked with os.scandir, reusing the file types it
+    reports, and without recursion so that deep trees are no problem.
+    Patterns without a slash match file and directory names, others
+    match paths relative to root.
+
+    Args:
+        root (string, required): The directory to search
+        include (iterable, optional): Glob patterns of files to yield.
+            Defaults to yielding all files.
+        exclude (iterable, optional): Glob patterns of files and
+            directories to skip. Defaults to skipping none.
+
+    Yields:
+        string: Paths of matching files
+    """
+    stack = [(scan_sorted(root), "")]
+    while stack:
+        entries, prefix = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        relative = prefix + entry.name
+        if exclude and matches_any(relative, entry.name, exclude):
+            continue
+        if entry.is_dir():
+            stack.append((scan_sorted(entry.path), relative + "/"))
+        elif not include or matches_any(relative, entry.name, include):
+            yield entry.path
 
 
-def create_directory(destination):
-    # Recursively create directories for given file path
+def scan_sorted(directory):
+    # Return an iterator over the entries of a directory, sorted by name
+    with os.scandir(directory) as it:
+        return iter(sorted(it, key=lambda entry: entry.name))
+
+
+def matches_any(relative, name, patterns):
+    # Check a path against glob patterns, matching names for patterns
+    # without a slash and relative paths otherwise
+    for pattern in patterns:
+        target = relative if "/" in pattern else name
+        if fnmatch.fnmatchcase(target, pattern):
+            return True
+    return False
+
+
+def create_directory(destination, created=None):
+    # Create the directories for given file path
+    # Directories in created are known to exist and are not checked again
     dirname = os.path.dirname(destination)
-    if os.path.exists(dirname):
+    if created is not None and dirname in created:
         return
-    create_directory(dirname)
-    os.mkdir(dirname)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    if created is not None:
+        created.add(dirname)
+
+
+def remove_output(path, dest_dir, kind="page"):
+    # Delete a generated file and any directories it leaves empty
+    print(f"Removing stale {kind} {path}")
+    if os.path.exists(path):
+        os.remove(path)
+    remove_compressed(path)
+    dirname = os.path.dirname(path)
+    while dirname.startswith(dest_dir + os.sep):
+        if os.listdir(dirname):
+            break
+        os.rmdir(dirname)
+        dirname = os.path.dirname(dirname)
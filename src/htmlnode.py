@@ -1,19 +1,29 @@
+from types import MappingProxyType
+
+# Shared, immutable defaults so nodes without children or properties do not
+# each allocate their own empty containers
+EMPTY_CHILDREN = ()
+EMPTY_PROPS = MappingProxyType({})
+
+
 class HTMLNode:
     """Parent class for all HTML nodes"""
 
-    def __init__(self, tag=None, value=None, children=[], props={}):
+    __slots__ = ("tag", "value", "children", "props")
+
+    def __init__(self, tag=None, value=None, children=None, props=None):
         """HTMLNode constructor
 
         Args:
             tag (string, optional): An HTML tag. Defaults to None.
             value (string, optional): A text value. Defaults to None.
-            children (list, optional): A list of children of the node. Defaults to [].
-            props (dict, optional): A dictionary of HTML properties. Defaults to {}.
+            children (list, optional): A list of children of the node. Defaults to no children.
+            props (dict, optional): A dictionary of HTML properties. Defaults to no properties.
         """
         self.tag = tag
         self.value = value
-        self.children = children
-        self.props = props
+        self.children = EMPTY_CHILDREN if children is None else children
+        self.props = EMPTY_PROPS if props is None else props
 
     def to_html(self):
         """Template for child classes
@@ -25,24 +35,32 @@ class HTMLNode:
             f"child class {type(self)} must override to_html method"
         )
 
+    def write_html(self, fp):
+        """Writes the HTML of the node to a file-like object
+
+        Child classes may override this to stream their output in pieces
+        instead of building it as a single string first.
+
+        Args:
+            fp (file-like, required): An object with a write method
+        """
+        fp.write(self.to_html())
+
     def props_to_html(self):
         """Returns a formatted string of HTML properties
 
         Returns:
             string: formatted string of HTML properties
         """
-        res = ""
-        for key, val in self.props.items():
-            res += f' {key}="{val}"'
-        return res
+        return "".join(f' {key}="{val}"' for key, val in self.props.items())
 
     def __repr__(self):
         return (
             "HTMLNode "
             f'tag: "{self.tag}" '
             f'value: "{self.value}" '
-            f'children: "{self.children}" '
-            f'props: "{self.props}"'
+            f'children: "{list(self.children)}" '
+            f'props: "{dict(self.props)}"'
         )
 
 
@@ -55,15 +73,20 @@ class ParentNode(HTMLNode):
         props: A dictionary of HTML properties
     """
 
-    def __init__(self, tag, children, props={}):
+    __slots__ = ()
+
+    def __init__(self, tag, children, props=None):
         """ParentNode constructor
 
         Args:
             tag (string, required): The HTML tag
             children (list, required): A list of children.
-            props (dict, optional): A dictionary of HTML properties. Defaults to {}.
+            props (dict, optional): A dictionary of HTML properties. Defaults to no properties.
         """
-        super().__init__(tag=tag, children=children, props=props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = EMPTY_PROPS if props is None else props
 
     def to_html(self):
         """Returns an HTML formatted string from node properties
@@ -76,16 +99,30 @@ class ParentNode(HTMLNode):
         Returns:
             string: An HTML formatted string of current node and all children.
         """
+        buffer = HTMLBuffer()
+        self.write_html(buffer)
+        return "".join(buffer)
+
+    def write_html(self, fp):
+        """Writes the HTML of the node and all children to a file-like object
+           Each tag and leaf is written as a separate piece, so no
+           intermediate strings are built for nested children.
+
+        Args:
+            fp (file-like, required): An object with a write method
+
+        Raises:
+            ValueError: Parent node must have a tag.
+            ValueError: Parent node must have at least one child node.
+        """
         if not self.tag:
             raise ValueError("parent nodes must have a tag")
         if not self.children:
             raise ValueError("parent node must have at least one child")
-        props = self.props_to_html()
-        res = f"<{self.tag}{props}>"
+        fp.write(f"<{self.tag}{self.props_to_html()}>")
         for child in self.children:
-            res += child.to_html()
-        res += f"</{self.tag}>"
-        return res
+            child.write_html(fp)
+        fp.write(f"</{self.tag}>")
 
 
 class LeafNode(HTMLNode):
@@ -97,15 +134,20 @@ class LeafNode(HTMLNode):
         props: A dictionary of properties. Default is empty dictionary.
     """
 
-    def __init__(self, tag, value, props={}):
+    __slots__ = ()
+
+    def __init__(self, tag, value, props=None):
         """LeafNode constructor
 
         Args:
             tag (string, required): The HTML tag
             value (string, required): The text value
-            props (dict, optional): A dictionary of properties. Defaults to {}.
+            props (dict, optional): A dictionary of properties. Defaults to no properties.
         """
-        super().__init__(tag=tag, value=value, props=props)
+        self.tag = tag
+        self.value = value
+        self.children = EMPTY_CHILDREN
+        self.props = EMPTY_PROPS if props is None else props
 
     def to_html(self):
         """Returns a formatted HTML string using node properties.
@@ -122,3 +164,11 @@ class LeafNode(HTMLNode):
             return self.value
         props = self.props_to_html()
         return f"<{self.tag}{props}>{self.value}</{self.tag}>"
+
+
+class HTMLBuffer(list):
+    """A list of HTML pieces that can be written to like a file"""
+
+    __slots__ = ()
+
+    write = list.append
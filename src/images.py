@@ -0,0 +1,382 @@
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from assets import asset_url
+from generate_site import create_directory, remove_output, traverse_directory
+from manifest import hash_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_CACHE_VERSION = 1
+IMAGE_EXTENSIONS = {".gif", ".jpeg", ".jpg", ".png", ".webp"}
+# Widths of the downscaled variants made of images wider than them
+VARIANT_WIDTHS = (480, 960, 1600)
+# Bytes read to identify an image and, for all but JPEG, find its size
+HEADER_SIZE = 32
+# JPEG start of frame markers, which hold the image size
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def probe_size(path):
+    """Returns the size of a PNG, GIF, WebP or JPEG image from its headers
+
+    Only the headers are read, never the image data.
+
+    Args:
+        path (string, required): Path of the image
+
+    Returns:
+        tuple: The (width, height) of the image in pixels, or None if the
+            file is not an image of a known format
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if header.startswith(b"\xff\xd8"):
+            f.seek(2)
+            return probe_jpeg(f)
+    return probe_header(header)
+
+
+def probe_header(header):
+    # Return the (width, height) held in the opening bytes of a PNG, GIF or
+    # WebP image, or None
+    if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+        return struct.unpack(">II", header[16:24])
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", header[6:10])
+    if header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+        return None
+    chunk = header[12:16]
+    if chunk == b"VP8 " and len(header) >= 30:
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(header) >= 25:
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(header) >= 30:
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def probe_jpeg(f):
+    # Return the (width, height) of a JPEG image from its start of frame
+    # segment, skipping the segments before it, or None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # Markers may be padded with any number of 0xFF bytes
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+            if len(marker) < 2:
+                return None
+        if 0xD0 <= marker[1] <= 0xD9 or marker[1] == 0x01:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if marker[1] in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def variant_name(path, width):
+    """Returns the name of an image's variant downscaled to a width
+
+    Args:
+        path (string, required): The URL or path of the image, e.g.
+            "/images/a.png"
+        width (int, required): The width of the variant in pixels
+
+    Returns:
+        string: The URL or path of the variant, e.g. "/images/a.480w.png"
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{width}w{ext}"
+
+
+def check_widths(widths):
+    """Checks that variants of the given widths can be made
+
+    Args:
+        widths (iterable, required): Widths of the variants to make
+
+    Raises:
+        ValueError: Variants are requested but the Pillow module is not
+            installed
+    """
+    if widths and Image is None:
+        raise ValueError("image variants need the Pillow module")
+
+
+def variant_widths(width, widths):
+    # Return the widths of the variants to make of an image of a width
+    return sorted(w for w in set(widths) if w < width)
+
+
+def process_image(source, dest, widths):
+    # Probe the size of an image and write the variants of the given widths
+    # it is wider than next to its copy at dest
+    # Returns its size, or None if it could not be probed, and the widths of
+    # the variants written
+    size = probe_size(source)
+    if size is None:
+        return None, []
+    width, height = size
+    made = variant_widths(width, widths)
+    if not made:
+        return size, []
+    with Image.open(source) as image:
+        for variant_width in made:
+            variant_height = max(1, round(height * variant_width / width))
+            resized = image.resize(
+                (variant_width, variant_height), Image.Resampling.LANCZOS
+            )
+            variant = variant_name(dest, variant_width)
+            create_directory(variant)
+            temp_path = f"{variant}.tmp"
+            resized.save(temp_path, format=image.format)
+            os.replace(temp_path, variant)
+    return size, made
+
+
+def image_attributes(images, basepath="/"):
+    """Returns the attributes to add to the img tags of each image
+
+    Args:
+        images (dict, required): Image URLs mapped to their information, as
+            returned by ImageCache.process
+        basepath (string, optional): The URL prefix of the site. Defaults to "/".
+
+    Returns:
+        dict: The root-relative URL of each image, as written in pages,
+            mapped to HTML of its width, height, srcset and sizes attributes
+    """
+    attributes = {}
+    for url, info in images.items():
+        html = f' width="{info["width"]}" height="{info["height"]}"'
+        if len(info["srcset"]) > 1:
+            srcset = ", ".join(
+                f"{basepath}{src[1:]} {width}w"
+                for src, width in info["srcset"]
+            )
+            html += (
+                f' srcset="{srcset}"'
+                f' sizes="(max-width: {info["width"]}px) 100vw, '
+                f'{info["width"]}px"'
+            )
+        attributes[url] = html
+    return attributes
+
+
+class ImageCache:
+    """A persistent record of image sizes and variants, by image contents
+
+    Images whose contents were processed before are not probed or
+    downscaled again, as long as their variants still exist.
+
+    Attributes:
+        path: Location of the cache file on disk
+        entries: A dictionary mapping image hashes to their size and the
+            widths of the variants made of them
+        outputs: A dictionary mapping image paths to the paths of their
+            variants
+        processed: Number of images probed or downscaled by the last process
+        reused: Number of images found in the cache by the last process
+    """
+
+    def __init__(self, path, entries=None, outputs=None):
+        """ImageCache constructor
+
+        Args:
+            path (string, required): Location of the cache file on disk.
+            entries (dict, optional): Recorded images. Defaults to an empty dictionary.
+            outputs (dict, optional): Written variants. Defaults to an empty dictionary.
+        """
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self.outputs = outputs if outputs is not None else {}
+        self.processed = 0
+        self.reused = 0
+
+    @classmethod
+    def load(cls, path):
+        """Reads an image cache from disk
+
+        A missing, unreadable or outdated cache yields an empty one.
+
+        Args:
+            path (string, required): Location of the cache file
+
+        Returns:
+            ImageCache: The stored cache
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != IMAGE_CACHE_VERSION:
+            return cls(path)
+        return cls(path, data.get("entries", {}), data.get("outputs", {}))
+
+    def save(self):
+        """Writes the cache to disk atomically"""
+        data = {
+            "version": IMAGE_CACHE_VERSION,
+            "entries": self.entries,
+            "outputs": self.outputs,
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def process(
+        self,
+        source_path,
+        dest_path,
+        widths=(),
+        urls=None,
+        manifest=None,
+        jobs=1,
+    ):
+        """Probes the size of every static image and makes its variants
+
+        Images are processed by a pool of jobs processes. Variants are
+        written next to the copy of their image, and variants no longer
+        made are removed.
+
+        Args:
+            source_path (string, required): The static directory
+            dest_path (string, required): The output directory
+            widths (iterable, optional): Widths of the variants to make of
+                images wider than them. Defaults to making none.
+            urls (dict, optional): Fingerprinted URLs of the static files,
+                as returned by fingerprint_static. Defaults to None.
+            manifest (BuildManifest, optional): Record of previous hashes
+                of static files. Defaults to None.
+            jobs (int, optional): Number of processes. Defaults to 1, which
+                processes images in this process.
+
+        Raises:
+            ValueError: Variants are requested but the Pillow module is
+                not installed
+
+        Returns:
+            dict: The root-relative URL of each image mapped to a dict of
+                its "width", "height" and "srcset", a list of (URL, width)
+                pairs of its variants and itself, narrowest first
+        """
+        check_widths(widths)
+        contents_list = []
+        traverse_directory(source_path, contents_list)
+        sources = [
+            item
+            for item in contents_list
+            if os.path.splitext(item)[1].lower() in IMAGE_EXTENSIONS
+        ]
+        digest = manifest.asset_digest if manifest is not None else hash_file
+        self.processed = self.reused = 0
+
+        # Find the images whose size is not known yet, or whose variants
+        # are missing
+        found = []
+        pending = []
+        for source in sources:
+            url = asset_url(source, source_path)
+            copy_url = urls[url] if urls is not None else url
+            dest = os.path.join(dest_path, *copy_url[1:].split("/"))
+            source_digest = digest(source)
+            found.append((source, url, copy_url, dest, source_digest))
+            entry = self.entries.get(source_digest)
+            if entry is None:
+                pending.append((source, dest, source_digest, list(widths)))
+                continue
+            missing = []
+            if entry["size"] is not None:
+                for width in variant_widths(entry["size"][0], widths):
+                    variant = variant_name(dest, width)
+                    if width not in entry["variants"] or not os.path.exists(
+                        variant
+                    ):
+                        missing.append(width)
+            if missing:
+                pending.append((source, dest, source_digest, missing))
+            else:
+                self.reused += 1
+        for (_, _, source_digest, _), (size, made) in zip(
+            pending, self.run(pending, jobs)
+        ):
+            entry = self.entries.get(source_digest, {"variants": []})
+            entry["size"] = size
+            entry["variants"] = sorted(set(entry["variants"]) | set(made))
+            self.entries[source_digest] = entry
+        self.processed = len(pending)
+
+        # Describe each image, and remove variants no longer made
+        images = {}
+        for source, url, copy_url, dest, source_digest in found:
+            size = self.entries[source_digest]["size"]
+            made = variant_widths(size[0], widths) if size is not None else []
+            self.remove_outputs(
+                source, dest_path, [variant_name(dest, w) for w in made]
+            )
+            if size is None:
+                continue
+            srcset = [(variant_name(copy_url, w), w) for w in made]
+            srcset.append((copy_url, size[0]))
+            width, height = size
+            images[url] = {"width": width, "height": height, "srcset": srcset}
+        for source in set(self.outputs) - set(sources):
+            self.remove_outputs(source, dest_path, [])
+        live = {entry[4] for entry in found}
+        for source_digest in set(self.entries) - live:
+            del self.entries[source_digest]
+        return images
+
+    def run(self, pending, jobs):
+        # Return the result of process_image on each pending image, using a
+        # pool of processes if jobs is more than 1
+        if jobs <= 1 or len(pending) <= 1:
+            return [
+                process_image(source, dest, widths)
+                for source, dest, _, widths in pending
+            ]
+        sources, dests, _, widths = zip(*pending)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(process_image, sources, dests, widths))
+
+    def remove_outputs(self, source, dest_path, outputs):
+        # Remove the variants of an image that are not among outputs, and
+        # record outputs as its variants
+        for output in self.outputs.pop(source, []):
+            if output not in outputs:
+                remove_output(output, dest_path, "image variant")
+        if outputs:
+            self.outputs[source] = outputs
+
+    def clear(self, dest_path):
+        """Removes every recorded variant and forgets every image
+
+        Args:
+            dest_path (string, required): The output directory
+        """
+        for source in list(self.outputs):
+            self.remove_outputs(source, dest_path, [])
+        self.entries.clear()
+
+    def report(self):
+        """Returns a one line summary of the last process"""
+        return f"Images: {self.processed} processed, {self.reused} unchanged"
@@ -1,25 +1,388 @@
+import argparse
+import cProfile
+import os
 import sys
-from generate_site import generate_pages, copy_static
+from block_cache import BlockCache
+from compress import Compressor, remove_compressed
+from document_cache import DocumentCache
+from assets import copy_static, fingerprint_static
+from generate_site import (
+    DEFAULT_INCLUDE,
+    DEFAULT_IO_THREADS,
+    BuildError,
+    generate_pages,
+)
+from images import (
+    VARIANT_WIDTHS,
+    ImageCache,
+    check_widths,
+    image_attributes,
+)
+from manifest import BuildManifest
+from profiling import BuildProfile, NullTimer, start_tracing
+from search_index import SearchIndex, remove_index
+from watch import SiteWatcher, make_watcher
 
 STATIC_DIRECTORY = "static"
 DESTINATION_DIRECTORY = "docs"
 CONTENT_DIRECTORY = "content"
 TEMPLATE_PATH = "template.html"
+MANIFEST_PATH = ".build-manifest.json"
+BLOCK_CACHE_PATH = ".block-cache.json"
+DOCUMENT_CACHE_PATH = ".document-cache"
+SEARCH_INDEX_PATH = ".search-index.json"
+SEARCH_DIRECTORY = "search"
+IMAGE_CACHE_PATH = ".image-cache.json"
+
+
+def parse_variable(text):
+    name, sep, value = text.partition("=")
+    if not sep or not name.isidentifier():
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    return name, value
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generate a static site from markdown content."
+    )
+    parser.add_argument(
+        "basepath", nargs="?", default="/", help="URL prefix of the site"
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="delete the output directory and rebuild every page",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes rendering pages (0 uses every CPU)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=DEFAULT_IO_THREADS,
+        metavar="N",
+        help="threads reading sources and writing pages while others render "
+        f"(default: {DEFAULT_IO_THREADS}, 0 reads and writes in line)",
+    )
+    parser.add_argument(
+        "--var",
+        action="append",
+        default=[],
+        type=parse_variable,
+        metavar="NAME=VALUE",
+        help="fill the {{ NAME }} template placeholder with VALUE",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="only generate pages from content files matching GLOB "
+        "(default: *.md)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="skip content files and directories matching GLOB",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content instead of size and mtime",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="hardlink static files into the output instead of copying them",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="parse every page again and keep no caches between builds",
+    )
+    parser.add_argument(
+        "--no-block-cache",
+        action="store_true",
+        help="keep rendered blocks in memory only, not between builds",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy static files to names holding a hash of their contents, "
+        "and point page links and sources at them",
+    )
+    parser.add_argument(
+        "--image-sizes",
+        action="store_true",
+        help="add the width and height of static images to the img tags "
+        "showing them",
+    )
+    parser.add_argument(
+        "--image-variants",
+        action="store_true",
+        help="also write downscaled copies of wide static images and list "
+        "them in srcset attributes (needs the Pillow module)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="collapse whitespace in generated pages, outside of pre and code",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="write a precompressed .gz copy of each page and text asset",
+    )
+    parser.add_argument(
+        "--brotli",
+        action="store_true",
+        help="write a precompressed .br copy of each page and text asset "
+        "(needs the brotli module)",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help=f"write a search index of every page to "
+        f"{DESTINATION_DIRECTORY}/{SEARCH_DIRECTORY}",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild pages as their sources change",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report time and memory allocated per build stage and per page, "
+        "traced with tracemalloc, which slows allocations down (with "
+        "--io-threads, amounts are approximate and reads and writes record "
+        "none)",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        help="also save cProfile statistics of the build to PATH",
+    )
+    return parser.parse_args()
 
 
 def main():
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1] if sys.argv != "" else "/"
-        
+    args = parse_args()
+    if (args.minify or args.gzip or args.brotli) and args.watch:
+        sys.exit(
+            "Error: --minify, --gzip and --brotli cannot be combined with "
+            "--watch"
+        )
+    if args.search_index and args.watch:
+        sys.exit("Error: --search-index cannot be combined with --watch")
+    if args.fingerprint and args.watch:
+        sys.exit("Error: --fingerprint cannot be combined with --watch")
+    if (args.image_sizes or args.image_variants) and args.watch:
+        sys.exit("Error: image sizes cannot be combined with --watch")
+    basepath = args.basepath or "/"
+    jobs = args.jobs or os.cpu_count() or 1
+    include = args.include or DEFAULT_INCLUDE
+
+    profile = None
+    if args.profile:
+        profile = BuildProfile()
+        start_tracing()
+    timer = profile if profile is not None else NullTimer()
+    profiler = None
+    if args.profile_output:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # Pages unchanged since the last build are skipped
+    if args.clean:
+        manifest = BuildManifest(MANIFEST_PATH)
+    else:
+        manifest = BuildManifest.load(MANIFEST_PATH)
+
+    # Blocks unchanged since they were last rendered are reused
+    persist_blocks = not (args.no_block_cache or args.no_cache)
+    block_cache_path = BLOCK_CACHE_PATH if persist_blocks else None
+    if args.clean or not persist_blocks:
+        block_cache = BlockCache(block_cache_path)
+    else:
+        block_cache = BlockCache.load(block_cache_path)
+
+    # Pages unchanged since they were last parsed are not parsed again
+    document_cache = None
+    if args.clean and not args.no_cache:
+        document_cache = DocumentCache(DOCUMENT_CACHE_PATH)
+    elif not args.no_cache:
+        document_cache = DocumentCache.load(DOCUMENT_CACHE_PATH)
+
+    # Only pages that changed are indexed again
+    search_index = None
+    if args.search_index and args.clean:
+        search_index = SearchIndex(SEARCH_INDEX_PATH)
+    elif args.search_index:
+        search_index = SearchIndex.load(SEARCH_INDEX_PATH)
+    else:
+        # The index of an earlier build is removed once no longer requested
+        remove_index(os.path.join(DESTINATION_DIRECTORY, SEARCH_DIRECTORY))
+        if os.path.exists(SEARCH_INDEX_PATH):
+            os.remove(SEARCH_INDEX_PATH)
+
+    # Precompressed copies are only made again for files whose contents
+    # changed, and are removed when no longer requested
+    encodings = ["gzip"] * args.gzip + ["br"] * args.brotli
+    compressor = None
+    if encodings:
+        try:
+            compressor = Compressor(encodings, manifest)
+        except ValueError as e:
+            sys.exit(f"Error: {e}")
+    else:
+        for path in manifest.compressed:
+            remove_compressed(path)
+        manifest.compressed.clear()
+
+    # Static files are copied to names holding their hash, so they can be
+    # cached for long; only files whose size or mtime changed are hashed
+    urls = None
+    if args.fingerprint:
+        with timer.stage("fingerprint"):
+            urls = fingerprint_static(STATIC_DIRECTORY, manifest)
+
+    # Images are only probed and downscaled if their contents changed
+    image_cache = None
+    widths = VARIANT_WIDTHS if args.image_variants else ()
+    if args.image_sizes or args.image_variants:
+        try:
+            check_widths(widths)
+        except ValueError as e:
+            sys.exit(f"Error: {e}")
+        if args.clean:
+            image_cache = ImageCache(IMAGE_CACHE_PATH)
+        else:
+            image_cache = ImageCache.load(IMAGE_CACHE_PATH)
+    else:
+        # Variants made by earlier builds are removed once no longer
+        # requested
+        stale_images = ImageCache.load(IMAGE_CACHE_PATH)
+        if stale_images.entries or stale_images.outputs:
+            stale_images.clear(DESTINATION_DIRECTORY)
+            stale_images.save()
+
     # Copy files from static directory to public directory
-    copy_static(STATIC_DIRECTORY, DESTINATION_DIRECTORY)
+    with timer.stage("copy_static"):
+        copy_static(
+            STATIC_DIRECTORY,
+            DESTINATION_DIRECTORY,
+            clean=args.clean,
+            manifest=manifest,
+            checksum=args.checksum,
+            link=args.link_static,
+            compressor=compressor,
+            urls=urls,
+        )
+
+    # Probe and downscale images by a pool of processes, once they have
+    # been copied
+    images = None
+    if image_cache is not None:
+        with timer.stage("images"):
+            found = image_cache.process(
+                STATIC_DIRECTORY,
+                DESTINATION_DIRECTORY,
+                widths,
+                urls=urls,
+                manifest=manifest,
+                jobs=jobs,
+            )
+        image_cache.save()
+        print(image_cache.report())
+        images = image_attributes(found, basepath)
 
     # Generate pages from markdown and template
     print("Generating content...")
-    generate_pages(
-        basepath, CONTENT_DIRECTORY, DESTINATION_DIRECTORY, TEMPLATE_PATH
-    )
+    try:
+        generate_pages(
+            basepath,
+            CONTENT_DIRECTORY,
+            DESTINATION_DIRECTORY,
+            TEMPLATE_PATH,
+            manifest=manifest,
+            jobs=jobs,
+            profile=profile,
+            variables=dict(args.var),
+            block_cache=block_cache,
+            include=include,
+            exclude=args.exclude,
+            document_cache=document_cache,
+            io_threads=args.io_threads,
+            search_index=search_index,
+            minify=args.minify,
+            compressor=compressor,
+            urls=urls,
+            images=images,
+        )
+    except BuildError as e:
+        print(f"Error: {e}")
+        if not args.watch:
+            sys.exit(1)
+    finally:
+        block_cache.save()
+        print(block_cache.report())
+        if document_cache is not None:
+            document_cache.save()
+            print(document_cache.report())
+        if search_index is not None:
+            search_directory = os.path.join(
+                DESTINATION_DIRECTORY, SEARCH_DIRECTORY
+            )
+            with timer.stage("search_index"):
+                written = search_index.write(search_directory, basepath)
+            search_index.save()
+            print(
+                f"Search index: {len(search_index.pages)} page(s), "
+                f"{written} shard(s) written"
+            )
+            if compressor is not None:
+                with os.scandir(search_directory) as entries:
+                    for entry in entries:
+                        compressor.compress(entry.path)
+        if compressor is not None:
+            print(compressor.report())
+        manifest.save()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_output)
+            print(f"Saved cProfile statistics to {args.profile_output}")
+        if profile is not None:
+            print()
+            print(profile.report())
+
+    # Keep the site up to date until interrupted
+    if args.watch:
+        site = SiteWatcher(
+            basepath,
+            STATIC_DIRECTORY,
+            CONTENT_DIRECTORY,
+            DESTINATION_DIRECTORY,
+            TEMPLATE_PATH,
+            manifest=manifest,
+            variables=dict(args.var),
+            block_cache=block_cache,
+            link_static=args.link_static,
+            include=include,
+            exclude=args.exclude,
+            document_cache=document_cache,
+        )
+        site.load()
+        watcher = make_watcher(
+            [CONTENT_DIRECTORY, STATIC_DIRECTORY], [TEMPLATE_PATH]
+        )
+        site.run(watcher)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+
+from fileio import read_file, release_file
+
+MANIFEST_VERSION = 1
+# Bump whenever page rendering changes, so pages generated by an older
+# version are generated again
+RENDER_VERSION = 1
+
+
+def hash_bytes(data):
+    """Returns a hex digest identifying the given bytes
+
+    Args:
+        data (bytes, required): The content to hash
+
+    Returns:
+        string: A SHA-256 hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """Returns a hex digest of a file's contents
+
+    Large files are hashed straight from a memory mapping.
+
+    Args:
+        path (string, required): Path of the file to hash
+
+    Returns:
+        string: A SHA-256 hex digest
+    """
+    contents = read_file(path)
+    try:
+        return hash_bytes(contents)
+    finally:
+        release_file(contents)
+
+
+class BuildManifest:
+    """A persistent record of the inputs each generated page was built from
+
+    Attributes:
+        path: Location of the manifest file on disk
+        settings: Digest of the template and basepath used for the last build
+        pages: A dictionary mapping source paths to their hash and output path
+        assets: A dictionary mapping static file paths to their copied path
+        compressed: A dictionary mapping output paths to the hash of the
+            contents their precompressed siblings were made from, and the
+            encodings used
+        digests: A dictionary mapping static file paths to their hash, and
+            the size and modification time it was computed at
+    """
+
+    def __init__(
+        self,
+        path,
+        settings=None,
+        pages=None,
+        assets=None,
+        compressed=None,
+        digests=None,
+    ):
+        """BuildManifest constructor
+
+        Args:
+            path (string, required): Location of the manifest file on disk.
+            settings (string, optional): Digest of the build settings. Defaults to None.
+            pages (dict, optional): Recorded pages. Defaults to an empty dictionary.
+            assets (dict, optional): Copied static files. Defaults to an empty dictionary.
+            compressed (dict, optional): Precompressed outputs. Defaults to an empty dictionary.
+            digests (dict, optional): Hashes of static files. Defaults to an empty dictionary.
+        """
+        self.path = path
+        self.settings = settings
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else {}
+        self.compressed = compressed if compressed is not None else {}
+        self.digests = digests if digests is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """Reads a manifest from disk
+
+        A missing, unreadable or outdated manifest yields an empty one, so
+        the next build regenerates every page.
+
+        Args:
+            path (string, required): Location of the manifest file
+
+        Returns:
+            BuildManifest: The stored manifest
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(
+            path,
+            data.get("settings"),
+            data.get("pages", {}),
+            data.get("assets", {}),
+            data.get("compressed", {}),
+            data.get("digests", {}),
+        )
+
+    def save(self):
+        """Writes the manifest to disk atomically"""
+        data = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "pages": self.pages,
+            "assets": self.assets,
+            "compressed": self.compressed,
+            "digests": self.digests,
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def use_settings(
+        self,
+        template,
+        basepath,
+        variables=None,
+        minify=False,
+        urls=None,
+        images=None,
+    ):
+        """Records the template, basepath, template variables, output
+        options, asset URLs and image attributes for this build
+
+        Every recorded page is forgotten when any of them, or the
+        RENDER_VERSION, changed since the last build, as all pages depend
+        on them.
+
+        Args:
+            template (string, required): The page template contents
+            basepath (string, required): The site basepath
+            variables (dict, optional): Extra template values. Defaults to None.
+            minify (bool, optional): Whether pages are minified. Defaults to False.
+            urls (dict, optional): Fingerprinted asset URLs. Defaults to None.
+            images (dict, optional): Image attributes. Defaults to None.
+        """
+        settings = [RENDER_VERSION, basepath, template, variables or {}]
+        if urls or images:
+            settings.append(urls or {})
+        if images:
+            settings.append(images)
+        settings = json.dumps(settings, sort_keys=True)
+        if minify:
+            settings += " minify"
+        digest = hash_bytes(settings.encode())
+        if digest != self.settings:
+            self.settings = digest
+            for entry in self.pages.values():
+                entry["hash"] = None
+
+    def is_current(self, source, digest, destination):
+        """Checks whether a page can be reused from the previous build
+
+        Args:
+            source (string, required): Path of the markdown source
+            digest (string, required): Hash of the source contents
+            destination (string, required): Path of the generated page
+
+        Returns:
+            bool: True if the page is unchanged and its output still exists
+        """
+        entry = self.pages.get(source)
+        return (
+            entry is not None
+            and entry["hash"] == digest
+            and entry["output"] == destination
+            and os.path.exists(destination)
+        )
+
+    def record(self, source, digest, destination):
+        """Records a generated page
+
+        Args:
+            source (string, required): Path of the markdown source
+            digest (string, required): Hash of the source contents
+            destination (string, required): Path of the generated page
+        """
+        self.pages[source] = {"hash": digest, "output": destination}
+
+    def remove_stale(self, sources):
+        """Forgets pages whose source no longer exists
+
+        Args:
+            sources (iterable, required): Paths of all current sources
+
+        Returns:
+            list: Output paths of the forgotten pages
+        """
+        current = set(sources)
+        stale = [source for source in self.pages if source not in current]
+        outputs = [self.pages.pop(source)["output"] for source in stale]
+        for output in outputs:
+            self.compressed.pop(output, None)
+        return outputs
+
+    def record_asset(self, source, destination):
+        """Records a copied static file
+
+        Args:
+            source (string, required): Path of the static file
+            destination (string, required): Path of its copy
+
+        Returns:
+            string: Path of its previous copy if that was made elsewhere,
+                such as under an older fingerprint, or None
+        """
+        previous = self.assets.get(source)
+        self.assets[source] = destination
+        if previous is None or previous == destination:
+            return None
+        self.compressed.pop(previous, None)
+        return previous
+
+    def asset_digest(self, source):
+        """Returns the hash of a static file, reusing the recorded one if the
+        file's size and modification time are unchanged
+
+        Args:
+            source (string, required): Path of the static file
+
+        Returns:
+            string: A SHA-256 hex digest
+        """
+        stat = os.stat(source)
+        entry = self.digests.get(source)
+        if (
+            entry is not None
+            and entry["mtime"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            return entry["hash"]
+        digest = hash_file(source)
+        self.digests[source] = {
+            "hash": digest,
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+        return digest
+
+    def remove_stale_assets(self, sources):
+        """Forgets static files that no longer exist
+
+        Args:
+            sources (iterable, required): Paths of all current static files
+
+        Returns:
+            list: Paths of the forgotten copies
+        """
+        current = set(sources)
+        stale = [source for source in self.assets if source not in current]
+        outputs = [self.assets.pop(source) for source in stale]
+        for source in stale:
+            self.digests.pop(source, None)
+        for output in outputs:
+            self.compressed.pop(output, None)
+        return outputs
+
+    def record_compressed(self, path, digest, encodings):
+        """Records the precompressed siblings written for an output file
+
+        Args:
+            path (string, required): Path of the output file
+            digest (string, required): Hash of the contents compressed
+            encodings (list, required): The encodings written
+        """
+        self.compressed[path] = {"hash": digest, "encodings": list(encodings)}
@@ -1,49 +1,298 @@
-from htmlnode import ParentNode
+import itertools
+
+from htmlnode import EMPTY_CHILDREN, LeafNode, ParentNode
 from textnode import (
     TextType,
     TextNode,
+    inline_tokens,
     text_node_to_html_node,
     text_to_textnodes,
+    tokens_to_html,
+)
+from blocks import (
+    BlockType,
+    block_to_block_type,
+    iter_blocks,
+    markdown_to_blocks,
 )
-from blocks import BlockType, markdown_to_blocks, block_to_block_type
+from block_cache import hash_block
 
 
-def markdown_to_html_node(markdown):
-    blocks_list = markdown_to_blocks(markdown)
-    nodes_list = blocks_to_nodes(blocks_list)
+def markdown_to_html_node(markdown, cache=None):
+    nodes_list = blocks_to_nodes(markdown_to_blocks(markdown), cache)
     return ParentNode("div", nodes_list)
 
 
-def blocks_to_nodes(blocks_list):
+def parse_markdown(markdown, cache=None, search=None):
+    """Parses a markdown document into its node tree and metadata
+
+    Args:
+        markdown (string, required): The document
+        cache (BlockCache, optional): Rendered blocks to reuse. Defaults to None.
+        search (PageTerms, optional): Gathers search terms. Defaults to None.
+
+    Returns:
+        Document: The parsed document
+    """
+    document = Document(search=search)
     nodes_list = []
-    for block in blocks_list:
+    for node, stats in iter_parsed(markdown_to_blocks(markdown), cache):
+        nodes_list.append(node)
+        document.add_block(stats)
+    document.node = ParentNode("div", nodes_list)
+    return document
+
+
+def blocks_to_nodes(blocks_list, cache=None):
+    return list(iter_nodes(blocks_list, cache))
+
+
+def iter_nodes(blocks, cache=None):
+    # Yield the node of each block
+    # Blocks found in the cache are spliced in as already rendered HTML
+    if cache is None:
+        yield from map(block_to_node, blocks)
+        return
+    for node, _ in iter_parsed(blocks, cache):
+        yield node
+
+
+def iter_parsed(blocks, cache=None):
+    # Yield the HTML of each block as a LeafNode, with its statistics
+    # No nodes are built for the contents of blocks, which are rendered
+    # straight to HTML, or reused from the cache
+    if cache is None:
+        for block in blocks:
+            html, stats = parse_block(block)
+            yield LeafNode(None, html), stats
+        return
+    for block in blocks:
+        digest = hash_block(block)
+        entry = cache.get(digest)
+        if entry is None:
+            entry = list(parse_block(block))
+            cache.put(digest, entry)
+        yield LeafNode(None, entry[0]), entry[1]
+
+
+def parse_block(block):
+    # Return the HTML of a block and its statistics: the [level, text] of a
+    # heading, or None, followed by its number of words, links and images
+    # and its plain text
+    block_type = block_to_block_type(block)
+    tokens = []
+    html = block_to_html(block, block_type, tokens)
+    heading = None
+    if block_type == BlockType.HEADING:
+        text, level = strip_heading(block)
+        heading = [level, text]
+    words = links = images = 0
+    texts = []
+    for text, text_type, _ in tokens:
+        if text_type is TextType.IMAGE:
+            images += 1
+            continue
+        if text_type is TextType.LINK:
+            links += 1
+        if text:
+            words += len(text.split())
+            texts.append(text)
+    return html, [heading, words, links, images, " ".join(texts)]
+
+
+class Document:
+    """A parsed markdown document and the metadata gathered while parsing
+
+    Attributes:
+        node: The ParentNode of the document, or None until it is parsed
+        title: The text of the level 1 heading opening the document, or None
+        headings: A list of (level, text) tuples of all headings in order
+        blocks: The number of blocks
+        words: The number of words of text, code and link labels
+        links: The number of links
+        images: The number of images
+        search: The PageTerms gathering the document's search terms and
+            snippet, or None if it is not indexed
+    """
+
+    __slots__ = (
+        "node",
+        "title",
+        "headings",
+        "blocks",
+        "words",
+        "links",
+        "images",
+        "search",
+    )
+
+    def __init__(self, node=None, search=None):
+        self.node = node
+        self.title = None
+        self.headings = []
+        self.blocks = 0
+        self.words = 0
+        self.links = 0
+        self.images = 0
+        self.search = search
+
+    def add_block(self, stats):
+        """Adds the statistics of the next block of the document
+
+        Args:
+            stats (list, required): Statistics as returned by parse_block
+        """
+        heading, words, links, images, text = stats
+        if heading is not None:
+            level, title = heading
+            if level == 1 and self.blocks == 0:
+                self.title = title
+            self.headings.append((level, title))
+        if self.search is not None:
+            self.search.add_text(text, heading is not None)
+        self.blocks += 1
+        self.words += words
+        self.links += links
+        self.images += images
+
+    def require_title(self):
+        """Returns the title of the document
+
+        Raises:
+            Exception: The document does not open with a level 1 heading
+        """
+        if self.title is None:
+            raise Exception("Error: document must have a heading")
+        return self.title
+
+
+def stream_markdown(fp, cache=None, search=None):
+    """Reads the heading of a markdown file and defers the rest
+
+    Args:
+        fp (file-like, required): A text file opened with universal newlines
+        cache (BlockCache, optional): Rendered blocks to reuse. Defaults to None.
+        search (PageTerms, optional): Gathers search terms. Defaults to None.
+
+    Returns:
+        StreamedDocument: The document, with only its first block parsed
+    """
+    blocks = iter_blocks(fp)
+    first = next(blocks, "")
+    node = StreamedDocument(itertools.chain([first], blocks), cache, search)
+    node.document.title = block_heading(first)
+    return node
+
+
+class StreamedDocument(ParentNode):
+    """A document div whose blocks are parsed while it is written
+
+    Only one block and its nodes are in memory at a time. The blocks are
+    consumed as they are written, so the document can be written once.
+    Its metadata is complete once it has been written.
+
+    Attributes:
+        blocks: An iterator over the markdown blocks of the document
+        cache: Rendered blocks to reuse, or None
+        document: The Document gathering the metadata of written blocks
+    """
+
+    __slots__ = ("blocks", "cache", "document")
+
+    def __init__(self, blocks, cache=None, search=None):
+        super().__init__("div", EMPTY_CHILDREN)
+        self.blocks = blocks
+        self.cache = cache
+        self.document = Document(self, search)
+
+    def write_html(self, fp):
+        fp.write(f"<{self.tag}>")
+        for node, stats in iter_parsed(self.blocks, self.cache):
+            node.write_html(fp)
+            self.document.add_block(stats)
+        fp.write(f"</{self.tag}>")
+
+
+def block_to_node(block, block_type=None):
+    if block_type is None:
         block_type = block_to_block_type(block)
-        if block_type == BlockType.CODE:
-            text_node = strip_code(block)
-            html_node = text_node_to_html_node(text_node)
-            wrapped_code_node = ParentNode("pre", [html_node])
-            nodes_list.append(wrapped_code_node)
-        elif block_type == BlockType.PARAGRAPH:
-            text_nodes = text_to_textnodes(block)
-            child_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            nodes_list.append(ParentNode("p", child_nodes))
-        elif block_type == BlockType.HEADING:
-            text, level = strip_heading(block)
-            text_nodes = text_to_textnodes(text)
-            child_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            nodes_list.append(ParentNode(f"h{level}", child_nodes))
-        elif block_type == BlockType.QUOTE:
-            text = strip_quotes(block)
-            text_nodes = text_to_textnodes(text)
-            child_nodes = [text_node_to_html_node(node) for node in text_nodes]
-            nodes_list.append(ParentNode("blockquote", child_nodes))
-        elif block_type == BlockType.UNORDERED_LIST:
-            child_nodes = itemize(block, BlockType.UNORDERED_LIST)
-            nodes_list.append(ParentNode("ul", child_nodes))
-        elif block_type == BlockType.ORDERED_LIST:
-            child_nodes = itemize(block, BlockType.ORDERED_LIST)
-            nodes_list.append(ParentNode("ol", child_nodes))
-    return nodes_list
+    if block_type == BlockType.CODE:
+        text_node = strip_code(block)
+        html_node = text_node_to_html_node(text_node)
+        return ParentNode("pre", [html_node])
+    elif block_type == BlockType.HEADING:
+        text, level = strip_heading(block)
+        text_nodes = text_to_textnodes(text)
+        child_nodes = [text_node_to_html_node(node) for node in text_nodes]
+        return ParentNode(f"h{level}", child_nodes)
+    elif block_type == BlockType.QUOTE:
+        text = strip_quotes(block)
+        text_nodes = text_to_textnodes(text)
+        child_nodes = [text_node_to_html_node(node) for node in text_nodes]
+        return ParentNode("blockquote", child_nodes)
+    elif block_type == BlockType.UNORDERED_LIST:
+        child_nodes = itemize(block, BlockType.UNORDERED_LIST)
+        return ParentNode("ul", child_nodes)
+    elif block_type == BlockType.ORDERED_LIST:
+        child_nodes = itemize(block, BlockType.ORDERED_LIST)
+        return ParentNode("ol", child_nodes)
+    text_nodes = text_to_textnodes(block)
+    child_nodes = [text_node_to_html_node(node) for node in text_nodes]
+    return ParentNode("p", child_nodes)
+
+
+def block_to_html(block, block_type=None, tokens=None):
+    """Returns the HTML of a block without building its nodes
+
+    The HTML is the same as block_to_node(block, block_type).to_html()
+    returns, and the same errors are raised, but the inline markdown is
+    turned straight into strings rather than text nodes and HTML nodes.
+
+    Args:
+        block (string, required): The stripped block text
+        block_type (BlockType, optional): The type of the block. Defaults
+            to classifying the block.
+        tokens (list, optional): Receives the (text, TextType, url) tuples
+            of the block's inline text, and its code. Defaults to None.
+
+    Raises:
+        ValueError: The block has invalid or no inline markdown
+
+    Returns:
+        string: The HTML of the block
+    """
+    if block_type is None:
+        block_type = block_to_block_type(block)
+    if block_type == BlockType.CODE:
+        text = block.strip()[3:-3].lstrip()
+        if tokens is not None:
+            tokens.append((text, TextType.CODE, None))
+        return f"<pre><code>{text}</code></pre>"
+    elif block_type == BlockType.HEADING:
+        text, level = strip_heading(block)
+        return inline_html(f"h{level}", text, tokens)
+    elif block_type == BlockType.QUOTE:
+        return inline_html("blockquote", strip_quotes(block), tokens)
+    elif block_type == BlockType.UNORDERED_LIST:
+        lines = block.split("\n")
+        items = [inline_html("li", line[2:], tokens) for line in lines]
+        return f"<ul>{''.join(items)}</ul>"
+    elif block_type == BlockType.ORDERED_LIST:
+        lines = block.split("\n")
+        items = [inline_html("li", line[3:], tokens) for line in lines]
+        return f"<ol>{''.join(items)}</ol>"
+    return inline_html("p", block, tokens)
+
+
+def inline_html(tag, text, tokens=None):
+    # Return inline markdown converted to HTML and wrapped in a tag, adding
+    # its tokens to tokens if given
+    spans = inline_tokens(text)
+    if not spans:
+        raise ValueError("parent node must have at least one child")
+    if tokens is not None:
+        tokens.extend(spans)
+    return f"<{tag}>{tokens_to_html(spans)}</{tag}>"
 
 
 def strip_code(block):
@@ -91,9 +340,14 @@ def extract_heading(markdown):
     blocks_list = markdown.split("\n\n")
     for block in blocks_list:
         if block:
-            stripped_block = block.strip()
-            if block_to_block_type(stripped_block) == BlockType.HEADING:
-                heading, level = strip_heading(stripped_block)
-                if level == 1:
-                    return heading
-            raise Exception("Error: document must have a heading")
+            return block_heading(block.strip())
+    raise Exception("Error: document must have a heading")
+
+
+def block_heading(block):
+    # Return the text of a level 1 heading block
+    if block and block_to_block_type(block) == BlockType.HEADING:
+        heading, level = strip_heading(block)
+        if level == 1:
+            return heading
+    raise Exception("Error: document must have a heading")
@@ -0,0 +1,148 @@
+import collections
+import queue
+import threading
+import time
+
+
+class StageWaits:
+    """Accumulates the time pipeline stages spend blocked on each other
+
+    Attributes:
+        waits: A dictionary mapping wait names to seconds
+    """
+
+    def __init__(self):
+        self.waits = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        """Adds time spent waiting
+
+        Args:
+            name (string, required): What was waited for
+            seconds (float, required): The time spent waiting
+        """
+        with self.lock:
+            self.waits[name] = self.waits.get(name, 0.0) + seconds
+
+    def report(self):
+        """Returns a one-line summary of the time spent waiting
+
+        Returns:
+            string: Milliseconds spent in each wait
+        """
+        waits = ", ".join(
+            f"{name} {seconds * 1000:.1f} ms"
+            for name, seconds in self.waits.items()
+        )
+        return f"Pipeline waits: {waits or 'none'}"
+
+
+def prefetch(func, items, executor, depth, waits=None, name="read"):
+    """Yields (item, func(item)) pairs while later items are being computed
+
+    At most depth calls are in flight at a time, so a slow consumer does
+    not cause results to pile up in memory.
+
+    Args:
+        func (callable, required): Called with each item in the executor
+        items (iterable, required): The items, possibly an iterator
+        executor (Executor, required): Runs the calls
+        depth (int, required): Maximum number of calls in flight
+        waits (StageWaits, optional): Records time spent waiting for
+            results. Defaults to None.
+        name (string, optional): Name of the wait. Defaults to "read".
+
+    Yields:
+        tuple: Each item with its result, in the order of items
+    """
+    pending = collections.deque()
+    items = iter(items)
+    while True:
+        while len(pending) < depth:
+            item = next(items, None)
+            if item is None:
+                break
+            pending.append((item, executor.submit(func, item)))
+        if not pending:
+            return
+        item, future = pending.popleft()
+        start = time.perf_counter()
+        result = future.result()
+        if waits is not None:
+            waits.add(name, time.perf_counter() - start)
+        yield item, result
+
+
+class WriteQueue:
+    """Runs jobs on a pool of threads, fed through a bounded queue
+
+    Adding a job blocks while the queue is full, so producers cannot get
+    further ahead of the threads than the queue allows.
+
+    Attributes:
+        results: A list of (key, error, seconds) tuples of finished jobs,
+            where error is None for jobs that succeeded
+    """
+
+    def __init__(self, threads, depth, waits=None):
+        """WriteQueue constructor
+
+        Args:
+            threads (int, required): Number of threads running jobs
+            depth (int, required): Maximum number of queued jobs
+            waits (StageWaits, optional): Records time spent waiting.
+                Defaults to None.
+        """
+        self.queue = queue.Queue(maxsize=depth)
+        self.waits = waits
+        self.results = []
+        self.threads = [
+            threading.Thread(target=self.work, daemon=True)
+            for _ in range(threads)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, key, job):
+        """Queues a job, waiting while the queue is full
+
+        Args:
+            key (any, required): Identifies the job in results
+            job (callable, required): Called without arguments on a thread
+        """
+        start = time.perf_counter()
+        self.queue.put((key, job))
+        self.wait("write", start)
+
+    def work(self):
+        while True:
+            start = time.perf_counter()
+            entry = self.queue.get()
+            self.wait("writer idle", start)
+            if entry is None:
+                return
+            key, job = entry
+            start = time.perf_counter()
+            try:
+                job()
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            self.results.append((key, error, time.perf_counter() - start))
+
+    def wait(self, name, start):
+        if self.waits is not None:
+            self.waits.add(name, time.perf_counter() - start)
+
+    def close(self):
+        """Waits for all queued jobs to finish
+
+        Returns:
+            list: The results of all jobs
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        return self.results
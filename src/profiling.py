@@ -0,0 +1,168 @@
+import contextlib
+import time
+import tracemalloc
+
+
+def start_tracing():
+    """Starts tracing memory allocations, unless they are already traced
+
+    Stages timed while tracing also record the memory they allocate.
+    Tracing slows allocations down, which inflates the timings of stages
+    that allocate a lot.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+class StageTimer:
+    """Accumulates wall time and allocated memory per named stage
+
+    While tracemalloc is tracing, a stage records the peak memory traced
+    while it ran above what was traced when it began. Unlike the change in
+    live memory, this counts memory the stage allocated and freed again.
+    Tracing is shared by all threads and stages must not nest, so stages
+    timed while other threads allocate, such as reads on I/O threads, get
+    approximate amounts.
+
+    A timer is not thread-safe; timings taken on other threads are added
+    to it by the thread that owns it.
+
+    Attributes:
+        stages: A dictionary mapping stage names to [seconds, bytes] totals
+        trace: Whether stages record traced memory, or only their time
+    """
+
+    def __init__(self, trace=True):
+        """StageTimer constructor
+
+        Args:
+            trace (bool, optional): Whether stages record traced memory.
+                Defaults to True. Timers used off the main thread should
+                not, as resetting the traced peak disturbs its stages.
+        """
+        self.stages = {}
+        self.trace = trace
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times the enclosed code as part of the named stage
+
+        Args:
+            name (string, required): The name of the stage
+        """
+        tracing = self.trace and tracemalloc.is_tracing()
+        if tracing:
+            traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            allocated = 0
+            if tracing:
+                allocated = tracemalloc.get_traced_memory()[1] - traced
+            self.add(name, elapsed, allocated)
+
+    def add(self, name, seconds, allocated=0):
+        """Adds time and allocations measured elsewhere to the named stage
+
+        Args:
+            name (string, required): The name of the stage
+            seconds (float, required): Wall time to add
+            allocated (int, optional): Bytes allocated. Defaults to 0.
+        """
+        totals = self.stages.setdefault(name, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += allocated
+
+    def total(self):
+        """Returns the wall time of all stages combined"""
+        return sum(seconds for seconds, _ in self.stages.values())
+
+
+class NullTimer:
+    """A stand-in for StageTimer that records nothing"""
+
+    stages = None
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+
+class BuildProfile(StageTimer):
+    """Stage timings for a whole build and for each page in it
+
+    Attributes:
+        stages: Totals for build-wide stages such as copying static files
+        pages: A dictionary mapping source paths to their StageTimer
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pages = {}
+
+    def page(self, source):
+        """Returns the timer for a page, creating it if needed
+
+        Args:
+            source (string, required): Path of the page source
+        """
+        if source not in self.pages:
+            self.pages[source] = StageTimer()
+        return self.pages[source]
+
+    def add_page_stages(self, source, stages):
+        """Merges stage totals recorded elsewhere, e.g. in a worker process
+
+        Args:
+            source (string, required): Path of the page source
+            stages (dict, required): Stage totals as recorded by StageTimer
+        """
+        timer = self.page(source)
+        for name, (seconds, allocated) in stages.items():
+            timer.add(name, seconds, allocated)
+
+    def report(self, top=10):
+        """Returns a summary of the slowest pages and a stage breakdown
+
+        Args:
+            top (int, optional): Number of slow pages to list. Defaults to 10.
+
+        Returns:
+            string: A formatted, multi-line report
+        """
+        page_stages = {}
+        for timer in self.pages.values():
+            for name, (seconds, allocated) in timer.stages.items():
+                totals = page_stages.setdefault(name, [0.0, 0])
+                totals[0] += seconds
+                totals[1] += allocated
+        names = list(page_stages)
+
+        lines = [f"Slowest pages (of {len(self.pages)}):"]
+        header = f"{'ms':>9}  " + "".join(f"{name:>11}" for name in names)
+        lines.append(f"  {header}  page")
+        slowest = sorted(
+            self.pages.items(), key=lambda item: item[1].total(), reverse=True
+        )
+        for source, timer in slowest[:top]:
+            cells = "".join(
+                f"{timer.stages.get(name, [0.0])[0] * 1000:>11.2f}"
+                for name in names
+            )
+            lines.append(f"  {timer.total() * 1000:>9.2f}  {cells}  {source}")
+
+        lines.append("")
+        lines.append("Stage breakdown:")
+        lines.append(f"  {'stage':<16}{'ms':>11}{'share':>8}{'alloc KiB':>12}")
+        combined = dict(self.stages)
+        for name, totals in page_stages.items():
+            combined[f"page:{name}"] = totals
+        overall = sum(seconds for seconds, _ in combined.values()) or 1.0
+        for name, (seconds, allocated) in combined.items():
+            lines.append(
+                f"  {name:<16}{seconds * 1000:>11.2f}"
+                f"{seconds / overall:>8.1%}{allocated / 1024:>12.0f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+
+from blocks import markdown_to_blocks
+from htmlnode import HTMLBuffer
+from markdown_to_html_node import block_to_html
+
+DEFAULT_CAPACITY = 10000
+
+
+class Renderer:
+    """Renders markdown documents to HTML, reusing work between calls
+
+    This is the entry point for rendering many documents in process when
+    only their HTML is needed. Blocks are rendered straight to HTML, so no
+    node tree is built. The HTML of recently rendered blocks is remembered,
+    keyed by their markdown, so blocks repeated across documents are
+    rendered once.
+
+    The output is the same as markdown_to_html_node(markdown).to_html().
+    A renderer may be shared between threads; the remembered blocks are
+    guarded by a lock that is not held while rendering.
+
+    Attributes:
+        capacity: Maximum number of blocks remembered, 0 to remember none
+        fragments: An OrderedDict mapping block markdown to HTML, oldest first
+        hits: Number of blocks found among the remembered ones
+        misses: Number of blocks rendered
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """Renderer constructor
+
+        Args:
+            capacity (int, optional): Maximum number of blocks remembered.
+                Defaults to DEFAULT_CAPACITY.
+        """
+        self.capacity = capacity
+        self.fragments = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def render(self, markdown):
+        """Returns the HTML of a markdown document
+
+        Args:
+            markdown (string, required): The document
+
+        Raises:
+            ValueError: The document has no blocks or invalid inline markdown
+
+        Returns:
+            string: The HTML, wrapped in a div
+        """
+        buffer = HTMLBuffer()
+        self.write(markdown, buffer)
+        return "".join(buffer)
+
+    def write(self, markdown, fp):
+        """Writes the HTML of a markdown document to a file-like object
+
+        Args:
+            markdown (string, required): The document
+            fp (file-like, required): An object with a write method
+
+        Raises:
+            ValueError: The document has no blocks or invalid inline markdown
+        """
+        blocks = markdown_to_blocks(markdown)
+        if not blocks:
+            raise ValueError("parent node must have at least one child")
+        fragments = [self.render_block(block) for block in blocks]
+        fp.write("<div>")
+        for fragment in fragments:
+            fp.write(fragment)
+        fp.write("</div>")
+
+    def render_many(self, documents, buffers=None):
+        """Renders a batch of markdown documents
+
+        Args:
+            documents (iterable, required): Markdown documents
+            buffers (iterable, optional): File-like objects, one per
+                document, each written the HTML of its document. Defaults
+                to returning the HTML instead.
+
+        Raises:
+            ValueError: A document has no blocks or invalid inline markdown
+
+        Returns:
+            list: The HTML of each document, or None if buffers are given
+        """
+        if buffers is None:
+            return [self.render(markdown) for markdown in documents]
+        for markdown, fp in zip(documents, buffers, strict=True):
+            self.write(markdown, fp)
+        return None
+
+    def render_block(self, block):
+        """Returns the HTML of a single block, rendering it if not remembered
+
+        Args:
+            block (string, required): The stripped block text
+
+        Returns:
+            string: The HTML of the block
+        """
+        with self.lock:
+            html = self.fragments.get(block)
+            if html is not None:
+                self.hits += 1
+                self.fragments.move_to_end(block)
+                return html
+            self.misses += 1
+        html = block_to_html(block)
+        if self.capacity:
+            with self.lock:
+                self.fragments[block] = html
+                if len(self.fragments) > self.capacity:
+                    self.fragments.popitem(last=False)
+        return html
+
+    def clear(self):
+        """Forgets all remembered blocks and resets the counts"""
+        with self.lock:
+            self.fragments.clear()
+            self.hits = 0
+            self.misses = 0
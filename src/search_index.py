@@ -0,0 +1,325 @@
+import json
+import os
+import re
+
+from compress import remove_compressed
+
+SEARCH_INDEX_VERSION = 2
+# Characters of opening text kept for each page
+SNIPPET_LENGTH = 160
+# Pages per page shard of the written index
+PAGE_SHARD_SIZE = 500
+
+TERM_RE = re.compile(r"[^\W_]{2,}")
+# Files written below the index directory, and their compressed siblings
+SHARD_RE = re.compile(r"(?:index|terms-\w|pages-\d+)\.json(?:\.gz|\.br)?")
+
+
+def text_terms(text):
+    """Returns the search terms in a text
+
+    Terms are lowercased runs of at least two letters or digits.
+
+    Args:
+        text (string, required): Plain text
+
+    Returns:
+        list: The terms, in order and with repeats
+    """
+    return TERM_RE.findall(text.lower())
+
+
+def make_snippet(text):
+    """Returns the first SNIPPET_LENGTH characters of a text, with
+    whitespace collapsed
+
+    Args:
+        text (string, required): Plain text
+
+    Returns:
+        string: The snippet
+    """
+    return " ".join(text.split())[:SNIPPET_LENGTH]
+
+
+def term_shard(term):
+    """Returns the name of the shard a term is written to
+
+    Args:
+        term (string, required): A search term
+
+    Returns:
+        string: The term's first character if it is an ASCII letter or
+            digit, otherwise "_"
+    """
+    first = term[0]
+    return first if first.isascii() and first.isalnum() else "_"
+
+
+def page_url(destination, dest_dir):
+    """Returns the root-relative URL of a generated page
+
+    Args:
+        destination (string, required): Path of the generated page
+        dest_dir (string, required): The output directory
+
+    Returns:
+        string: The URL, ending in a slash for index pages
+    """
+    relative = os.path.relpath(destination, dest_dir).replace(os.sep, "/")
+    if relative == "index.html" or relative.endswith("/index.html"):
+        relative = relative[: -len("index.html")]
+    return "/" + relative
+
+
+class PageTerms:
+    """The search terms and snippet of a page, gathered while it is parsed
+
+    Attributes:
+        terms: The set of search terms in the page's text
+        snippet: The opening text of the page, after its headings
+    """
+
+    def __init__(self, terms=(), snippet=""):
+        """PageTerms constructor
+
+        Args:
+            terms (iterable, optional): Terms found so far. Defaults to none.
+            snippet (string, optional): The snippet so far. Defaults to "".
+        """
+        self.terms = set(terms)
+        self.snippet = snippet
+
+    def add_text(self, text, heading=False):
+        """Adds the plain text of the next block of the page
+
+        Args:
+            text (string, required): The plain text of the block
+            heading (bool, optional): Whether the block is a heading, which
+                is left out of the snippet. Defaults to False.
+        """
+        if not heading and len(self.snippet) < SNIPPET_LENGTH:
+            self.snippet = make_snippet(f"{self.snippet} {text}")
+        self.terms.update(text_terms(text))
+
+
+class SearchIndex:
+    """An inverted index of the terms on each page, updated incrementally
+
+    The index is written as JSON shards below a directory: terms-<c>.json
+    maps the terms starting with c to the IDs of the pages containing them,
+    and pages-<n>.json maps page IDs to their URL, title and snippet. The
+    shards listed in index.json let a browser fetch only the ones a query
+    needs. Only shards affected by changed pages are written again.
+
+    Attributes:
+        path: Location of the index state on disk, or None to keep it in memory
+        pages: A dictionary mapping sources to their ID, URL, title, snippet,
+            terms and the digest of the source they were indexed from
+        next_id: The ID given to the next new page
+        dirty_terms: Names of term shards to write again
+        dirty_pages: Numbers of page shards to write again
+    """
+
+    def __init__(self, path=None, pages=None, next_id=0):
+        """SearchIndex constructor
+
+        Args:
+            path (string, optional): Location of the index state. Defaults to None.
+            pages (dict, optional): Indexed pages. Defaults to an empty dictionary.
+            next_id (int, optional): The next page ID. Defaults to 0.
+        """
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.next_id = next_id
+        self.dirty_terms = set()
+        self.dirty_pages = set()
+
+    @classmethod
+    def load(cls, path):
+        """Reads the index state from disk
+
+        A missing, unreadable or outdated state yields an empty index.
+
+        Args:
+            path (string, required): Location of the index state
+
+        Returns:
+            SearchIndex: The stored index
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            return cls(path)
+        return cls(path, data.get("pages", {}), data.get("next_id", 0))
+
+    def save(self):
+        """Writes the index state to disk atomically, if it has a path"""
+        if self.path is None:
+            return
+        data = {
+            "version": SEARCH_INDEX_VERSION,
+            "next_id": self.next_id,
+            "pages": self.pages,
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"), sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def is_current(self, source, digest):
+        """Checks whether a page was indexed from the given source contents
+
+        Args:
+            source (string, required): Path of the page source
+            digest (string, required): Hash of the source contents
+
+        Returns:
+            bool: True if the page is indexed as it is now
+        """
+        entry = self.pages.get(source)
+        return entry is not None and entry["digest"] == digest
+
+    def update(self, source, url, title, snippet, terms, digest=None):
+        """Indexes a generated page, replacing what was indexed for it before
+
+        Args:
+            source (string, required): Path of the page source
+            url (string, required): Root-relative URL of the page
+            title (string, required): The page title
+            snippet (string, required): The opening text of the page
+            terms (iterable, required): The terms on the page
+            digest (string, optional): Hash of the source contents. Defaults
+                to None, which is never current.
+        """
+        terms = sorted(set(terms))
+        old = self.pages.get(source)
+        if old is None:
+            page_id = self.next_id
+            self.next_id += 1
+            old_terms = []
+        else:
+            page_id = old["id"]
+            old_terms = old["terms"]
+            old["digest"] = digest
+            if (old["url"], old["title"], old["snippet"], old_terms) == (
+                url,
+                title,
+                snippet,
+                terms,
+            ):
+                return
+        self.pages[source] = {
+            "id": page_id,
+            "url": url,
+            "title": title,
+            "snippet": snippet,
+            "terms": terms,
+            "digest": digest,
+        }
+        self.dirty_pages.add(page_id // PAGE_SHARD_SIZE)
+        changed = set(old_terms).symmetric_difference(terms)
+        self.dirty_terms.update(term_shard(term) for term in changed)
+
+    def remove_stale(self, sources):
+        """Forgets pages whose source no longer exists
+
+        Args:
+            sources (iterable, required): Paths of all current sources
+        """
+        current = set(sources)
+        for source in [source for source in self.pages if source not in current]:
+            entry = self.pages.pop(source)
+            self.dirty_pages.add(entry["id"] // PAGE_SHARD_SIZE)
+            self.dirty_terms.update(term_shard(term) for term in entry["terms"])
+
+    def write(self, directory, basepath="/"):
+        """Writes the changed shards and the shard list below a directory
+
+        Shards that are missing on disk are written too, and shards left
+        empty are deleted.
+
+        Args:
+            directory (string, required): Directory of the written index
+            basepath (string, optional): The URL prefix of the site. Defaults to "/".
+
+        Returns:
+            int: The number of shards written
+        """
+        terms = {}
+        pages = {}
+        for entry in sorted(self.pages.values(), key=lambda entry: entry["id"]):
+            shard = entry["id"] // PAGE_SHARD_SIZE
+            pages.setdefault(shard, {})[entry["id"]] = [
+                entry["url"],
+                entry["title"],
+                entry["snippet"],
+            ]
+            for term in entry["terms"]:
+                ids = terms.setdefault(term_shard(term), {}).setdefault(term, [])
+                ids.append(entry["id"])
+
+        os.makedirs(directory, exist_ok=True)
+        files = {}
+        for name in self.dirty_terms | terms.keys():
+            files[f"terms-{name}.json"] = (name in self.dirty_terms, terms.get(name))
+        for number in self.dirty_pages | pages.keys():
+            files[f"pages-{number}.json"] = (
+                number in self.dirty_pages,
+                pages.get(number),
+            )
+        written = 0
+        for filename, (dirty, content) in sorted(files.items()):
+            path = os.path.join(directory, filename)
+            if content is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                remove_compressed(path)
+            elif dirty or not os.path.exists(path):
+                write_json(path, content)
+                written += 1
+
+        write_json(
+            os.path.join(directory, "index.json"),
+            {
+                "version": SEARCH_INDEX_VERSION,
+                "basepath": basepath,
+                "pages": len(self.pages),
+                "page_shard_size": PAGE_SHARD_SIZE,
+                "term_shards": sorted(terms),
+                "page_shards": sorted(pages),
+            },
+        )
+        self.dirty_terms.clear()
+        self.dirty_pages.clear()
+        return written
+
+
+def remove_index(directory):
+    """Deletes the shards and shard list written by SearchIndex.write
+
+    The directory is removed too if nothing else is left in it.
+
+    Args:
+        directory (string, required): Directory of the written index
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name == "index.json" or SHARD_RE.fullmatch(name):
+            os.remove(os.path.join(directory, name))
+    if not os.listdir(directory):
+        os.rmdir(directory)
+
+
+def write_json(path, data):
+    # Write compact JSON through a temporary sibling
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"), sort_keys=True)
+    os.replace(temp_path, path)
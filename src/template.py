@@ -0,0 +1,160 @@
+import re
+
+from htmlnode import HTMLBuffer
+
+PLACEHOLDER_RE = re.compile(r"\{\{ *(\w+) *\}\}")
+# A root-relative link or source: its path, then any query or fragment
+ROOT_URL_RE = re.compile(r'(href|src)="/([^"?#]*)([^"]*)"')
+
+
+def rewrite_basepath(html, basepath, urls=None, images=None):
+    """Points root-relative links and sources at the basepath
+
+    Args:
+        html (string, required): HTML to rewrite
+        basepath (string, required): The URL prefix replacing the leading slash
+        urls (dict, optional): Root-relative URLs mapped to the URLs that
+            replace them, such as those of fingerprinted assets, before the
+            basepath is applied. Defaults to None.
+        images (dict, optional): Root-relative image URLs mapped to HTML of
+            the attributes to add after the src attributes pointing at
+            them. Defaults to None.
+
+    Returns:
+        string: The rewritten HTML
+    """
+    if urls or images:
+        urls = urls or {}
+        images = images or {}
+
+        def replace(match):
+            attribute, path, suffix = match.groups()
+            url = f"/{path}"
+            rewritten = urls.get(url, url)[1:]
+            html = f'{attribute}="{basepath}{rewritten}{suffix}"'
+            if attribute == "src" and url in images:
+                html += images[url]
+            return html
+
+        return ROOT_URL_RE.sub(replace, html)
+    if basepath == "/":
+        return html
+    return html.replace('href="/', f'href="{basepath}').replace(
+        'src="/', f'src="{basepath}'
+    )
+
+
+class BasepathWriter:
+    """A file wrapper that rewrites root-relative URLs in written HTML
+
+    Attributes:
+        fp: The wrapped file-like object
+        basepath: The URL prefix replacing the leading slash
+        urls: Root-relative URLs mapped to their replacements, or None
+        images: Root-relative image URLs mapped to attributes to add, or None
+    """
+
+    def __init__(self, fp, basepath, urls=None, images=None):
+        self.fp = fp
+        self.basepath = basepath
+        self.urls = urls
+        self.images = images
+
+    def write(self, html):
+        return self.fp.write(
+            rewrite_basepath(html, self.basepath, self.urls, self.images)
+        )
+
+
+class Template:
+    """A page template compiled into literal segments and placeholder slots
+
+    The basepath rewrite is applied to the literal segments once, when the
+    template is compiled. Only the values filled into slots are rewritten
+    while rendering.
+
+    Attributes:
+        source: The uncompiled template text
+        basepath: The URL prefix root-relative URLs are rewritten to
+        urls: Root-relative URLs mapped to the URLs that replace them, such
+            as those of fingerprinted assets, or None
+        images: Root-relative image URLs mapped to HTML of the attributes
+            added to the tags showing them, such as their size, or None
+        segments: A list of (text, placeholder name) tuples. The name is
+            None for literal segments. Placeholder segments keep their
+            text, which is written unchanged when no value is given.
+    """
+
+    def __init__(self, source, basepath="/", urls=None, images=None):
+        """Template constructor
+
+        Args:
+            source (string, required): Template text with {{ Name }} placeholders.
+            basepath (string, optional): The URL prefix of the site. Defaults to "/".
+            urls (dict, optional): URLs to replace while rewriting. Defaults to None.
+            images (dict, optional): Image attributes to add. Defaults to None.
+        """
+        self.source = source
+        self.basepath = basepath
+        self.urls = urls
+        self.images = images
+        self.segments = []
+        start = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            self.add_literal(source[start : match.start()])
+            self.segments.append((match.group(), match.group(1)))
+            start = match.end()
+        self.add_literal(source[start:])
+
+    def add_literal(self, literal):
+        """Appends a literal segment, with its URLs already rewritten
+
+        Args:
+            literal (string, required): Template text between placeholders
+        """
+        if literal:
+            html = rewrite_basepath(
+                literal, self.basepath, self.urls, self.images
+            )
+            self.segments.append((html, None))
+
+    @property
+    def placeholders(self):
+        """The set of placeholder names used in the template"""
+        return {name for _, name in self.segments if name is not None}
+
+    def write(self, fp, values):
+        """Writes the filled-in template to a file-like object
+
+        Node values are serialized straight into fp. Placeholders without a
+        value are written unchanged.
+
+        Args:
+            fp (file-like, required): An object with a write method
+            values (dict, required): Placeholder names mapped to strings or
+                HTML nodes
+        """
+        rewriter = BasepathWriter(fp, self.basepath, self.urls, self.images)
+        for literal, name in self.segments:
+            if name is None:
+                fp.write(literal)
+            elif name not in values:
+                rewriter.write(literal)
+            elif isinstance(values[name], str):
+                rewriter.write(values[name])
+            else:
+                values[name].write_html(rewriter)
+
+    def render(self, values):
+        """Returns the filled-in template as a string
+
+        Args:
+            values (dict, required): Placeholder names mapped to strings or
+                HTML nodes
+
+        Returns:
+            string: The rendered page
+        """
+        buffer = HTMLBuffer()
+        self.write(buffer, values)
+        return "".join(buffer)
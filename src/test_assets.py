@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from assets import (
+    copy_asset,
+    copy_static,
+    fingerprint_name,
+    fingerprint_static,
+    is_unchanged,
+)
+from manifest import BuildManifest, hash_bytes
+
+
+class TestCopyStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def sync(self, **kwargs):
+        return copy_static(
+            self.static, self.dest, clean=False, manifest=self.manifest, **kwargs
+        )
+
+    def test_only_changed_files_copied(self):
+        self.assertEqual(self.sync(), (2, 0))
+        self.assertEqual(self.sync(), (0, 0))
+        self.write(os.path.join(self.static, "index.css"), "body { }")
+        self.assertEqual(self.sync(), (1, 0))
+        with open(os.path.join(self.dest, "index.css")) as f:
+            self.assertEqual(f.read(), "body { }")
+
+    def test_deleted_files_removed(self):
+        self.sync()
+        page = os.path.join(self.dest, "index.html")
+        self.write(page, "page")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.sync(), (0, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_checksum_ignores_touched_files(self):
+        self.sync()
+        source = os.path.join(self.static, "index.css")
+        os.utime(source, ns=(0, 0))
+        self.assertEqual(self.sync(checksum=True), (0, 0))
+        self.assertEqual(self.sync(), (1, 0))
+
+    def test_link(self):
+        self.sync(link=True)
+        source = os.path.join(self.static, "index.css")
+        dest = os.path.join(self.dest, "index.css")
+        self.assertTrue(os.path.samefile(source, dest))
+        self.assertTrue(is_unchanged(source, dest))
+
+    def test_copy_keeps_mtime(self):
+        source = os.path.join(self.static, "index.css")
+        dest = os.path.join(self.dest, "nested", "index.css")
+        os.utime(source, ns=(0, 1_000_000_000))
+        copy_asset(source, dest)
+        self.assertEqual(os.stat(dest).st_mtime_ns, 1_000_000_000)
+        self.assertFalse(os.path.samefile(source, dest))
+
+    def test_fingerprint_name(self):
+        self.assertEqual(
+            fingerprint_name("images/a.b.png", "0123456789abcdef"),
+            "images/a.b.0123456789ab.png",
+        )
+
+    def test_fingerprinted_copies(self):
+        urls = fingerprint_static(self.static, self.manifest)
+        css = fingerprint_name("/index.css", hash_bytes(b"body {}"))
+        self.assertEqual(urls["/index.css"], css)
+        self.assertEqual(self.sync(urls=urls), (2, 0))
+        self.assertTrue(os.path.exists(self.dest + css))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+
+        # A changed file moves to a new name and its old copy is removed
+        self.write(os.path.join(self.static, "index.css"), "body { }")
+        urls = fingerprint_static(self.static, self.manifest)
+        self.assertNotEqual(urls["/index.css"], css)
+        self.assertEqual(self.sync(urls=urls), (1, 1))
+        self.assertFalse(os.path.exists(self.dest + css))
+        self.assertTrue(os.path.exists(self.dest + urls["/index.css"]))
+
+        # Turning fingerprinting off moves the copies back
+        self.assertEqual(self.sync(), (2, 2))
+        self.assertEqual(
+            sorted(os.listdir(self.dest)), ["images", "index.css"]
+        )
+
+    def test_hashes_cached_by_mtime(self):
+        fingerprint_static(self.static, self.manifest)
+        with mock.patch("manifest.hash_file") as hash_file:
+            fingerprint_static(self.static, self.manifest)
+            hash_file.assert_not_called()
+            hash_file.return_value = "f" * 64
+            os.utime(os.path.join(self.static, "index.css"), ns=(0, 0))
+            urls = fingerprint_static(self.static, self.manifest)
+            hash_file.assert_called_once()
+        self.assertEqual(urls["/index.css"], "/index.ffffffffffff.css")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from block_cache import BlockCache, hash_block
+from generate_site import generate_pages
+from markdown_to_html_node import markdown_to_html_node
+
+MARKDOWN = "# Title\n\nSome **bold** text\n\n- one\n- two"
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_cached_render_matches_uncached(self):
+        cache = BlockCache()
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_changed_block_misses(self):
+        cache = BlockCache()
+        markdown_to_html_node(MARKDOWN, cache)
+        markdown_to_html_node(MARKDOWN.replace("bold", "strong"), cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_lru_eviction(self):
+        cache = BlockCache(capacity=2)
+        cache.put("a", ["<p>a</p>", [None, 1, 0, 0, "x"]])
+        cache.put("b", ["<p>b</p>", [None, 1, 0, 0, "x"]])
+        cache.get("a")
+        cache.put("c", ["<p>c</p>", [None, 1, 0, 0, "x"]])
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_subset_and_merge(self):
+        cache = BlockCache()
+        cache.put(hash_block("# Title"), ["<h1>Title</h1>", [[1, "Title"], 1, 0, 0, "Title"]])
+        cache.put("unrelated", ["<p>x</p>", [None, 1, 0, 0, "x"]])
+        subset = cache.subset(MARKDOWN)
+        self.assertEqual(list(subset.entries), [hash_block("# Title")])
+        markdown_to_html_node(MARKDOWN, subset)
+        cache.merge(subset)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertIn(hash_block("Some **bold** text"), cache.entries)
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "cache.json")
+            cache = BlockCache(path)
+            markdown_to_html_node(MARKDOWN, cache)
+            cache.save()
+            loaded = BlockCache.load(path)
+            self.assertEqual(loaded.entries, cache.entries)
+            self.assertEqual(len(BlockCache.load(path + ".missing")), 0)
+
+    def test_build_reuses_blocks(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            template = os.path.join(root, "template.html")
+            os.makedirs(content)
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+            for name in ("a.md", "b.md"):
+                with open(os.path.join(content, name), "w") as f:
+                    f.write(MARKDOWN)
+            cache = BlockCache()
+            dest = os.path.join(root, "docs")
+            generate_pages("/", content, dest, template, block_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (3, 3))
+            generate_pages("/", content, dest, template, jobs=2, block_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (9, 3))
+            with open(os.path.join(dest, "b.html")) as f:
+                self.assertEqual(f.read(), markdown_to_html_node(MARKDOWN).to_html())
+
+
+if __name__ == "__main__":
+    unittest.main()
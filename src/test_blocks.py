@@ -1,6 +1,12 @@
+import io
 import unittest
 
-from blocks import BlockType, markdown_to_blocks, block_to_block_type
+from blocks import (
+    BlockType,
+    block_to_block_type,
+    iter_blocks,
+    markdown_to_blocks,
+)
 
 
 class TestBlocks(unittest.TestCase):
@@ -29,6 +35,22 @@ This is the same paragraph on a new line
         ]
         self.assertEqual(expected, res)
 
+    def test_markdown_to_blocks_code_with_blank_lines(self):
+        text = "# Code\n\n```\nfirst\n\n\nsecond\n```\n\nAfter"
+        res = markdown_to_blocks(text)
+        expected = ["# Code", "```\nfirst\n\n\nsecond\n```", "After"]
+        self.assertEqual(expected, res)
+        self.assertEqual(BlockType.CODE, block_to_block_type(res[1]))
+
+    def test_iter_blocks_matches_markdown_to_blocks(self):
+        text = (
+            "\n# Title\n\n\n\npara\n \nline\n\n\n```\na\n\nb```\n\n"
+            "- one\n- two\n\n\n\n\n```\nunclosed\n\nfence\n"
+        )
+        for chunk_size in (1, 2, 3, 5, 64):
+            blocks = iter_blocks(io.StringIO(text), chunk_size)
+            self.assertEqual(list(blocks), markdown_to_blocks(text))
+
     # Test determining type of markdown block
     def test_block_type_none(self):
         block = """
@@ -66,6 +88,25 @@ It should be of type \"paragraph\""""
 4. Item 4"""
         self.assertEqual(BlockType.ORDERED_LIST, block_to_block_type(ol_block))
 
+    def test_block_type_malformed(self):
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type("####### Deep"))
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type("#Heading"))
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type("``````"))
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type(">a\nb"))
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type("- a\n-b"))
+        self.assertEqual(
+            BlockType.PARAGRAPH, block_to_block_type("1. a\n3. b")
+        )
+
+    def test_block_type_whitespace_lines(self):
+        self.assertEqual(BlockType.QUOTE, block_to_block_type(">a\n  \n>b"))
+        self.assertEqual(
+            BlockType.PARAGRAPH, block_to_block_type("1. a\n\t\n2. b")
+        )
+        self.assertEqual(
+            BlockType.PARAGRAPH, block_to_block_type("- y  \n   \n- x")
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,98 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import Compressor, minify_html
+from generate_site import generate_pages
+from manifest import BuildManifest
+
+
+class TestMinify(unittest.TestCase):
+    def test_collapses_whitespace(self):
+        self.assertEqual(
+            minify_html("  <p>\n    Some   <b>bold</b>\ttext\n  </p>\n"),
+            "<p>\nSome <b>bold</b> text\n</p>",
+        )
+
+    def test_preserves_code_and_tags(self):
+        html = (
+            '<div title="a  b">\n\n<pre><code>x  =  1\n\n  y\n</code></pre>'
+            "<p>use <code>a  b</code>  here</p><!--  note  --></div>"
+        )
+        self.assertEqual(
+            minify_html(html),
+            '<div title="a  b">\n<pre><code>x  =  1\n\n  y\n</code></pre>'
+            "<p>use <code>a  b</code> here</p><!--  note  --></div>",
+        )
+
+
+class TestCompressor(unittest.TestCase):
+    def test_skips_unchanged_contents(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "style.css")
+            with open(path, "w") as f:
+                f.write("body { color: red; }")
+            manifest = BuildManifest(os.path.join(root, "manifest.json"))
+            compressor = Compressor(manifest=manifest)
+            self.assertTrue(compressor.compress(path))
+            with gzip.open(path + ".gz", "rt") as f:
+                self.assertEqual(f.read(), "body { color: red; }")
+            self.assertFalse(compressor.compress(path))
+            self.assertFalse(compressor.compress(path, changed=False))
+
+            os.remove(path + ".gz")
+            self.assertTrue(compressor.compress(path, changed=False))
+            self.assertFalse(compressor.compress(os.path.join(root, "a.png")))
+            self.assertEqual((compressor.compressed, compressor.skipped), (2, 2))
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            Compressor(["zstd"])
+
+    def test_generate_pages_minifies_and_compresses(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            dest = os.path.join(root, "docs")
+            template = os.path.join(root, "template.html")
+            os.makedirs(content)
+            with open(template, "w") as f:
+                f.write("<body>\n    {{ Content }}\n</body>\n")
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Title\n\n```\na   b\n```")
+            manifest = BuildManifest(os.path.join(root, "manifest.json"))
+            for io_threads in (0, 2):
+                compressor = Compressor(manifest=manifest)
+                manifest.pages.clear()
+                generate_pages(
+                    "/",
+                    content,
+                    dest,
+                    template,
+                    manifest,
+                    io_threads=io_threads,
+                    minify=True,
+                    compressor=compressor,
+                )
+                page = os.path.join(dest, "index.html")
+                with open(page) as f:
+                    html = f.read()
+                self.assertEqual(
+                    html,
+                    "<body>\n<div><h1>Title</h1><pre><code>a   b\n"
+                    "</code></pre></div>\n</body>",
+                )
+                with gzip.open(page + ".gz", "rt") as f:
+                    self.assertEqual(f.read(), html)
+
+            # The second build wrote the same page, so did not compress it
+            self.assertEqual((compressor.compressed, compressor.skipped), (0, 1))
+
+            os.remove(os.path.join(content, "index.md"))
+            generate_pages("/", content, dest, template, manifest)
+            self.assertFalse(os.path.exists(page + ".gz"))
+            self.assertEqual(manifest.compressed, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
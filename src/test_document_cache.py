@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from document_cache import (
+    DocumentCache,
+    decode_document,
+    encode_document,
+)
+from generate_site import generate_pages
+from manifest import BuildManifest
+from markdown_to_html_node import parse_markdown
+from search_index import PageTerms
+
+MARKDOWN = "# Title\n\nSome **bold** and [a link](/a)\n\n![image](/i.png)"
+
+
+class TestDocumentCache(unittest.TestCase):
+    def test_round_trip(self):
+        document = parse_markdown(MARKDOWN)
+        decoded = decode_document(encode_document(document))
+        self.assertEqual(decoded.node.to_html(), document.node.to_html())
+        self.assertEqual(decoded.title, "Title")
+        self.assertEqual(decoded.headings, document.headings)
+        self.assertEqual(
+            (decoded.blocks, decoded.words, decoded.links, decoded.images),
+            (document.blocks, document.words, document.links, document.images),
+        )
+        self.assertIsNone(decoded.search)
+
+        document = parse_markdown(MARKDOWN, search=PageTerms())
+        decoded = decode_document(encode_document(document))
+        self.assertEqual(decoded.search.terms, document.search.terms)
+        self.assertEqual(decoded.search.snippet, document.search.snippet)
+
+    def test_eviction_by_size(self):
+        cache = DocumentCache(max_bytes=10)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.get("a")
+        cache.put("c", b"123")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, 8)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "cache")
+            cache = DocumentCache(path)
+            cache.put("a", encode_document(parse_markdown(MARKDOWN)))
+            cache.save()
+            self.assertEqual(DocumentCache.load(path).entries, cache.entries)
+            with open(path, "wb") as f:
+                f.write(b"not a cache")
+            self.assertEqual(len(DocumentCache.load(path)), 0)
+
+    def test_template_change_skips_parsing(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            dest = os.path.join(root, "docs")
+            template = os.path.join(root, "template.html")
+            os.makedirs(content)
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write(MARKDOWN)
+            manifest = BuildManifest(os.path.join(root, "manifest.json"))
+            cache = DocumentCache()
+            for text in ("{{ Content }}", "<title>{{ Title }}</title>{{ Content }}"):
+                with open(template, "w") as f:
+                    f.write(text)
+                generate_pages(
+                    "/", content, dest, template, manifest, document_cache=cache
+                )
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            with open(os.path.join(dest, "index.html")) as f:
+                self.assertEqual(
+                    f.read(),
+                    "<title>Title</title>"
+                    + parse_markdown(MARKDOWN).node.to_html(),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import mmap
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fileio import copy_file, decode_file, read_file, release_file
+
+
+class TestReadFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.md")
+        with open(self.path, "wb") as f:
+            f.write("# Café\n\ntext".encode())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_small_file_read(self):
+        contents = read_file(self.path)
+        self.assertEqual(contents, "# Café\n\ntext".encode())
+        self.assertEqual(decode_file(contents), "# Café\n\ntext")
+        release_file(contents)
+
+    def test_large_file_mapped(self):
+        contents = read_file(self.path, threshold=1)
+        self.assertIsInstance(contents, mmap.mmap)
+        self.assertEqual(decode_file(contents), "# Café\n\ntext")
+        release_file(contents)
+        self.assertTrue(contents.closed)
+
+    def test_line_endings(self):
+        self.assertEqual(decode_file(b"a\r\nb\rc\n"), "a\nb\nc\n")
+
+    def test_empty_file_not_mapped(self):
+        open(self.path, "w").close()
+        self.assertEqual(read_file(self.path, threshold=0), b"")
+
+
+class TestCopyFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "a.png")
+        self.dest = os.path.join(self.tmp.name, "b.png")
+        self.data = os.urandom(300_000)
+        with open(self.source, "wb") as f:
+            f.write(self.data)
+        with open(self.dest, "wb") as f:
+            f.write(b"old contents, longer than none")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_copied(self):
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_copy(self):
+        copy_file(self.source, self.dest)
+        self.assert_copied()
+
+    def test_fallbacks(self):
+        error = OSError("not supported")
+        with mock.patch("os.copy_file_range", side_effect=error):
+            copy_file(self.source, self.dest)
+            self.assert_copied()
+            with mock.patch("os.sendfile", side_effect=error):
+                copy_file(self.source, self.dest)
+                self.assert_copied()
+
+
+if __name__ == "__main__":
+    unittest.main()
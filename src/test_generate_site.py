@@ -0,0 +1,200 @@
+import os
+import tempfile
+import unittest
+
+from generate_site import (
+    STREAM_THRESHOLD,
+    PAGES_PER_JOB,
+    BuildError,
+    discover_files,
+    generate_pages,
+    map_pages,
+)
+from manifest import BuildManifest, hash_file
+
+TEMPLATE = '<title>{{ Title }}</title><a href="/">{{ Content }}</a>'
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(self.content)
+        self.write(self.template, TEMPLATE)
+        for i in range(8):
+            self.write(
+                os.path.join(self.content, f"page{i}.md"),
+                f"# Page {i}\n\nSome **text** and a [link](/page{i}.html)",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_outputs(self, dest):
+        outputs = {}
+        for name in sorted(os.listdir(dest)):
+            with open(os.path.join(dest, name)) as f:
+                outputs[name] = f.read()
+        return outputs
+
+    def test_basepath(self):
+        dest = os.path.join(self.root, "docs")
+        generate_pages("/site/", self.content, dest, self.template)
+        outputs = self.read_outputs(dest)
+        self.assertEqual(
+            outputs["page0.html"],
+            '<title>Page 0</title><a href="/site/"><div><h1>Page 0</h1>'
+            '<p>Some <b>text</b> and a <a href="/site/page0.html">link</a>'
+            "</p></div></a>",
+        )
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        generate_pages("/", self.content, serial, self.template, jobs=1)
+        generate_pages("/", self.content, parallel, self.template, jobs=3)
+        self.assertEqual(
+            self.read_outputs(serial), self.read_outputs(parallel)
+        )
+
+    def test_pipelined_matches_inline(self):
+        inline = os.path.join(self.root, "inline")
+        pipelined = os.path.join(self.root, "pipelined")
+        generate_pages("/", self.content, inline, self.template, io_threads=0)
+        generate_pages(
+            "/", self.content, pipelined, self.template, jobs=2, io_threads=3
+        )
+        self.assertEqual(
+            self.read_outputs(inline), self.read_outputs(pipelined)
+        )
+
+    def test_streamed_pages_match(self):
+        self.write(
+            os.path.join(self.content, "page1.md"),
+            "# Big\n\n```\ncode\n\nblock\n```\n\n- a **b**\n- c",
+        )
+        buffered = os.path.join(self.root, "buffered")
+        streamed = os.path.join(self.root, "streamed")
+        generate_pages("/", self.content, buffered, self.template)
+        generate_pages(
+            "/", self.content, streamed, self.template, stream_threshold=0
+        )
+        self.assertEqual(
+            self.read_outputs(buffered), self.read_outputs(streamed)
+        )
+
+    def test_mapped_sources(self):
+        self.write(
+            os.path.join(self.content, "page1.md"),
+            "# Big\n\n" + "Some **text** here\n\n" * 60_000,
+        )
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        generate_pages("/", self.content, dest, self.template, manifest)
+        with open(os.path.join(dest, "page1.html")) as f:
+            html = f.read()
+        self.assertEqual(html.count("<p>Some <b>text</b> here</p>"), 60_000)
+        digest = manifest.pages[os.path.join(self.content, "page1.md")]["hash"]
+        self.assertEqual(
+            digest, hash_file(os.path.join(self.content, "page1.md"))
+        )
+
+    def test_crlf_sources(self):
+        source = os.path.join(self.content, "page1.md")
+        with open(source, "wb") as f:
+            f.write(b"# Title\r\n\r\nHello **world**\r\n\r\n- a\r\n- b\r\n")
+        expected = (
+            "<title>Title</title><a href=\"/\"><div><h1>Title</h1>"
+            "<p>Hello <b>world</b></p><ul><li>a</li><li>b</li></ul></div></a>"
+        )
+        for stream_threshold in (STREAM_THRESHOLD, 0):
+            dest = os.path.join(self.root, f"docs{stream_threshold}")
+            generate_pages(
+                "/",
+                self.content,
+                dest,
+                self.template,
+                stream_threshold=stream_threshold,
+            )
+            self.assertEqual(self.read_outputs(dest)["page1.html"], expected)
+
+    def test_map_pages_bounded(self):
+        taken = []
+
+        def pages():
+            for i in range(100):
+                taken.append(i)
+                yield (i,)
+
+        results = map_pages(repr, pages(), 2)
+        self.assertEqual(next(results), ((0,), "(0,)"))
+        self.assertLessEqual(len(taken), 2 * PAGES_PER_JOB + 1)
+        self.assertEqual(len(list(results)), 99)
+
+    def test_failures_do_not_stop_other_pages(self):
+        bad = os.path.join(self.content, "page3.md")
+        self.write(bad, "No heading here")
+        dest = os.path.join(self.root, "docs")
+        with self.assertRaises(BuildError) as cm:
+            generate_pages("/", self.content, dest, self.template, jobs=2)
+        self.assertEqual([item for item, _ in cm.exception.failures], [bad])
+        self.assertEqual(len(os.listdir(dest)), 7)
+
+    def test_unreadable_sources_fail_their_page(self):
+        undecodable = os.path.join(self.content, "page3.md")
+        with open(undecodable, "wb") as f:
+            f.write(b"# Title\n\n\xff\xfe")
+        missing = os.path.join(self.content, "page4.md")
+        os.remove(missing)
+        os.symlink(os.path.join(self.root, "missing.md"), missing)
+        for io_threads in (0, 4):
+            dest = os.path.join(self.root, f"docs{io_threads}")
+            manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+            with self.assertRaises(BuildError) as cm:
+                generate_pages(
+                    "/",
+                    self.content,
+                    dest,
+                    self.template,
+                    manifest,
+                    io_threads=io_threads,
+                )
+            failures = dict(cm.exception.failures)
+            self.assertEqual(sorted(failures), [undecodable, missing])
+            self.assertTrue(
+                failures[undecodable].startswith("UnicodeDecodeError")
+            )
+            self.assertTrue(failures[missing].startswith("FileNotFoundError"))
+            self.assertEqual(len(os.listdir(dest)), 6)
+
+    def test_discover_files(self):
+        os.makedirs(os.path.join(self.content, "drafts"))
+        os.makedirs(os.path.join(self.content, "a", "b"))
+        for name in ("drafts/x.md", "a/b/y.md", "a/notes.txt", "a/z.md"):
+            self.write(os.path.join(self.content, name), "# X")
+        found = [
+            os.path.relpath(path, self.content)
+            for path in discover_files(
+                self.content, ["*.md"], ["drafts", "a/z.md"]
+            )
+        ]
+        self.assertEqual(
+            found, ["a/b/y.md"] + [f"page{i}.md" for i in range(8)]
+        )
+
+    def test_exclude(self):
+        dest = os.path.join(self.root, "docs")
+        generate_pages(
+            "/", self.content, dest, self.template, exclude=["page[1-7].md"]
+        )
+        self.assertEqual(os.listdir(dest), ["page0.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from images import (
+    Image,
+    ImageCache,
+    image_attributes,
+    probe_header,
+    probe_size,
+    variant_name,
+)
+from template import rewrite_basepath
+
+
+def png_bytes(width, height):
+    # A valid black grayscale PNG of the given size
+    def chunk(kind, data):
+        crc = struct.pack(">I", zlib.crc32(kind + data))
+        return struct.pack(">I", len(data)) + kind + data + crc
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    rows = b"".join(b"\x00" + bytes(width) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", ihdr)
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+class TestProbe(unittest.TestCase):
+    def test_png_and_gif(self):
+        self.assertEqual(probe_header(png_bytes(3, 2)[:32]), (3, 2))
+        gif = b"GIF89a\x20\x03\x58\x02" + bytes(22)
+        self.assertEqual(probe_header(gif), (800, 600))
+        self.assertIsNone(probe_header(b"not an image"))
+
+    def test_webp(self):
+        vp8x = b"RIFF\0\0\0\0WEBPVP8X" + bytes(8) + b"\x1f\x03\x00\x57\x02\x00"
+        self.assertEqual(probe_header(vp8x), (800, 600))
+        bits = (800 - 1) | (600 - 1) << 14
+        vp8l = b"RIFF\0\0\0\0WEBPVP8L" + bytes(5) + bits.to_bytes(4, "little")
+        self.assertEqual(probe_header(vp8l + bytes(7)), (800, 600))
+
+    def test_jpeg_skips_segments(self):
+        jpeg = (
+            b"\xff\xd8"
+            + b"\xff\xe0\x00\x10"
+            + bytes(14)
+            + b"\xff\xff\xc0\x00\x11\x08\x02\x58\x03\x20"
+            + bytes(12)
+        )
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "a.jpg")
+            with open(path, "wb") as f:
+                f.write(jpeg)
+            self.assertEqual(probe_size(path), (800, 600))
+            with open(path, "wb") as f:
+                f.write(b"\xff\xd8\xff\xe0\x00")
+            self.assertIsNone(probe_size(path))
+
+    def test_static_images(self):
+        root = os.path.join(os.path.dirname(__file__), "..")
+        path = os.path.join(root, "static", "images", "tom.png")
+        self.assertEqual(probe_size(path), (928, 468))
+
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write("images/wide.png", png_bytes(40, 10))
+        self.write("images/small.png", png_bytes(8, 8))
+        self.write("index.css", b"body {}")
+        self.cache_path = os.path.join(self.root, "images.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.static, name), "wb") as f:
+            f.write(data)
+
+    def test_sizes_cached_by_contents(self):
+        cache = ImageCache(self.cache_path)
+        images = cache.process(self.static, self.dest, jobs=2)
+        self.assertEqual(
+            images["/images/wide.png"],
+            {"width": 40, "height": 10, "srcset": [("/images/wide.png", 40)]},
+        )
+        self.assertEqual(
+            sorted(images), ["/images/small.png", "/images/wide.png"]
+        )
+        self.assertEqual((cache.processed, cache.reused), (2, 0))
+        cache.save()
+
+        cache = ImageCache.load(self.cache_path)
+        self.write("images/small.png", png_bytes(9, 8))
+        images = cache.process(self.static, self.dest)
+        self.assertEqual(images["/images/small.png"]["width"], 9)
+        self.assertEqual((cache.processed, cache.reused), (1, 1))
+        self.assertEqual(len(cache.entries), 2)
+
+    @unittest.skipIf(Image is None, "needs the Pillow module")
+    def test_variants(self):
+        cache = ImageCache(self.cache_path)
+        urls = {
+            "/images/wide.png": "/images/wide.abc.png",
+            "/images/small.png": "/images/small.def.png",
+            "/index.css": "/index.css",
+        }
+        images = cache.process(self.static, self.dest, (20, 60), urls)
+        self.assertEqual(
+            images["/images/wide.png"]["srcset"],
+            [("/images/wide.abc.20w.png", 20), ("/images/wide.abc.png", 40)],
+        )
+        variant = os.path.join(self.dest, "images", "wide.abc.20w.png")
+        with Image.open(variant) as image:
+            self.assertEqual(image.size, (20, 5))
+
+        cache.process(self.static, self.dest, (20, 60), urls)
+        self.assertEqual((cache.processed, cache.reused), (0, 2))
+        os.remove(variant)
+        cache.process(self.static, self.dest, (20, 60), urls)
+        self.assertEqual((cache.processed, cache.reused), (1, 1))
+
+        cache.process(self.static, self.dest, (), urls)
+        self.assertFalse(os.path.exists(variant))
+
+    def test_clear(self):
+        variant = os.path.join(self.dest, "images", "wide.20w.png")
+        os.makedirs(os.path.dirname(variant))
+        with open(variant, "wb") as f:
+            f.write(png_bytes(20, 5))
+        cache = ImageCache(self.cache_path)
+        cache.process(self.static, self.dest)
+        cache.outputs[os.path.join(self.static, "images", "wide.png")] = [
+            variant
+        ]
+        cache.clear(self.dest)
+        self.assertFalse(os.path.exists(os.path.dirname(variant)))
+        self.assertEqual((cache.entries, cache.outputs), ({}, {}))
+
+
+class TestImageAttributes(unittest.TestCase):
+    def test_attributes_rewritten_into_pages(self):
+        images = {
+            "/a.png": {
+                "width": 40,
+                "height": 10,
+                "srcset": [
+                    (variant_name("/a.1.png", 20), 20),
+                    ("/a.1.png", 40),
+                ],
+            }
+        }
+        attributes = image_attributes(images, "/site/")
+        html = rewrite_basepath(
+            '<img src="/a.png" alt="a"></img><a href="/a.png">',
+            "/site/",
+            {"/a.png": "/a.1.png"},
+            attributes,
+        )
+        self.assertEqual(
+            html,
+            '<img src="/site/a.1.png" width="40" height="10" '
+            'srcset="/site/a.1.20w.png 20w, /site/a.1.png 40w" '
+            'sizes="(max-width: 40px) 100vw, 40px" alt="a"></img>'
+            '<a href="/site/a.1.png">',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,6 +22,18 @@ class TestLeafNode(unittest.TestCase):
         node = LeafNode(tag=None, value=test_value)
         self.assertEqual(node.to_html(), test_value)
 
+    def test_leaf_shared_defaults(self):
+        node1 = LeafNode("b", "one")
+        node2 = LeafNode("i", "two")
+        self.assertIs(node1.props, node2.props)
+        self.assertIs(node1.children, node2.children)
+        with self.assertRaises(TypeError):
+            node1.props["class"] = "shared"
+
+    def test_leaf_slots(self):
+        node = LeafNode("b", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
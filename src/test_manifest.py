@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from generate_site import generate_pages
+from manifest import BuildManifest, hash_bytes
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.manifest_path)
+        generate_pages(
+            basepath, self.content, self.dest, self.template, manifest
+        )
+        manifest.save()
+        return manifest
+
+    def output(self, *parts):
+        return os.path.join(self.dest, *parts)
+
+    def test_load_missing(self):
+        manifest = BuildManifest.load(self.manifest_path)
+        self.assertEqual(manifest.pages, {})
+        self.assertIsNone(manifest.settings)
+
+    def test_round_trip(self):
+        manifest = self.build()
+        loaded = BuildManifest.load(self.manifest_path)
+        self.assertEqual(loaded.pages, manifest.pages)
+        self.assertEqual(loaded.settings, manifest.settings)
+
+    def test_unchanged_pages_skipped(self):
+        self.build()
+        page = self.output("index.html")
+        self.write(page, "untouched")
+        self.build()
+        with open(page) as f:
+            self.assertEqual(f.read(), "untouched")
+
+    def test_changed_page_rebuilt(self):
+        self.build()
+        self.write(self.output("index.html"), "untouched")
+        self.write(os.path.join(self.content, "index.md"), "# New Home")
+        self.build()
+        with open(self.output("index.html")) as f:
+            self.assertEqual(
+                f.read(),
+                "<title>New Home</title><main><div><h1>New Home</h1></div></main>",
+            )
+
+    def test_settings_change_rebuilds_all(self):
+        self.build()
+        self.write(self.output("index.html"), "untouched")
+        self.build(basepath="/site/")
+        with open(self.output("index.html")) as f:
+            self.assertNotEqual(f.read(), "untouched")
+
+    def test_render_version_change_rebuilds_all(self):
+        self.build()
+        self.write(self.output("index.html"), "untouched")
+        with mock.patch("manifest.RENDER_VERSION", -1):
+            self.build()
+        with open(self.output("index.html")) as f:
+            self.assertNotEqual(f.read(), "untouched")
+
+    def test_missing_output_rebuilt(self):
+        self.build()
+        os.remove(self.output("blog", "post.html"))
+        self.build()
+        self.assertTrue(os.path.exists(self.output("blog", "post.html")))
+
+    def test_deleted_source_removed(self):
+        manifest = self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        manifest = self.build()
+        self.assertFalse(os.path.exists(self.output("blog")))
+        self.assertTrue(os.path.exists(self.output("index.html")))
+        self.assertEqual(len(manifest.pages), 1)
+
+    def test_hash_bytes(self):
+        self.assertEqual(hash_bytes(b"a"), hash_bytes(b"a"))
+        self.assertNotEqual(hash_bytes(b"a"), hash_bytes(b"b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,49 @@
+import os
+import random
 import unittest
-from markdown_to_html_node import markdown_to_html_node, extract_heading
+from block_cache import BlockCache
+from blocks import markdown_to_blocks
+from markdown_to_html_node import (
+    block_to_html,
+    block_to_node,
+    extract_heading,
+    markdown_to_html_node,
+    parse_markdown,
+)
+
+CONTENT_DIR = os.path.join(os.path.dirname(__file__), "..", "content")
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "  spaced  ", "x<y"]
+SPANS = [
+    "**bold words**",
+    "_italic_",
+    "`code`",
+    "_it `x`_",
+    "**bold `code`**",
+    "[a link](/a)",
+    "![an image](/i.png)",
+    "[](/empty)",
+    "![]()",
+    "****",
+    "[unclosed",
+]
+INVALID_SPANS = ["**unclosed", "_a **b** c_", "`a _b_`", "a_b"]
+EDGE_CASES = [
+    "#",
+    "# ",
+    "####### too deep",
+    "```\n```",
+    "``````",
+    "> ",
+    ">",
+    "- ",
+    "1. ",
+    "10. ten",
+    "- item\n- ",
+    "1. a\n\t\n2. b",
+    "- y  \n   \n- x",
+    "****",
+    "a____b",
+]
 
 
 class TestMarkdownToHTML(unittest.TestCase):
@@ -113,6 +157,16 @@ the **same** even with inline stuff
             "<div><h3>Quote block</h3><blockquote>Darkness cannot drive out darkness: only light can do that. Hate cannot drive out hate: only love can do that. - Martin Luther King Jr.</blockquote></div>",
         )
 
+    def test_whitespace_lines(self):
+        cases = {
+            "> a\n  \n> b": "<div><blockquote>a  b</blockquote></div>",
+            "1. a\n\t\n2. b": "<div><p>1. a \t 2. b</p></div>",
+            "- y  \n   \n- x": "<div><p>- y       - x</p></div>",
+        }
+        for md, expected in cases.items():
+            self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+            self.assertEqual(parse_markdown(md).node.to_html(), expected)
+
     # Extract heading
     def test_extract_heading(self):
         md = """
@@ -168,6 +222,111 @@ lol
 """
             heading = extract_heading(md)
 
+    def test_parse_markdown_metadata(self):
+        md = """# Title
+
+Some **bold** words and a [link](/a)
+
+## Section
+
+- ![image](/i.png) item
+- [two](/b) [links](/c)
+"""
+        document = parse_markdown(md)
+        self.assertEqual(document.node.to_html(), markdown_to_html_node(md).to_html())
+        self.assertEqual(document.title, "Title")
+        self.assertEqual(document.headings, [(1, "Title"), (2, "Section")])
+        self.assertEqual(document.blocks, 4)
+        self.assertEqual(document.words, 11)
+        self.assertEqual(document.links, 3)
+        self.assertEqual(document.images, 1)
+
+        cache = BlockCache()
+        parse_markdown(md, cache)
+        cached = parse_markdown(md, cache)
+        self.assertEqual(cache.hits, 4)
+        self.assertEqual(cached.headings, document.headings)
+        self.assertEqual(cached.words, document.words)
+
+    def test_parse_markdown_title_must_come_first(self):
+        document = parse_markdown("Intro\n\n# Late")
+        self.assertIsNone(document.title)
+        with self.assertRaises(Exception):
+            document.require_title()
+
+
+def tree_html(block):
+    # The HTML of a block built through its node tree, or the error raised
+    try:
+        return block_to_node(block).to_html()
+    except ValueError as e:
+        return ("error", str(e))
+
+
+def direct_html(block):
+    try:
+        return block_to_html(block)
+    except ValueError as e:
+        return ("error", str(e))
+
+
+def synthetic_document(rng, blocks):
+    # A random document mixing all block types and inline spans
+    def line():
+        pieces = []
+        for _ in range(rng.randint(1, 12)):
+            if rng.random() < 0.2:
+                pieces.append(rng.choice(SPANS))
+            else:
+                pieces.append(rng.choice(WORDS))
+        return " ".join(pieces)
+
+    body = []
+    for _ in range(blocks):
+        kind = rng.randrange(6)
+        count = rng.randint(1, 4)
+        if kind == 0:
+            body.append(f"{'#' * rng.randint(1, 6)} {line()}")
+        elif kind == 1:
+            code = "\n".join(line() for _ in range(count))
+            body.append(f"```\n{code}\n```")
+        elif kind == 2:
+            body.append("\n".join(f"> {line()}" for _ in range(count)))
+        elif kind == 3:
+            body.append("\n".join(f"- {line()}" for _ in range(count)))
+        elif kind == 4:
+            items = (f"{i}. {line()}" for i in range(1, count + 1))
+            body.append("\n".join(items))
+        else:
+            body.append("\n".join(line() for _ in range(count)))
+    return "\n\n".join(body)
+
+
+class TestDirectHTML(unittest.TestCase):
+    def assert_same_html(self, markdown):
+        for block in markdown_to_blocks(markdown):
+            self.assertEqual(direct_html(block), tree_html(block), block)
+
+    def test_content_fixtures(self):
+        for root, _, files in os.walk(CONTENT_DIR):
+            for name in files:
+                with open(os.path.join(root, name)) as f:
+                    markdown = f.read()
+                self.assert_same_html(markdown)
+                self.assertEqual(
+                    parse_markdown(markdown).node.to_html(),
+                    markdown_to_html_node(markdown).to_html(),
+                )
+
+    def test_synthetic_corpus(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            self.assert_same_html(synthetic_document(rng, 20))
+
+    def test_edge_cases(self):
+        for block in EDGE_CASES + SPANS + INVALID_SPANS:
+            self.assertEqual(direct_html(block), tree_html(block), block)
+
 
 if __name__ == "__main__":
     unittest.main()
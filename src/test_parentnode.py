@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import ParentNode, LeafNode
+from htmlnode import HTMLBuffer, ParentNode, LeafNode
 
 
 class TestParentNode(unittest.TestCase):
@@ -52,6 +53,28 @@ class TestParentNode(unittest.TestCase):
         )
         self.assertEqual(parent3.to_html(), expected)
 
+    def test_write_html_streams_pieces(self):
+        node = ParentNode(
+            "ul", [ParentNode("li", [LeafNode("b", "one")]), LeafNode(None, "x")]
+        )
+        buffer = HTMLBuffer()
+        node.write_html(buffer)
+        self.assertEqual(
+            buffer, ["<ul>", "<li>", "<b>one</b>", "</li>", "x", "</ul>"]
+        )
+
+    def test_write_html_to_file(self):
+        node = ParentNode("p", [LeafNode("i", "a"), LeafNode(None, "b")])
+        fp = io.StringIO()
+        node.write_html(fp)
+        self.assertEqual(fp.getvalue(), node.to_html())
+
+    def test_deep_list_to_html(self):
+        items = [ParentNode("li", [LeafNode(None, str(i))]) for i in range(500)]
+        html = ParentNode("ol", items).to_html()
+        self.assertTrue(html.startswith("<ol><li>0</li><li>1</li>"))
+        self.assertTrue(html.endswith("<li>499</li></ol>"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,46 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import StageWaits, WriteQueue, prefetch
+
+
+class TestPipeline(unittest.TestCase):
+    def test_prefetch_keeps_order_and_depth(self):
+        in_flight = []
+        lock = threading.Lock()
+
+        def square(n):
+            with lock:
+                in_flight.append(n)
+            return n * n
+
+        def items():
+            for n in range(10):
+                # No more than depth calls are submitted ahead of the consumer
+                self.assertLessEqual(len(in_flight) - consumed[0], 3)
+                yield n
+
+        consumed = [0]
+        waits = StageWaits()
+        results = []
+        with ThreadPoolExecutor(2) as executor:
+            for item, result in prefetch(square, items(), executor, 3, waits):
+                consumed[0] += 1
+                results.append((item, result))
+        self.assertEqual(results, [(n, n * n) for n in range(10)])
+        self.assertIn("read", waits.waits)
+
+    def test_write_queue_reports_errors(self):
+        waits = StageWaits()
+        writer = WriteQueue(2, 1, waits)
+        writer.put("ok", lambda: None)
+        writer.put("bad", lambda: 1 / 0)
+        results = {key: error for key, error, _ in writer.close()}
+        self.assertIsNone(results["ok"])
+        self.assertEqual(results["bad"], "ZeroDivisionError: division by zero")
+        self.assertIn("Pipeline waits: ", waits.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
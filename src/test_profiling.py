@@ -0,0 +1,68 @@
+import tracemalloc
+import unittest
+
+from profiling import BuildProfile, NullTimer, StageTimer, start_tracing
+
+
+class TestProfiling(unittest.TestCase):
+    def test_stage_accumulates(self):
+        timer = StageTimer()
+        with timer.stage("parse"):
+            pass
+        with timer.stage("parse"):
+            pass
+        with timer.stage("write"):
+            pass
+        self.assertEqual(list(timer.stages), ["parse", "write"])
+        self.assertGreaterEqual(timer.stages["parse"][0], 0.0)
+        self.assertAlmostEqual(
+            timer.total(), sum(t for t, _ in timer.stages.values())
+        )
+
+    def test_allocations_traced(self):
+        timer = StageTimer()
+        with timer.stage("untraced"):
+            data = bytearray(1 << 20)
+        self.assertEqual(timer.stages["untraced"][1], 0)
+        start_tracing()
+        try:
+            # Memory freed within the stage still counts
+            with timer.stage("traced"):
+                data = bytearray(1 << 20)
+                del data
+        finally:
+            tracemalloc.stop()
+        self.assertGreaterEqual(timer.stages["traced"][1], 1 << 20)
+
+    def test_untraced_timer(self):
+        timer = StageTimer(trace=False)
+        start_tracing()
+        try:
+            with timer.stage("read"):
+                data = bytearray(1 << 20)
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(timer.stages["read"][1], 0)
+        self.assertEqual(len(data), 1 << 20)
+
+    def test_null_timer(self):
+        timer = NullTimer()
+        with timer.stage("parse"):
+            pass
+        self.assertIsNone(timer.stages)
+
+    def test_report_orders_slowest_pages(self):
+        profile = BuildProfile()
+        profile.add_page_stages("fast.md", {"parse": [0.001, 10]})
+        profile.add_page_stages("slow.md", {"parse": [0.5, 20]})
+        with profile.stage("copy_static"):
+            pass
+        report = profile.report(top=1)
+        self.assertIn("slow.md", report)
+        self.assertNotIn("fast.md", report)
+        self.assertIn("page:parse", report)
+        self.assertIn("copy_static", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from htmlnode import HTMLBuffer
+from markdown_to_html_node import markdown_to_html_node
+from renderer import Renderer
+
+DOCUMENTS = [
+    "# Title\n\nSome **bold** and _italic_ text",
+    "# Title\n\n- one\n- two\n\n1. first\n2. second",
+    "> a [link](/a) in a quote\n\n```\ncode  here\n```",
+    "## Heading\n\n![image](/i.png) and `code`",
+]
+
+
+class TestRenderer(unittest.TestCase):
+    def test_matches_node_tree(self):
+        renderer = Renderer()
+        for markdown in DOCUMENTS:
+            self.assertEqual(
+                renderer.render(markdown),
+                markdown_to_html_node(markdown).to_html(),
+            )
+
+    def test_render_many_reuses_blocks(self):
+        renderer = Renderer()
+        expected = [markdown_to_html_node(md).to_html() for md in DOCUMENTS]
+        self.assertEqual(renderer.render_many(DOCUMENTS), expected)
+        self.assertEqual((renderer.hits, renderer.misses), (1, 8))
+        self.assertEqual(renderer.render_many(iter(DOCUMENTS)), expected)
+        self.assertEqual((renderer.hits, renderer.misses), (10, 8))
+
+    def test_render_many_into_buffers(self):
+        renderer = Renderer()
+        buffers = [io.StringIO(), HTMLBuffer()]
+        self.assertIsNone(renderer.render_many(DOCUMENTS[:2], buffers))
+        self.assertEqual(
+            buffers[0].getvalue(), markdown_to_html_node(DOCUMENTS[0]).to_html()
+        )
+        self.assertEqual(
+            "".join(buffers[1]), markdown_to_html_node(DOCUMENTS[1]).to_html()
+        )
+        with self.assertRaises(ValueError):
+            renderer.render_many(DOCUMENTS, buffers)
+
+    def test_capacity(self):
+        renderer = Renderer(capacity=2)
+        renderer.render(DOCUMENTS[1])
+        self.assertEqual(
+            list(renderer.fragments), ["- one\n- two", "1. first\n2. second"]
+        )
+        renderer = Renderer(capacity=0)
+        renderer.render(DOCUMENTS[1])
+        self.assertEqual(len(renderer.fragments), 0)
+
+    def test_errors(self):
+        renderer = Renderer()
+        with self.assertRaises(ValueError):
+            renderer.render("")
+        with self.assertRaises(ValueError):
+            renderer.render("# Title\n\nunclosed **bold")
+
+    def test_shared_between_threads(self):
+        renderer = Renderer(capacity=3)
+        documents = DOCUMENTS * 50
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(renderer.render, documents))
+        expected = [markdown_to_html_node(md).to_html() for md in documents]
+        self.assertEqual(results, expected)
+        self.assertEqual(renderer.hits + renderer.misses, 9 * 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
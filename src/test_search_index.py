@@ -0,0 +1,157 @@
+import json
+import os
+import tempfile
+import unittest
+
+from generate_site import generate_pages
+from manifest import BuildManifest
+from markdown_to_html_node import parse_markdown
+from search_index import (
+    SNIPPET_LENGTH,
+    PageTerms,
+    SearchIndex,
+    make_snippet,
+    page_url,
+    remove_index,
+    text_terms,
+)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class TestSearchIndex(unittest.TestCase):
+    def test_text_terms(self):
+        self.assertEqual(
+            text_terms("The Quick-brown fox_2 a I 42"),
+            ["the", "quick", "brown", "fox", "42"],
+        )
+
+    def test_make_snippet(self):
+        self.assertEqual(make_snippet("  some\n\ntext  here "), "some text here")
+        self.assertEqual(len(make_snippet("word " * 100)), SNIPPET_LENGTH)
+
+    def test_document_terms_and_snippet(self):
+        markdown = (
+            "# Title\n\nSome **bold** text with [a link](/a)\n\n```\ncode here\n```"
+        )
+        self.assertIsNone(parse_markdown(markdown).search)
+        search = parse_markdown(markdown, search=PageTerms()).search
+        self.assertEqual(
+            search.terms,
+            {"title", "some", "bold", "text", "with", "link", "code", "here"},
+        )
+        self.assertEqual(search.snippet, "Some bold text with a link code here")
+
+    def test_page_url(self):
+        self.assertEqual(page_url("docs/index.html", "docs"), "/")
+        self.assertEqual(page_url("docs/blog/index.html", "docs"), "/blog/")
+        self.assertEqual(page_url("docs/blog/post.html", "docs"), "/blog/post.html")
+
+    def test_write_only_changed_shards(self):
+        with tempfile.TemporaryDirectory() as root:
+            index = SearchIndex()
+            index.update("a.md", "/a.html", "A", "alpha", ["alpha", "beta"])
+            index.update("b.md", "/b.html", "B", "bravo", ["bravo"])
+            self.assertEqual(index.write(root), 2 + 1)
+            self.assertEqual(
+                read_json(os.path.join(root, "terms-b.json")),
+                {"beta": [0], "bravo": [1]},
+            )
+            self.assertEqual(
+                read_json(os.path.join(root, "pages-0.json")),
+                {"0": ["/a.html", "A", "alpha"], "1": ["/b.html", "B", "bravo"]},
+            )
+
+            # An unchanged page writes nothing, a changed one only the
+            # shards of the terms that changed
+            index.update("a.md", "/a.html", "A", "alpha", ["beta", "alpha"])
+            self.assertEqual(index.write(root), 0)
+            index.update("a.md", "/a.html", "A", "alpha", ["alpha", "charlie"])
+            self.assertEqual(index.write(root), 3)
+
+            index.remove_stale(["b.md"])
+            index.write(root)
+            self.assertFalse(os.path.exists(os.path.join(root, "terms-c.json")))
+            self.assertEqual(
+                read_json(os.path.join(root, "index.json"))["term_shards"], ["b"]
+            )
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "state.json")
+            index = SearchIndex(path)
+            index.update("a.md", "/a.html", "A", "alpha", ["alpha"])
+            index.save()
+            loaded = SearchIndex.load(path)
+            self.assertEqual((loaded.pages, loaded.next_id), (index.pages, 1))
+
+    def test_generate_pages_indexes_changed_pages(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            dest = os.path.join(root, "docs")
+            template = os.path.join(root, "template.html")
+            os.makedirs(os.path.join(content, "blog"))
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+            for name, text in (
+                ("index.md", "# Home\n\nWelcome home"),
+                ("blog/post.md", "# Post\n\nA first post"),
+            ):
+                with open(os.path.join(content, name), "w") as f:
+                    f.write(text)
+            manifest = BuildManifest(os.path.join(root, "manifest.json"))
+            index = SearchIndex()
+            generate_pages(
+                "/", content, dest, template, manifest, search_index=index
+            )
+            self.assertEqual(
+                sorted(entry["url"] for entry in index.pages.values()),
+                ["/", "/blog/post.html"],
+            )
+            post = index.pages[os.path.join(content, "blog", "post.md")]
+            self.assertEqual(
+                (post["title"], post["snippet"], post["terms"]),
+                ("Post", "A first post", ["first", "post"]),
+            )
+
+            # A page changed by a build without the index is indexed again
+            with open(os.path.join(content, "blog", "post.md"), "w") as f:
+                f.write("# Post\n\nAn edited post")
+            generate_pages("/", content, dest, template, manifest)
+            generate_pages(
+                "/", content, dest, template, manifest, search_index=index
+            )
+            post = index.pages[os.path.join(content, "blog", "post.md")]
+            self.assertEqual(post["terms"], ["an", "edited", "post"])
+
+            os.remove(os.path.join(content, "blog", "post.md"))
+            generate_pages(
+                "/", content, dest, template, manifest, search_index=index
+            )
+            self.assertEqual(list(index.pages), [os.path.join(content, "index.md")])
+
+    def test_remove_index(self):
+        with tempfile.TemporaryDirectory() as root:
+            directory = os.path.join(root, "search")
+            index = SearchIndex()
+            index.update("a.md", "/a.html", "A", "alpha", ["alpha"])
+            index.write(directory)
+            with open(os.path.join(directory, "index.json.gz"), "wb"):
+                pass
+            remove_index(directory)
+            self.assertFalse(os.path.exists(directory))
+
+            # Pages generated into the directory are kept
+            index.write(directory)
+            with open(os.path.join(directory, "page.html"), "w"):
+                pass
+            remove_index(directory)
+            self.assertEqual(os.listdir(directory), ["page.html"])
+            remove_index(os.path.join(root, "missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
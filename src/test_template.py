@@ -0,0 +1,75 @@
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, rewrite_basepath
+
+
+class TestTemplate(unittest.TestCase):
+    def test_segments(self):
+        template = Template("<title>{{ Title }}</title>{{Content}}!")
+        self.assertEqual(
+            template.segments,
+            [
+                ("<title>", None),
+                ("{{ Title }}", "Title"),
+                ("</title>", None),
+                ("{{Content}}", "Content"),
+                ("!", None),
+            ],
+        )
+        self.assertEqual(template.placeholders, {"Title", "Content"})
+
+    def test_render_strings_and_nodes(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}<p>{{ Footer }}</p>")
+        node = ParentNode("div", [LeafNode("b", "bold")])
+        html = template.render(
+            {"Title": "Hello", "Content": node, "Footer": "Bye"}
+        )
+        self.assertEqual(html, "<h1>Hello</h1><div><b>bold</b></div><p>Bye</p>")
+
+    def test_missing_value_kept(self):
+        template = Template("{{ Title }} {{ Unknown }}")
+        self.assertEqual(template.render({"Title": "A"}), "A {{ Unknown }}")
+
+    def test_repeated_placeholder(self):
+        template = Template("{{ Content }}|{{ Content }}")
+        node = LeafNode("i", "x")
+        self.assertEqual(template.render({"Content": node}), "<i>x</i>|<i>x</i>")
+
+    def test_basepath_in_literals_and_values(self):
+        template = Template(
+            '<link href="/index.css">{{ Content }}<img src="/a.png">', "/site/"
+        )
+        self.assertEqual(
+            template.segments[0], ('<link href="/site/index.css">', None)
+        )
+        node = LeafNode("a", "home", {"href": "/index.html"})
+        self.assertEqual(
+            template.render({"Content": node}),
+            '<link href="/site/index.css"><a href="/site/index.html">home</a>'
+            '<img src="/site/a.png">',
+        )
+
+    def test_rewrite_basepath_root(self):
+        html = '<a href="/x">'
+        self.assertIs(rewrite_basepath(html, "/"), html)
+
+    def test_fingerprinted_urls(self):
+        urls = {"/index.css": "/index.abc.css", "/a.png": "/a.def.png"}
+        template = Template(
+            '<link href="/index.css">{{ Content }}<a href="/x.html">', "/", urls
+        )
+        node = LeafNode("img", "", {"src": "/a.png?v=1", "alt": ""})
+        self.assertEqual(
+            template.render({"Content": node}),
+            '<link href="/index.abc.css"><img src="/a.def.png?v=1" alt="">'
+            '</img><a href="/x.html">',
+        )
+        self.assertEqual(
+            rewrite_basepath('<a href="/index.css#top">', "/site/", urls),
+            '<a href="/site/index.abc.css#top">',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
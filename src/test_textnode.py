@@ -299,6 +299,42 @@ class TestTextNode(unittest.TestCase):
         ]
         self.assertListEqual(expected, res)
 
+    def test_text_to_textnodes_repeated_link_and_image(self):
+        text = "An ![x](u) image and a [x](u) link"
+        res = text_to_textnodes(text)
+        expected = [
+            TextNode("An ", TextType.TEXT),
+            TextNode("x", TextType.IMAGE, "u"),
+            TextNode(" image and a ", TextType.TEXT),
+            TextNode("x", TextType.LINK, "u"),
+            TextNode(" link", TextType.TEXT),
+        ]
+        self.assertListEqual(expected, res)
+
+    def test_text_to_textnodes_nested_delimiters(self):
+        res = text_to_textnodes("**bold _not italic_** and _it `not code`_")
+        expected = [
+            TextNode("bold _not italic_", TextType.BOLD),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("it `not code`", TextType.ITALIC),
+        ]
+        self.assertListEqual(expected, res)
+
+    def test_text_to_textnodes_unclosed(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("An **unclosed bold")
+        with self.assertRaises(ValueError):
+            text_to_textnodes("_italic **interrupted** by bold_")
+        with self.assertRaises(ValueError):
+            text_to_textnodes("`code with an _ underscore`")
+
+    def test_text_to_textnodes_empty(self):
+        self.assertListEqual([], text_to_textnodes(""))
+        self.assertListEqual(
+            [TextNode("a", TextType.TEXT), TextNode("b", TextType.TEXT)],
+            text_to_textnodes("a____b"),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+
+from watch import InotifyWatcher, PollingWatcher, SiteWatcher, is_within
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.site = SiteWatcher(
+            "/", self.static, self.content, self.dest, self.template
+        )
+        self.site.load()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest, *parts)) as f:
+            return f.read()
+
+    def test_page_change(self):
+        source = os.path.join(self.content, "index.md")
+        self.write(source, "# New Home")
+        self.assertEqual(self.site.rebuild({source}), (1, 0))
+        self.assertEqual(
+            self.read("index.html"),
+            "<title>New Home</title><div><h1>New Home</h1></div>",
+        )
+
+    def test_crlf_page(self):
+        source = os.path.join(self.content, "index.md")
+        with open(source, "wb") as f:
+            f.write(b"# Title\r\n\r\nHello **world**\r\n\r\n- a\r\n- b\r\n")
+        self.assertEqual(self.site.rebuild({source}), (1, 0))
+        self.assertEqual(
+            self.read("index.html"),
+            "<title>Title</title><div><h1>Title</h1>"
+            "<p>Hello <b>world</b></p><ul><li>a</li><li>b</li></ul></div>",
+        )
+
+    def test_template_change_rerenders_cached_pages(self):
+        self.write(self.template, "{{ Title }}!")
+        self.assertEqual(self.site.rebuild({self.template}), (2, 0))
+        self.assertEqual(self.read("blog", "post.html"), "Post!")
+
+    def test_deleted_directory(self):
+        blog = os.path.join(self.content, "blog")
+        self.site.rebuild({blog})
+        os.remove(os.path.join(blog, "post.md"))
+        os.rmdir(blog)
+        self.site.rebuild({blog})
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertEqual(
+            list(self.site.pages), [os.path.join(self.content, "index.md")]
+        )
+
+    def test_static_change(self):
+        asset = os.path.join(self.static, "site.css")
+        self.write(asset, "body {}")
+        self.assertEqual(self.site.rebuild({asset}), (0, 1))
+        self.assertEqual(self.read("site.css"), "body {}")
+        os.remove(asset)
+        self.site.rebuild({asset})
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "site.css")))
+
+    def test_bad_page_does_not_stop_others(self):
+        bad = os.path.join(self.content, "index.md")
+        good = os.path.join(self.content, "blog", "post.md")
+        self.write(bad, "no heading")
+        self.write(good, "# Better Post")
+        self.assertEqual(self.site.rebuild({bad, good}), (1, 0))
+
+    def test_polling_watcher(self):
+        watcher = PollingWatcher([self.content], [self.template], interval=0)
+        source = os.path.join(self.content, "blog", "new.md")
+        self.write(source, "# New")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(
+            watcher.poll(), {source, os.path.join(self.content, "index.md")}
+        )
+        self.assertEqual(watcher.poll(), set())
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([self.content], [self.template])
+        except OSError:
+            self.skipTest("inotify is not available")
+        try:
+            new_dir = os.path.join(self.content, "new")
+            os.mkdir(new_dir)
+            self.write(self.template, "changed")
+            changes = watcher.wait(debounce=0.05)
+            self.assertIn(self.template, changes)
+            self.assertIn(new_dir, changes)
+            source = os.path.join(new_dir, "page.md")
+            self.write(source, "# Page")
+            self.assertIn(source, watcher.wait(debounce=0.05))
+        finally:
+            watcher.close()
+
+    def test_is_within(self):
+        self.assertTrue(is_within("content/a.md", "content"))
+        self.assertTrue(is_within("content", "content"))
+        self.assertFalse(is_within("content2/a.md", "content"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,6 +18,8 @@ class TextType(Enum):
 class TextNode:
     """A class containing basic information abaout a section of text"""
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         """TextNode constructor
 
@@ -41,6 +43,23 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 
+INLINE_DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+DELIMITER_PRECEDENCE = {"**": 0, "_": 1, "`": 2}
+INLINE_DELIMITER_RE = re.compile(r"\*\*|_|`")
+# A closed bold, italic or code span. Bold spans may hold the other
+# delimiters as literal text, italic spans only backticks.
+INLINE_SPAN_RE = re.compile(r"\*\*(.*?)\*\*|_([^_]*)_|`([^`]*)`")
+# A link, or an image if preceded by "!". The "!" is checked separately, as
+# a pattern starting with "[" lets the regex engine skip ahead to each "["
+LINK_OR_IMAGE_RE = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
 def text_node_to_html_node(text_node):
     """Converts a text node to the corresponding LeafNode
 
@@ -101,15 +120,11 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 def extract_markdown_links(text):
-    rx = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(rx, text)
-    return matches
+    return LINK_RE.findall(text)
 
 
 def extract_markdown_images(text):
-    rx = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(rx, text)
-    return matches
+    return IMAGE_RE.findall(text)
 
 
 def split_nodes_link(old_nodes):
@@ -149,10 +164,190 @@ def split_nodes_image(old_nodes):
 
 
 def text_to_textnodes(text):
-    node = TextNode(text.replace("\n", " "), TextType.TEXT)
-    nodes_list = split_nodes_delimiter([node], "**", TextType.BOLD)
-    nodes_list = split_nodes_delimiter(nodes_list, "_", TextType.ITALIC)
-    nodes_list = split_nodes_delimiter(nodes_list, "`", TextType.CODE)
-    nodes_list = split_nodes_link(nodes_list)
-    nodes_list = split_nodes_image(nodes_list)
-    return nodes_list
+    """Splits markdown text into text nodes in a single pass
+
+    Delimiters are matched in order of precedence: bold, italic, then code.
+    A delimiter of lower precedence inside an open span is literal text,
+    while one of higher precedence leaves the span unclosed. Links and
+    images are only recognized in plain text between spans.
+
+    Args:
+        text (string, required): Inline markdown text
+
+    Raises:
+        ValueError: Raised if a delimiter is left unclosed
+
+    Returns:
+        list: TextNodes in document order
+    """
+    text = text.replace("\n", " ")
+    nodes = []
+    open_delimiter = None
+    start = 0
+    for match in INLINE_DELIMITER_RE.finditer(text):
+        delimiter = match.group()
+        if open_delimiter is None:
+            append_plain_text(text[start : match.start()], nodes)
+            open_delimiter = delimiter
+        elif delimiter == open_delimiter:
+            if match.start() > start:
+                nodes.append(
+                    TextNode(
+                        text[start : match.start()],
+                        INLINE_DELIMITERS[delimiter],
+                    )
+                )
+            open_delimiter = None
+        elif (
+            DELIMITER_PRECEDENCE[delimiter]
+            > DELIMITER_PRECEDENCE[open_delimiter]
+        ):
+            continue
+        else:
+            raise ValueError(f'"{text}" does not contain valid markdown.')
+        start = match.end()
+    if open_delimiter is not None:
+        raise ValueError(f'"{text}" does not contain valid markdown.')
+    append_plain_text(text[start:], nodes)
+    return nodes
+
+
+def append_plain_text(text, nodes):
+    """Appends plain text to a node list, splitting out links and images
+
+    Args:
+        text (string, required): Text between delimited spans
+        nodes (list, required): The list of nodes to append to
+    """
+    if not text:
+        return
+    if "[" not in text:
+        nodes.append(TextNode(text, TextType.TEXT))
+        return
+    start = 0
+    for match_start, match_end, text_type, alt, url in find_links(text):
+        if match_start > start:
+            nodes.append(TextNode(text[start:match_start], TextType.TEXT))
+        nodes.append(TextNode(alt, text_type, url))
+        start = match_end
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+
+
+def find_links(text):
+    # Yield the start, end, TextType, text and URL of each link and image
+    for match in LINK_OR_IMAGE_RE.finditer(text):
+        start = match.start()
+        if start and text[start - 1] == "!":
+            yield start - 1, match.end(), TextType.IMAGE, *match.groups()
+        else:
+            yield start, match.end(), TextType.LINK, *match.groups()
+
+
+def inline_tokens(text):
+    """Splits markdown text into spans, as text_to_textnodes does
+
+    This is the fast path of text_to_textnodes: rather than stepping
+    through each delimiter, closed spans are found by a single regular
+    expression, and the text is only invalid if a delimiter is left over
+    outside of them or one that would have ended a span is inside one.
+
+    Args:
+        text (string, required): Inline markdown text
+
+    Raises:
+        ValueError: Raised if a delimiter is left unclosed
+
+    Returns:
+        list: (text, TextType, url) tuples in document order
+    """
+    text = text.replace("\n", " ")
+    tokens = []
+    start = 0
+    for match in INLINE_SPAN_RE.finditer(text):
+        append_plain_tokens(text, start, match.start(), tokens)
+        bold, italic, code = match.groups()
+        if bold is not None:
+            if bold:
+                tokens.append((bold, TextType.BOLD, None))
+        elif italic is not None:
+            if "**" in italic:
+                raise ValueError(f'"{text}" does not contain valid markdown.')
+            if italic:
+                tokens.append((italic, TextType.ITALIC, None))
+        else:
+            if "**" in code or "_" in code:
+                raise ValueError(f'"{text}" does not contain valid markdown.')
+            if code:
+                tokens.append((code, TextType.CODE, None))
+        start = match.end()
+    append_plain_tokens(text, start, len(text), tokens)
+    return tokens
+
+
+def append_plain_tokens(text, start, end, tokens):
+    """Appends the text between spans to a token list, splitting out links
+    and images
+
+    Args:
+        text (string, required): The inline markdown text
+        start (int, required): Start of the text between spans
+        end (int, required): End of the text between spans
+        tokens (list, required): The list of (text, TextType, url) tuples
+            to append to
+
+    Raises:
+        ValueError: Raised if the text holds a delimiter, which no span closed
+    """
+    if start == end:
+        return
+    plain = text[start:end]
+    if "_" in plain or "`" in plain or "**" in plain:
+        raise ValueError(f'"{text}" does not contain valid markdown.')
+    if "[" not in plain:
+        tokens.append((plain, TextType.TEXT, None))
+        return
+    position = 0
+    for match_start, match_end, text_type, alt, url in find_links(plain):
+        if match_start > position:
+            text_before = plain[position:match_start]
+            tokens.append((text_before, TextType.TEXT, None))
+        tokens.append((alt, text_type, url))
+        position = match_end
+    if position < len(plain):
+        tokens.append((plain[position:], TextType.TEXT, None))
+
+
+def tokens_to_html(tokens):
+    """Returns the HTML of inline tokens without creating any nodes
+
+    The HTML is the same as that of the LeafNodes text_node_to_html_node
+    returns for the corresponding text nodes.
+
+    Args:
+        tokens (list, required): (text, TextType, url) tuples, as returned
+            by inline_tokens
+
+    Raises:
+        TypeError: Raised if a text type is not recognized
+
+    Returns:
+        string: The HTML of the tokens in order
+    """
+    parts = []
+    for text, text_type, url in tokens:
+        if text_type is TextType.TEXT:
+            parts.append(text)
+        elif text_type is TextType.BOLD:
+            parts.append(f"<b>{text}</b>")
+        elif text_type is TextType.ITALIC:
+            parts.append(f"<i>{text}</i>")
+        elif text_type is TextType.CODE:
+            parts.append(f"<code>{text}</code>")
+        elif text_type is TextType.LINK:
+            parts.append(f'<a href="{url}">{text}</a>')
+        elif text_type is TextType.IMAGE:
+            parts.append(f'<img src="{url}" alt="{text}"></img>')
+        else:
+            raise TypeError("Node is not a recognized type.")
+    return "".join(parts)
@@ -0,0 +1,441 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from assets import copy_asset
+from compress import remove_compressed
+from document_cache import decode_document, encode_document
+from fileio import decode_file
+from generate_site import (
+    DEFAULT_INCLUDE,
+    create_directory,
+    matches_any,
+    page_destination,
+    remove_output,
+    traverse_directory,
+    write_output,
+)
+from manifest import hash_bytes
+from markdown_to_html_node import parse_markdown
+from template import Template
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher:
+    """Base class for file watchers
+
+    Watchers report changed paths below a set of directories, watched
+    recursively, and of a set of individual files. A changed directory
+    means anything below it may have changed.
+    """
+
+    def read(self, timeout):
+        """Returns the paths changed since the last read
+
+        Child classes must implement this.
+
+        Args:
+            timeout (float, required): Seconds to wait for a change, or None
+                to wait until one happens
+        """
+        raise NotImplementedError(
+            f"child class {type(self)} must override read method"
+        )
+
+    def wait(self, debounce=0.05):
+        """Blocks until files change, then until they stop changing
+
+        Args:
+            debounce (float, optional): Seconds without changes that end a
+                burst of changes. Defaults to 0.05.
+
+        Returns:
+            set: All paths changed during the burst
+        """
+        changes = set()
+        while not changes:
+            changes = self.read(None)
+        while more := self.read(debounce):
+            changes |= more
+        return changes
+
+    def close(self):
+        pass
+
+
+class PollingWatcher(Watcher):
+    """Detects changes by comparing periodic snapshots of file metadata
+
+    Attributes:
+        directories: Directories watched recursively
+        files: Individual files watched
+        interval: Seconds between snapshots
+    """
+
+    def __init__(self, directories, files=(), interval=0.1):
+        self.directories = [os.path.normpath(d) for d in directories]
+        self.files = [os.path.normpath(f) for f in files]
+        self.interval = interval
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        """Returns the modification time and size of every watched file"""
+        paths = list(self.files)
+        for directory in self.directories:
+            if os.path.isdir(directory):
+                traverse_directory(directory, paths)
+        state = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def poll(self):
+        """Returns the paths added, changed or removed since the last poll"""
+        state = self.snapshot()
+        old = self.state
+        self.state = state
+        changed = {path for path in state if old.get(path) != state[path]}
+        return changed | (old.keys() - state.keys())
+
+    def read(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+            changes = self.poll()
+            if changes or (deadline and time.monotonic() >= deadline):
+                return changes
+
+
+class InotifyWatcher(Watcher):
+    """Detects changes with Linux inotify, without polling
+
+    Files are watched through their parent directory so that editors which
+    save by replacing the file are still noticed.
+
+    Raises:
+        OSError: inotify is not available on this system
+    """
+
+    def __init__(self, directories, files=()):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("C library not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not supported")
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = [os.path.normpath(d) for d in directories]
+        self.files = {os.path.normpath(f) for f in files}
+        self.watches = {}
+        self.recursive = set()
+        for directory in self.directories:
+            self.add_tree(directory)
+        for path in self.files:
+            self.add_watch(os.path.dirname(path) or ".")
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), WATCH_MASK
+        )
+        if wd >= 0:
+            self.watches[wd] = directory
+        return wd
+
+    def add_tree(self, directory):
+        # Watch a directory and all directories below it
+        for dirpath, _, _ in os.walk(directory):
+            if self.add_watch(dirpath) >= 0:
+                self.recursive.add(dirpath)
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changes.update(self.directories, self.files)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.normpath(os.path.join(directory, os.fsdecode(name)))
+            if directory in self.recursive:
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+                changes.add(path)
+            elif path in self.files:
+                changes.add(path)
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+def is_within(path, directory):
+    """Checks whether path is directory itself or anything below it"""
+    return path == directory or path.startswith(directory + os.sep)
+
+
+def make_watcher(directories, files=(), interval=0.1):
+    """Returns an inotify watcher, or a polling one where that is unavailable
+
+    Args:
+        directories (list, required): Directories to watch recursively
+        files (list, optional): Individual files to watch. Defaults to ().
+        interval (float, optional): Polling interval in seconds. Defaults to 0.1.
+    """
+    try:
+        return InotifyWatcher(directories, files)
+    except (OSError, AttributeError):
+        return PollingWatcher(directories, files, interval)
+
+
+class SiteWatcher:
+    """Keeps a site built while its sources change
+
+    The compiled template and the parsed tree of every page stay in memory,
+    so a changed page is parsed again on its own and a changed template only
+    re-renders the pages from their cached trees.
+
+    Attributes:
+        pages: A dictionary mapping sources to (digest, heading, node) tuples
+    """
+
+    def __init__(
+        self,
+        basepath,
+        static_dir,
+        content_dir,
+        dest_dir,
+        template_path,
+        manifest=None,
+        variables=None,
+        block_cache=None,
+        link_static=False,
+        include=DEFAULT_INCLUDE,
+        exclude=(),
+        document_cache=None,
+    ):
+        self.basepath = basepath
+        self.static_dir = os.path.normpath(static_dir)
+        self.content_dir = os.path.normpath(content_dir)
+        self.dest_dir = os.path.normpath(dest_dir)
+        self.template_path = os.path.normpath(template_path)
+        self.manifest = manifest
+        self.variables = variables or {}
+        self.block_cache = block_cache
+        self.link_static = link_static
+        self.include = include
+        self.exclude = exclude
+        self.document_cache = document_cache
+        self.template = None
+        self.pages = {}
+
+    def load(self):
+        """Compiles the template and parses every page into memory"""
+        self.load_template()
+        sources = []
+        traverse_directory(self.content_dir, sources)
+        for source in sources:
+            if self.is_page(source):
+                self.try_parse(source)
+
+    def is_page(self, source):
+        # Check a content file against the include and exclude patterns
+        relative = os.path.relpath(source, self.content_dir).replace(os.sep, "/")
+        parts = relative.split("/")
+        for i, name in enumerate(parts):
+            if matches_any("/".join(parts[: i + 1]), name, self.exclude):
+                return False
+        return matches_any(relative, parts[-1], self.include)
+
+    def load_template(self):
+        with open(self.template_path) as template_file:
+            self.template = Template(template_file.read(), self.basepath)
+        if self.manifest is not None:
+            self.manifest.use_settings(
+                self.template.source, self.basepath, self.variables
+            )
+
+    def parse(self, source):
+        with open(source, "rb") as md_file:
+            raw = md_file.read()
+        digest = hash_bytes(raw)
+        parsed = None
+        if self.document_cache is not None:
+            parsed = self.document_cache.get(digest)
+        if parsed is not None:
+            document = decode_document(parsed)
+        else:
+            document = parse_markdown(decode_file(raw), self.block_cache)
+            if self.document_cache is not None:
+                self.document_cache.put(digest, encode_document(document))
+        heading = document.require_title()
+        self.pages[source] = (digest, heading, document.node)
+
+    def try_parse(self, source):
+        # Parse a page, reporting instead of raising errors
+        try:
+            self.parse(source)
+        except Exception as e:
+            print(f"Failed to parse {source}: {type(e).__name__}: {e}")
+            return False
+        return True
+
+    def render(self, source):
+        digest, heading, node = self.pages[source]
+        destination = page_destination(source, self.content_dir, self.dest_dir)
+        create_directory(destination)
+        values = {**self.variables, "Title": heading, "Content": node}
+        write_output(destination, lambda f: self.template.write(f, values))
+        # Precompressed siblings are only made by full builds; drop the
+        # outdated ones rather than let them be served
+        remove_compressed(destination)
+        if self.manifest is not None:
+            self.manifest.record(source, digest, destination)
+
+    def remove(self, source):
+        del self.pages[source]
+        destination = page_destination(source, self.content_dir, self.dest_dir)
+        remove_output(destination, self.dest_dir)
+        if self.manifest is not None:
+            self.manifest.remove_stale(self.pages)
+
+    def update_static(self, path):
+        # Copy a changed static file, or remove the copy of a deleted one
+        paths = [path]
+        if os.path.isdir(path):
+            paths = []
+            traverse_directory(path, paths)
+        for item in paths:
+            dest = item.replace(self.static_dir, self.dest_dir, 1)
+            if os.path.isfile(item):
+                copy_asset(item, dest, self.link_static)
+                remove_compressed(dest)
+                if self.manifest is not None:
+                    self.manifest.record_asset(item, dest)
+            elif os.path.isfile(dest):
+                os.remove(dest)
+                remove_compressed(dest)
+                if self.manifest is not None:
+                    self.manifest.assets.pop(item, None)
+        return len(paths)
+
+    def update_content(self, path):
+        # Re-parse changed pages below path; returns the sources to render
+        stale = [source for source in self.pages if is_within(source, path)]
+        for source in stale:
+            if not os.path.isfile(source):
+                self.remove(source)
+        found = [path]
+        if os.path.isdir(path):
+            found = []
+            traverse_directory(path, found)
+        changed = []
+        for source in found:
+            if self.is_page(source) and os.path.isfile(source):
+                if self.try_parse(source):
+                    changed.append(source)
+        return changed
+
+    def rebuild(self, changes):
+        """Updates the site for a set of changed paths
+
+        Args:
+            changes (set, required): Paths reported by a Watcher
+
+        Returns:
+            tuple: The number of pages rendered and assets copied
+        """
+        to_render = set()
+        assets = 0
+        for path in sorted(changes):
+            try:
+                if path == self.template_path:
+                    self.load_template()
+                    to_render.update(self.pages)
+                elif is_within(path, self.static_dir):
+                    assets += self.update_static(path)
+                elif is_within(path, self.content_dir):
+                    to_render.update(self.update_content(path))
+            except Exception as e:
+                print(f"Failed to update {path}: {type(e).__name__}: {e}")
+        for source in sorted(to_render):
+            try:
+                self.render(source)
+            except Exception as e:
+                print(f"Failed to render {source}: {type(e).__name__}: {e}")
+        if self.manifest is not None:
+            self.manifest.save()
+        return len(to_render), assets
+
+    def run(self, watcher, debounce=0.05):
+        """Rebuilds the site on every burst of changes until interrupted
+
+        Args:
+            watcher (Watcher, required): The source of changed paths
+            debounce (float, optional): Seconds of quiet ending a burst. Defaults to 0.05.
+        """
+        print(f"Watching for changes with {type(watcher).__name__}...")
+        try:
+            while True:
+                changes = watcher.wait(debounce)
+                start = time.perf_counter()
+                pages, assets = self.rebuild(changes)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(
+                    f"Rebuilt {pages} page(s) and {assets} asset(s) "
+                    f"in {elapsed:.1f} ms"
+                )
+        except KeyboardInterrupt:
+            print("Stopped watching")
+        finally:
+            watcher.close()
+            if self.block_cache is not None:
+                self.block_cache.save()
+                print(self.block_cache.report())
+            if self.document_cache is not None:
+                self.document_cache.save()
+                print(self.document_cache.report())